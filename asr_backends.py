@@ -0,0 +1,153 @@
+"""
+Speech-to-text backends for voice notes.
+
+ASR_BACKEND selects what load_asr_backend() builds:
+  whisper        - OpenAI whisper in PyTorch (the original setup); short notes
+                   from concurrent requests are encoded/decoded in one batch
+  faster-whisper - the same checkpoints converted to CTranslate2 and run with
+                   ASR_COMPUTE_TYPE weights (int8 by default), with Silero VAD
+                   trimming silence before decoding
+                   (pip install -r requirements-optional.txt).
+                   Fast enough on CPU to move WHISPER_MODEL from tiny to small
+
+Every backend takes float32 16 kHz mono PCM and returns
+{"text", "language", "batch_size", "timings"} per note. Backends with
+`batched = True` also implement transcribe_batch() for notes of up to 30 s.
+A backend that fails to load falls back to whisper.
+"""
+import logging
+import time
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+BACKENDS = ("whisper", "faster-whisper")
+
+
+class WhisperBackend:
+    name = "whisper"
+    batched = True
+
+    def __init__(self, model_name: str):
+        import torch
+        import whisper
+
+        self._torch = torch
+        self._whisper = whisper
+        self.model = whisper.load_model(model_name, device=settings.WHISPER_DEVICE or None)
+        self.fp16 = self.model.device.type == "cuda"
+        self.options = whisper.DecodingOptions(
+            task="transcribe",
+            language=settings.WHISPER_LANGUAGE or None,
+            without_timestamps=True,
+            fp16=self.fp16,
+        )
+
+    def transcribe_batch(self, batch):
+        torch, whisper, model = self._torch, self._whisper, self.model
+        dtype = torch.float16 if self.fp16 else torch.float32
+
+        start = time.perf_counter()
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), model.dims.n_mels)
+            for audio in batch
+        ]).to(model.device, dtype)
+        mel_done = time.perf_counter()
+
+        with torch.no_grad():
+            features = model.embed_audio(mels)
+        encode_done = time.perf_counter()
+
+        # Encoder output has the (n_audio_ctx, n_audio_state) shape decode() expects,
+        # so it skips the encoder and only runs the token decoder
+        results = whisper.decode(model, features, self.options)
+        decode_done = time.perf_counter()
+
+        # Batch stages are shared; each note is charged its share
+        size = len(batch)
+        timings = {
+            "mel": 1000 * (mel_done - start) / size,
+            "encode": 1000 * (encode_done - mel_done) / size,
+            "decode_tokens": 1000 * (decode_done - encode_done) / size,
+        }
+        return [
+            {"text": r.text.strip(), "language": r.language, "batch_size": size, "timings": dict(timings)}
+            for r in results
+        ]
+
+    def transcribe(self, audio):
+        start = time.perf_counter()
+        result = self.model.transcribe(audio, fp16=self.fp16, language=settings.WHISPER_LANGUAGE or None)
+        return {
+            "text": result["text"].strip(),
+            "language": result.get("language"),
+            "batch_size": 1,
+            "timings": {"transcribe": 1000 * (time.perf_counter() - start)},
+        }
+
+
+class FasterWhisperBackend:
+    name = "faster-whisper"
+    batched = False
+
+    def __init__(self, model_name: str):
+        from faster_whisper import WhisperModel
+
+        device = settings.WHISPER_DEVICE or "auto"
+        self.model = WhisperModel(
+            model_name,
+            device=device,
+            compute_type=settings.ASR_COMPUTE_TYPE,
+            cpu_threads=settings.ASR_CPU_THREADS,
+            download_root=settings.ASR_MODEL_DIR or None,
+        )
+
+    def transcribe(self, audio):
+        start = time.perf_counter()
+        segments, info = self.model.transcribe(
+            audio,
+            language=settings.WHISPER_LANGUAGE or None,
+            beam_size=settings.ASR_BEAM_SIZE,
+            vad_filter=settings.ASR_VAD,
+            vad_parameters={"min_silence_duration_ms": settings.ASR_VAD_MIN_SILENCE_MS},
+            without_timestamps=True,
+            condition_on_previous_text=False,
+        )
+        # Segments are generated lazily; decoding happens while joining them
+        text = "".join(segment.text for segment in segments).strip()
+        return {
+            "text": text,
+            "language": info.language,
+            "batch_size": 1,
+            "speech_seconds": info.duration_after_vad,
+            "timings": {"transcribe": 1000 * (time.perf_counter() - start)},
+        }
+
+    def transcribe_batch(self, batch):
+        return [self.transcribe(audio) for audio in batch]
+
+
+_LOADERS = {"whisper": WhisperBackend, "faster-whisper": FasterWhisperBackend}
+
+
+def load_asr_backend(backend: str = None, model_name: str = None):
+    """
+    Build the speech-to-text backend for `backend` (default ASR_BACKEND).
+    """
+    backend = (backend or settings.ASR_BACKEND).lower()
+    model_name = model_name or settings.WHISPER_MODEL
+    if backend not in _LOADERS:
+        logger.warning(f"Unknown ASR_BACKEND '{backend}', using whisper")
+        backend = "whisper"
+
+    start = time.perf_counter()
+    try:
+        asr = _LOADERS[backend](model_name)
+    except Exception as e:
+        if backend == "whisper":
+            raise
+        logger.warning(f"Could not load the {backend} ASR backend ({e}), falling back to whisper")
+        asr = WhisperBackend(model_name)
+    print(f"🎙 Speech model: {model_name} [{asr.name}] loaded in {time.perf_counter() - start:.1f}s")
+    return asr
@@ -0,0 +1,210 @@
+"""
+Whisper transcription pipeline for /analyze_audio/.
+
+Uploads are decoded in memory: the bytes are piped through ffmpeg
+(FFMPEG_BINARY) straight to 16 kHz mono PCM. Containers that need seeking
+(mp4/m4a with the index at the end) fail on a pipe; those are spooled to a
+temp file that is always removed afterwards.
+
+Transcription goes through an ASR backend from asr_backends.py. For
+backends that batch, voice notes of up to one Whisper window (30 s) from
+concurrent requests are micro-batched into one encoder/decoder pass; longer
+notes (up to AUDIO_MAX_SECONDS) and other backends run one note per call.
+
+Stage timings (ffmpeg decode, then the backend's own stages) are kept per
+note and aggregated in `audio_stats` for /metrics.
+"""
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import settings
+from asr_backends import load_asr_backend
+from executors import run_in
+from microbatch import MicroBatcher
+
+logger = logging.getLogger("fastapi-rasa")
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLE_RATE   # one Whisper window
+
+
+class AudioRejected(Exception):
+    """The upload is too large, too long or not decodable audio."""
+
+    def __init__(self, message: str, status_code: int = 413):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StageStats:
+    STAGES = ("ffmpeg", "mel", "encode", "decode_tokens", "transcribe")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {stage: [0, 0.0] for stage in self.STAGES}
+        self.notes = 0
+        self.audio_seconds = 0.0
+
+    def record(self, timings: dict, audio_seconds: float = 0.0):
+        with self._lock:
+            if audio_seconds:
+                self.notes += 1
+                self.audio_seconds += audio_seconds
+            for stage, ms in timings.items():
+                entry = self._totals.setdefault(stage, [0, 0.0])
+                entry[0] += 1
+                entry[1] += ms
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "notes": self.notes,
+                "audio_seconds": self.audio_seconds,
+                "stages": {
+                    stage: {"count": count, "avg_ms": total / count if count else 0.0}
+                    for stage, (count, total) in self._totals.items()
+                },
+            }
+
+
+audio_stats = StageStats()
+
+
+# -----------------------------
+# Decoding
+# -----------------------------
+
+async def read_upload(upload, max_bytes: int = None) -> bytes:
+    """
+    Read an UploadFile into memory, refusing anything over max_bytes.
+    """
+    max_bytes = max_bytes or settings.AUDIO_MAX_BYTES
+    data = await upload.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise AudioRejected(f"Voice note is larger than {max_bytes // (1024 * 1024)} MB")
+    if not data:
+        raise AudioRejected("Voice note is empty", status_code=400)
+    return data
+
+
+def _ffmpeg(source: str, data: bytes = None, max_seconds: float = None) -> bytes:
+    cmd = [
+        settings.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        # A little past the limit, so over-long notes are detected without decoding all of them
+        "-t", str(max_seconds + 0.5),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    if data is None:
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, timeout=settings.AUDIO_DECODE_TIMEOUT)
+    else:
+        result = subprocess.run(cmd, input=data, capture_output=True, timeout=settings.AUDIO_DECODE_TIMEOUT)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or "no audio stream")
+    return result.stdout
+
+
+def decode_audio(data: bytes, suffix: str = "", max_seconds: float = None) -> np.ndarray:
+    """
+    Encoded audio bytes -> float32 mono PCM at 16 kHz, without touching disk
+    when the container can be read from a pipe.
+    """
+    max_seconds = max_seconds or settings.AUDIO_MAX_SECONDS
+    try:
+        pcm = _ffmpeg("pipe:0", data, max_seconds)
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg not found ({settings.FFMPEG_BINARY}); set FFMPEG_BINARY")
+    except subprocess.TimeoutExpired:
+        raise AudioRejected("Decoding the voice note timed out", status_code=400)
+    except RuntimeError as e:
+        # Seek-dependent containers only decode from a real file
+        logger.info(f"Decoding from pipe failed ({e}), retrying from a temp file")
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            pcm = _ffmpeg(path, max_seconds=max_seconds)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            raise AudioRejected(f"Could not decode the voice note: {e}", status_code=400)
+        finally:
+            os.unlink(path)
+
+    audio = np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+    if len(audio) > max_seconds * SAMPLE_RATE:
+        raise AudioRejected(f"Voice note is longer than {max_seconds:g} seconds")
+    return audio
+
+
+# -----------------------------
+# Transcription
+# -----------------------------
+
+class Transcriber:
+    def __init__(self, backend, max_batch: int = None, max_wait_ms: float = None):
+        self.backend = backend
+        self.batcher = None
+        if backend.batched:
+            self.batcher = MicroBatcher(
+                self._transcribe_batch,
+                max_batch or settings.AUDIO_BATCH_MAX_SIZE,
+                settings.AUDIO_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+                name="asr",
+            )
+
+    async def transcribe_upload(self, upload) -> dict:
+        """
+        UploadFile -> {"text", "language", "duration", "batch_size", "timings"}.
+        """
+        data = await read_upload(upload)
+        suffix = os.path.splitext(upload.filename or "")[1]
+        start = time.perf_counter()
+        audio = await run_in("io", decode_audio, data, suffix)
+        ffmpeg_ms = 1000 * (time.perf_counter() - start)
+
+        result = await self.transcribe(audio)
+        result["timings"] = dict(ffmpeg=ffmpeg_ms, **result["timings"])
+        result["duration"] = len(audio) / SAMPLE_RATE
+        audio_stats.record(result["timings"], result["duration"])
+        return result
+
+    async def transcribe(self, audio: np.ndarray) -> dict:
+        if self.batcher is not None and len(audio) <= WINDOW_SAMPLES:
+            return await self.batcher.submit(audio)
+        return await run_in("audio", self.backend.transcribe, audio)
+
+    async def _transcribe_batch(self, batch):
+        return await run_in("audio", self.backend.transcribe_batch, batch)
+
+    def stats(self) -> dict:
+        stats = dict(audio_stats.as_dict(), backend=self.backend.name)
+        if self.batcher is not None:
+            stats["batching"] = self.batcher.stats()
+        return stats
+
+
+# -----------------------------
+# Speech component
+# -----------------------------
+
+transcriber = None
+
+
+def load_speech():
+    global transcriber
+    print(f"🎙 Loading speech model ({settings.ASR_BACKEND}, {settings.WHISPER_MODEL})...")
+    transcriber = Transcriber(load_asr_backend())
+
+
+def warm_up_speech():
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    backend = transcriber.backend
+    if backend.batched:
+        backend.transcribe_batch([silence])
+    else:
+        backend.transcribe(silence)
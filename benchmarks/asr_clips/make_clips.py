@@ -0,0 +1,121 @@
+"""
+Synthesise the clips listed in manifest.tsv with a local text-to-speech
+engine, so benchmarks/bench_asr.py runs on a fresh checkout.
+
+Each reference transcript is spoken by the engine, resampled to 16 kHz mono,
+mixed with a little pink noise and encoded into the container its file name
+asks for (m4a -> AAC, ogg/webm -> Opus, wav -> PCM), like a phone voice
+note. Clips that already exist are kept, so real recordings are never
+overwritten (use --force to regenerate everything).
+
+Synthetic speech is cleaner than a real voice note; use the WER numbers to
+compare backends with each other, and record real clips for absolute ones.
+
+    python benchmarks/asr_clips/make_clips.py [--engine auto|espeak|say|sapi]
+                                              [--noise 0.003] [--force]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import settings  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds of silence before the speech starts
+LEADING_SILENCE = {"pause_then_speech.wav": 2.5}
+
+CODECS = {
+    ".m4a": ["-c:a", "aac", "-b:a", "32k"],
+    ".ogg": ["-c:a", "libopus", "-b:a", "24k"],
+    ".webm": ["-c:a", "libopus", "-b:a", "24k"],
+    ".wav": ["-c:a", "pcm_s16le"],
+}
+
+
+def read_manifest(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                name, reference = line.rstrip("\n").split("\t", 1)
+                yield name, reference
+
+
+def pick_engine(engine: str) -> str:
+    if engine != "auto":
+        return engine
+    if shutil.which("espeak-ng") or shutil.which("espeak"):
+        return "espeak"
+    if shutil.which("say"):
+        return "say"
+    if os.name == "nt":
+        return "sapi"
+    sys.exit("No text-to-speech engine found; install espeak-ng (apt/brew/choco install espeak-ng)")
+
+
+def speak(engine: str, text: str, out_wav: str):
+    if engine == "espeak":
+        binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        subprocess.run([binary, "-v", "en-us", "-s", "160", "-w", out_wav, text], check=True)
+    elif engine == "say":
+        subprocess.run(["say", "--file-format=WAVE", "--data-format=LEI16@22050", "-o", out_wav, text], check=True)
+    elif engine == "sapi":
+        script = (
+            "Add-Type -AssemblyName System.Speech;"
+            "$s = New-Object System.Speech.Synthesis.SpeechSynthesizer;"
+            f"$s.SetOutputToWaveFile('{out_wav}');"
+            f"$s.Speak('{text.replace(chr(39), chr(39) * 2)}');"
+            "$s.Dispose()"
+        )
+        subprocess.run(["powershell", "-NoProfile", "-Command", script], check=True)
+    else:
+        sys.exit(f"Unknown engine '{engine}'")
+
+
+def encode(speech_wav: str, out_path: str, silence: float, noise: float):
+    codec = CODECS.get(os.path.splitext(out_path)[1].lower())
+    if codec is None:
+        sys.exit(f"Don't know how to encode {out_path}")
+    chain = f"[0:a]aresample=16000,aformat=channel_layouts=mono,adelay={int(silence * 1000)}:all=1[speech]"
+    if noise > 0:
+        chain += (f";anoisesrc=color=pink:amplitude={noise}:sample_rate=16000[noise]"
+                  ";[speech][noise]amix=inputs=2:duration=first:normalize=0[out]")
+    else:
+        chain += ";[speech]anull[out]"
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+         "-i", speech_wav, "-filter_complex", chain, "-map", "[out]", "-ar", "16000", "-ac", "1",
+         *codec, out_path],
+        check=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", default=os.path.join(HERE, "manifest.tsv"))
+    parser.add_argument("--engine", default="auto", choices=["auto", "espeak", "say", "sapi"])
+    parser.add_argument("--noise", type=float, default=0.003, help="pink noise amplitude; 0 for none")
+    parser.add_argument("--force", action="store_true", help="regenerate clips that already exist")
+    args = parser.parse_args()
+
+    engine = pick_engine(args.engine)
+    root = os.path.dirname(os.path.abspath(args.manifest))
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, reference in read_manifest(args.manifest):
+            out_path = os.path.join(root, name)
+            if os.path.exists(out_path) and not args.force:
+                print(f"keeping {name}")
+                continue
+            speech = os.path.join(tmp, "speech.wav")
+            speak(engine, reference, speech)
+            encode(speech, out_path, LEADING_SILENCE.get(name, 0.3), args.noise)
+            print(f"wrote {name} ({os.path.getsize(out_path) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
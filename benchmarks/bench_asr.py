@@ -0,0 +1,126 @@
+"""
+Speed/accuracy comparison of the speech backends from asr_backends.py.
+
+Decodes every clip listed in benchmarks/asr_clips/manifest.tsv once (with
+the same ffmpeg path /analyze_audio/ uses), then transcribes all of them with
+each backend/model pair. Reports load time, real-time factor (processing
+seconds per second of audio; lower is better, < 1 is faster than real time)
+and word error rate against the reference transcripts.
+
+    python benchmarks/bench_asr.py [--configs whisper:tiny,whisper:small,faster-whisper:small]
+                                   [--manifest benchmarks/asr_clips/manifest.tsv]
+                                   [--rounds 2]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from asr_backends import load_asr_backend  # noqa: E402
+from audio_pipeline import SAMPLE_RATE, WINDOW_SAMPLES, decode_audio  # noqa: E402
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(__file__), "asr_clips", "manifest.tsv")
+
+
+def load_clips(manifest: str):
+    root = os.path.dirname(manifest)
+    clips = []
+    with open(manifest, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, reference = line.rstrip("\n").split("\t", 1)
+            path = os.path.join(root, name)
+            if not os.path.isfile(path):
+                print(f"skipping {name}: missing (see make_clips.py)")
+                continue
+            with open(path, "rb") as clip:
+                audio = decode_audio(clip.read(), os.path.splitext(name)[1], max_seconds=600)
+            clips.append((name, audio, reference))
+    return clips
+
+
+def words(text: str) -> list:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_errors(hypothesis: str, reference: str):
+    """
+    (substitutions + deletions + insertions, reference length) by word-level
+    edit distance.
+    """
+    hyp, ref = words(hypothesis), words(reference)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1], len(ref)
+
+
+def run_config(backend, model_name, clips, rounds):
+    start = time.perf_counter()
+    asr = load_asr_backend(backend, model_name)
+    load_seconds = time.perf_counter() - start
+
+    asr.transcribe(clips[0][1])  # warm-up
+    rtfs, errors, ref_words, texts = [], 0, 0, []
+    for _name, audio, reference in clips:
+        duration = len(audio) / SAMPLE_RATE
+        for _ in range(rounds):
+            start = time.perf_counter()
+            if asr.batched and len(audio) <= WINDOW_SAMPLES:
+                text = asr.transcribe_batch([audio])[0]["text"]
+            else:
+                text = asr.transcribe(audio)["text"]
+            rtfs.append((time.perf_counter() - start) / duration)
+        err, n = word_errors(text, reference)
+        errors += err
+        ref_words += n
+        texts.append(text)
+    return asr.name, load_seconds, rtfs, errors / max(1, ref_words), texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", default="whisper:tiny,whisper:small,faster-whisper:tiny,faster-whisper:small")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--show", action="store_true", help="print every transcript")
+    args = parser.parse_args()
+
+    clips = load_clips(args.manifest)
+    if not clips:
+        sys.exit(f"No clips found next to {args.manifest}; record the files it lists "
+                 f"or run benchmarks/asr_clips/make_clips.py first")
+    audio_seconds = sum(len(audio) for _, audio, _ in clips) / SAMPLE_RATE
+    print(f"{len(clips)} clips, {audio_seconds:.1f} s of audio, {args.rounds} rounds")
+
+    for config in args.configs.split(","):
+        backend, _, model_name = config.strip().partition(":")
+        loaded, load_seconds, rtfs, wer, texts = run_config(backend, model_name or None, clips, args.rounds)
+        if loaded != backend:
+            print(f"{config:<24} unavailable (fell back to {loaded}), skipped")
+            continue
+        rtfs.sort()
+        print(
+            f"{config:<24} load {load_seconds:5.1f} s   "
+            f"RTF p50 {statistics.median(rtfs):.3f}   p90 {rtfs[int(0.9 * (len(rtfs) - 1))]:.3f}   "
+            f"WER {100 * wer:5.1f}%"
+        )
+        if args.show:
+            for (name, _, reference), text in zip(clips, texts):
+                print(f"    {name}: {text!r}  (ref {reference!r})")
+
+
+if __name__ == "__main__":
+    main()
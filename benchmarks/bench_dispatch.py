@@ -0,0 +1,112 @@
+"""
+Microbenchmark: intent dispatch cost per chat turn.
+
+Compares the registry lookup used by handle_intent with the former
+if-chain (which also rebuilt leave_map on every call), and the precompiled
+month regex with the former calendar list scan. Handlers are no-ops, so the
+numbers are pure routing overhead.
+
+    python benchmarks/bench_dispatch.py [--turns 200000]
+"""
+import argparse
+import asyncio
+import calendar
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from intent_registry import IntentRegistry, find_month  # noqa: E402
+
+INTENTS = [
+    "greet", "upcoming_holidays", "policy_data", "bot_features", "available_leaves",
+    "available_casual_leaves", "available_com_leaves", "available_sl_leaves",
+    "available_lop_leaves", "available_ent_leaves", "pay_slip", "pay_slip_of_month",
+    "apply_leave", "nlu_fallback", "goodbye",
+]
+TEXTS = ["payslip for march", "show me the salary slip of september 2025", "my payslip please"]
+
+
+async def noop(intent, OfficeContent, Commonparam, text):
+    return None
+
+
+def build_registry() -> IntentRegistry:
+    registry = IntentRegistry()
+    for intent in INTENTS:
+        if intent not in ("nlu_fallback", "goodbye"):
+            registry.handler(intent)(noop)
+    registry.fallback_handler(noop)
+    return registry
+
+
+async def legacy_dispatch(intent, uid, leave_requests):
+    leave_map = {
+        "available_casual_leaves": ("CL", "Casual Leave"),
+        "available_com_leaves": ("COM", "Compensatory Leave"),
+        "available_sl_leaves": ("SL", "Sick Leave"),
+        "available_lop_leaves": ("LOP", "Loss of Pay"),
+        "available_ent_leaves": ("ENT", "Electricity And Network Trouble Leave"),
+    }
+    for name in ("greet", "upcoming_holidays", "policy_data", "bot_features", "available_leaves"):
+        if intent == name:
+            return await noop(intent, None, None, "")
+    if intent in leave_map:
+        return await noop(intent, None, None, "")
+    for name in ("pay_slip", "pay_slip_of_month"):
+        if intent == name:
+            return await noop(intent, None, None, "")
+    if intent == "apply_leave" or uid in leave_requests:
+        return await noop(intent, None, None, "")
+    return await noop(intent, None, None, "")
+
+
+async def registry_dispatch(registry, intent, uid, leave_requests):
+    handler = registry.get(intent)
+    if handler is None and uid in leave_requests:
+        handler = registry.get("apply_leave")
+    return await registry.dispatch(handler, intent, None, None, "")
+
+
+def legacy_find_month(text):
+    months = [m.lower() for m in calendar.month_name if m] + [m.lower() for m in calendar.month_abbr if m]
+    t_low = text.lower()
+    for m in months:
+        if m and m in t_low:
+            try:
+                return list(calendar.month_name).index(m.capitalize())
+            except ValueError:
+                return list(calendar.month_abbr).index(m.capitalize())
+    return None
+
+
+async def time_async(label, fn, turns):
+    start = time.perf_counter()
+    for i in range(turns):
+        await fn(INTENTS[i % len(INTENTS)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {1e9 * elapsed / turns:10.0f} ns/turn")
+
+
+def time_sync(label, fn, turns):
+    start = time.perf_counter()
+    for i in range(turns):
+        fn(TEXTS[i % len(TEXTS)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {1e9 * elapsed / turns:10.0f} ns/turn")
+
+
+async def main(turns: int):
+    registry = build_registry()
+    leave_requests = {"someone-else": {}}
+    await time_async("dispatch: if-chain", lambda i: legacy_dispatch(i, "uid", leave_requests), turns)
+    await time_async("dispatch: registry", lambda i: registry_dispatch(registry, i, "uid", leave_requests), turns)
+    time_sync("month: calendar scan", legacy_find_month, turns)
+    time_sync("month: precompiled regex", find_month, turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200000)
+    asyncio.run(main(parser.parse_args().turns))
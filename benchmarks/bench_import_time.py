@@ -0,0 +1,99 @@
+"""
+Benchmark / CI gate: how long `import main` takes, and what it pulls in.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters (from a
+throwaway working directory, so app.log lands there) and reports the median
+total, the slowest top-level packages and any heavy ML stack that got
+imported. Those stacks (Rasa/TensorFlow, torch, Whisper, transformers,
+sentence-transformers, FAISS, pdfplumber, sklearn) must only be loaded by
+the component loaders, never at import.
+
+Exits with status 1 if a heavy stack is imported, or if the median is above
+--max-ms (0 = no time limit), so CI can run it as is:
+
+    python benchmarks/bench_import_time.py [--runs 5] [--top 15] [--max-ms 1500]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = (
+    "rasa", "tensorflow", "torch", "whisper", "faster_whisper", "transformers",
+    "sentence_transformers", "faiss", "pdfplumber", "sklearn", "requests",
+)
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def import_once(module: str, cwd: str):
+    """
+    [(self us, cumulative us, depth, name)] for one fresh interpreter.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=0.0, help="fail if the median import is slower")
+    args = parser.parse_args()
+
+    totals, runs = [], []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(args.runs):
+            rows = import_once(args.module, cwd)
+            # The module itself is the last top-level entry; its cumulative covers everything it imported
+            totals.append(next(cum for _, cum, depth, name in reversed(rows) if name == args.module) / 1000)
+            runs.append(rows)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f})")
+
+    # Self time summed per top-level package, from the median run
+    rows = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    packages = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<28}{self_us / 1000:>10.1f}")
+
+    failed = False
+    heavy = sorted({name for *_, name in rows if name.split(".")[0] in HEAVY})
+    if heavy:
+        roots = sorted({name.split(".")[0] for name in heavy})
+        print(f"\nFAIL: heavy modules imported at import time: {', '.join(roots)}")
+        failed = True
+    if args.max_ms and median > args.max_ms:
+        print(f"\nFAIL: median {median:.0f} ms is above --max-ms {args.max_ms:.0f}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Accuracy/latency comparison of the policy QA generator backends.
+
+Retrieves context for a fixed set of policy questions once, then runs the
+same prompts through each backend from policy_generator.py. Reports load
+time, p50/p99 generation latency, and agreement with the fp32 pytorch
+answers (exact match and token F1), which serve as the reference.
+
+    python benchmarks/bench_policy_qa.py [--backends pytorch,int8,onnx]
+                                         [--pdf documents/ocompanypolicy.pdf]
+                                         [--rounds 3] [--max-length 512]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+from sentence_transformers import SentenceTransformer  # noqa: E402
+
+import settings  # noqa: E402
+from bench_retrieval import QUESTIONS, load_chunks  # noqa: E402
+from policy_generator import load_generator  # noqa: E402
+
+
+def build_prompts(pdf_path: str, top_k: int):
+    model = SentenceTransformer(settings.POLICY_EMBED_MODEL)
+    texts = load_chunks(pdf_path, settings.POLICY_CHUNK_SIZE)
+    embs = np.ascontiguousarray(model.encode(texts, normalize_embeddings=True), dtype="float32")
+    index = faiss.IndexFlatIP(embs.shape[1])
+    index.add(embs)
+
+    prompts = []
+    for question in QUESTIONS:
+        q_emb = np.ascontiguousarray(model.encode([question], normalize_embeddings=True), dtype="float32")
+        _, I = index.search(q_emb, top_k)
+        context = " \n".join(texts[idx] for idx in I[0] if idx >= 0)
+        prompts.append(f"Answer the question based on the context:\nContext: {context}\nQuestion: {question}")
+    return prompts
+
+
+def token_f1(pred: str, ref: str) -> float:
+    pred_tokens, ref_tokens = pred.lower().split(), ref.lower().split()
+    common = sum((Counter(pred_tokens) & Counter(ref_tokens)).values())
+    if not common:
+        return float(pred_tokens == ref_tokens)
+    precision, recall = common / len(pred_tokens), common / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_backend(backend, prompts, rounds, max_length):
+    start = time.perf_counter()
+    generator = load_generator(backend)
+    load_seconds = time.perf_counter() - start
+
+    generator(prompts[0], max_length=max_length, do_sample=False)  # warm-up
+    samples, answers = [], []
+    for prompt in prompts:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            answer = generator(prompt, max_length=max_length, do_sample=False)[0]["generated_text"]
+            samples.append(time.perf_counter() - start)
+        answers.append(answer)
+    return generator.backend, load_seconds, samples, answers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="pytorch,int8,onnx")
+    parser.add_argument("--pdf", default="documents/ocompanypolicy.pdf")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=7)
+    parser.add_argument("--max-length", type=int, default=512)
+    args = parser.parse_args()
+
+    prompts = build_prompts(args.pdf, args.top_k)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "pytorch" not in backends:
+        backends.insert(0, "pytorch")
+
+    reference = None
+    print(f"{len(prompts)} questions x {args.rounds} rounds, model {settings.POLICY_QA_MODEL}")
+    for backend in backends:
+        loaded, load_seconds, samples, answers = run_backend(backend, prompts, args.rounds, args.max_length)
+        if loaded != backend:
+            print(f"{backend:<8} unavailable (fell back to {loaded}), skipped")
+            continue
+        if reference is None:
+            reference = answers
+        samples.sort()
+        exact = sum(a.strip() == r.strip() for a, r in zip(answers, reference))
+        f1 = statistics.mean(token_f1(a, r) for a, r in zip(answers, reference))
+        print(
+            f"{backend:<8} load {load_seconds:6.1f} s   "
+            f"p50 {1000 * statistics.median(samples):8.1f} ms   "
+            f"p99 {1000 * samples[int(0.99 * (len(samples) - 1))]:8.1f} ms   "
+            f"exact {exact}/{len(answers)}   F1 {f1:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: policy retrieval latency, old vs new _search_vectors.
+
+old: IndexFlatL2 over raw embeddings, fetch top_k*3 candidates, re-encode
+     them with the embedding model and re-rank with sklearn cosine_similarity
+new: IndexFlatIP over L2-normalized embeddings, one search returns the
+     cosine-ranked top_k
+hybrid: IndexFlatIP candidates fused with BM25 candidates (policy_bm25.py)
+     by reciprocal rank fusion, cut to the smaller --hybrid-top-k
+
+Also reports how often old and new return the same top_k chunks, and how
+many of the hybrid chunks the vector-only top_k also contains.
+
+    python benchmarks/bench_retrieval.py [--pdf documents/ocompanypolicy.pdf]
+                                         [--rounds 20] [--top-k 7] [--hybrid-top-k 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+from sentence_transformers import SentenceTransformer  # noqa: E402
+from sklearn.metrics.pairwise import cosine_similarity  # noqa: E402
+
+import settings  # noqa: E402
+from policy_bm25 import BM25Index, rrf_fuse  # noqa: E402
+from policy_ingest import iter_pages, structured_chunks  # noqa: E402
+
+QUESTIONS = [
+    "How many casual leaves am I entitled to in a year?",
+    "Can sick leave be carried forward?",
+    "What is the notice period for resignation?",
+    "How many public holidays are allowed?",
+    "What is the policy on work from home?",
+    "Is loss of pay deducted for unapproved leave?",
+    "What is the maternity leave policy?",
+    "Who approves compensatory off?",
+]
+
+
+def load_chunks(pdf_path: str, chunk_size: int):
+    texts = []
+    heading = ""
+    for _pageno, page_text in iter_pages(pdf_path):
+        spans, heading = structured_chunks(page_text, chunk_size, heading)
+        texts.extend(page_text[start:end] for start, end, _heading in spans)
+    return texts
+
+
+def search_old(model, index, texts, query, top_k):
+    q_emb = model.encode(query).astype("float32")
+    D, I = index.search(np.array([q_emb]), top_k * 3)
+    candidates = [idx for idx in I[0] if 0 <= idx < len(texts)]
+    cand_embs = model.encode([texts[idx] for idx in candidates]).astype("float32")
+    sims = cosine_similarity(q_emb.reshape(1, -1), cand_embs)[0]
+    ranked = sorted(zip(candidates, sims), key=lambda x: x[1], reverse=True)
+    return [idx for idx, _ in ranked[:top_k]]
+
+
+def search_new(model, index, query, top_k):
+    q_emb = model.encode([query], normalize_embeddings=True)
+    D, I = index.search(np.ascontiguousarray(q_emb, dtype="float32"), top_k)
+    return [int(idx) for idx in I[0] if idx >= 0]
+
+
+def search_hybrid(model, index, bm25, query, top_k, candidates):
+    q_emb = model.encode([query], normalize_embeddings=True)
+    D, I = index.search(np.ascontiguousarray(q_emb, dtype="float32"), candidates)
+    vector = [(int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx >= 0]
+    return [idx for idx, _ in rrf_fuse([vector, bm25.search(query, candidates)], top_k, settings.POLICY_RRF_K)]
+
+
+def timed(fn, rounds):
+    samples = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", default="documents/ocompanypolicy.pdf")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=7)
+    parser.add_argument("--hybrid-top-k", type=int, default=settings.POLICY_TOP_K)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(settings.POLICY_EMBED_MODEL)
+    texts = load_chunks(args.pdf, settings.POLICY_CHUNK_SIZE)
+
+    raw = np.array(model.encode(texts)).astype("float32")
+    l2_index = faiss.IndexFlatL2(raw.shape[1])
+    l2_index.add(raw)
+
+    normed = np.ascontiguousarray(model.encode(texts, normalize_embeddings=True), dtype="float32")
+    ip_index = faiss.IndexFlatIP(normed.shape[1])
+    ip_index.add(normed)
+    bm25 = BM25Index(range(len(texts)), texts)
+
+    print(f"{len(texts)} chunks, top_k={args.top_k}, {args.rounds} rounds x {len(QUESTIONS)} questions")
+    old_ms, new_ms, hybrid_ms, same, overlap = [], [], [], 0, 0
+    for question in QUESTIONS:
+        samples, old_ids = timed(lambda: search_old(model, l2_index, texts, question, args.top_k), args.rounds)
+        old_ms += [1000 * s for s in samples]
+        samples, new_ids = timed(lambda: search_new(model, ip_index, question, args.top_k), args.rounds)
+        new_ms += [1000 * s for s in samples]
+        same += set(old_ids) == set(new_ids)
+        samples, hybrid_ids = timed(
+            lambda: search_hybrid(model, ip_index, bm25, question, args.hybrid_top_k, settings.POLICY_FUSION_CANDIDATES),
+            args.rounds,
+        )
+        hybrid_ms += [1000 * s for s in samples]
+        overlap += len(set(hybrid_ids) & set(new_ids))
+
+    for name, samples in (("old", old_ms), ("new", new_ms), ("hybrid", hybrid_ms)):
+        samples.sort()
+        print(f"{name:<6} p50 {statistics.median(samples):7.2f} ms   p99 {samples[int(0.99 * (len(samples) - 1))]:7.2f} ms")
+    print(f"same top-{args.top_k} set for {same}/{len(QUESTIONS)} questions")
+    print(f"hybrid top-{args.hybrid_top_k}: {overlap}/{args.hybrid_top_k * len(QUESTIONS)} chunks also in vector top-{args.top_k}")
+
+
+if __name__ == "__main__":
+    main()
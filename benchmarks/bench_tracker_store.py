@@ -0,0 +1,104 @@
+"""
+Benchmark: tracker store turn latency and memory at many active uids.
+
+Simulates the store traffic of one /analyze/ leave-form turn per request
+(get_or_create_tracker, append a user message, bot action and slot, save,
+get_or_create_tracker again) for --uids employees in round-robin, --turns
+turns each. Every store runs in its own subprocess so the RSS numbers are
+not mixed up:
+
+  memory - Rasa's InMemoryTrackerStore (the previous default)
+  sqlite - tracker_store.SQLiteTrackerStore with its LRU capped at
+           --cache-size, on a throwaway database
+
+    python benchmarks/bench_tracker_store.py [--uids 10000] [--turns 12]
+                                             [--cache-size 2000] [--stores memory,sqlite]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def run_store(name: str, uids: int, turns: int, cache_size: int):
+    from rasa.core.tracker_store import InMemoryTrackerStore
+    from rasa.shared.core.domain import Domain
+    from rasa.shared.core.events import ActionExecuted, BotUttered, SlotSet, UserUttered
+
+    domain = Domain.load(os.path.join(ROOT, "domain.yml"))
+    tmp = None
+    if name == "memory":
+        store = InMemoryTrackerStore(domain)
+    else:
+        from tracker_store import SQLiteTrackerStore
+        tmp = tempfile.mkdtemp(prefix="trackers-")
+        store = SQLiteTrackerStore(domain, db_path=os.path.join(tmp, "trackers.db"), cache_size=cache_size)
+
+    base_rss = rss_mb()
+    samples = []
+    for turn in range(turns):
+        for uid in range(uids):
+            sender = f"emp-{uid}"
+            start = time.perf_counter()
+            tracker = await store.get_or_create_tracker(sender)
+            tracker.update(UserUttered(f"apply casual leave turn {turn}", {"name": "apply_leave", "confidence": 0.98}))
+            tracker.update(ActionExecuted("leave_form"))
+            tracker.update(SlotSet("leave_type", "casual"))
+            tracker.update(BotUttered("Please provide the end date of your leave"))
+            tracker.update(ActionExecuted("action_listen"))
+            await store.save(tracker)
+            tracker = await store.get_or_create_tracker(sender)
+            tracker.get_slot("leave_type")
+            samples.append(time.perf_counter() - start)
+
+    if hasattr(store, "flush"):
+        store.flush()
+    samples.sort()
+    print(
+        f"{name:<7} {uids} uids x {turns} turns   "
+        f"p50 {1000 * statistics.median(samples):6.2f} ms   "
+        f"p99 {1000 * samples[int(0.99 * (len(samples) - 1))]:6.2f} ms   "
+        f"RSS +{rss_mb() - base_rss:7.1f} MB"
+        + (f"   {store.stats()}" if hasattr(store, "stats") else "")
+    )
+    if hasattr(store, "close"):
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uids", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--cache-size", type=int, default=2000)
+    parser.add_argument("--stores", default="memory,sqlite")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_store(args.child, args.uids, args.turns, args.cache_size))
+        return
+    for name in args.stores.split(","):
+        subprocess.run([
+            sys.executable, __file__, "--child", name.strip(),
+            "--uids", str(args.uids), "--turns", str(args.turns), "--cache-size", str(args.cache_size),
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
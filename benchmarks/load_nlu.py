@@ -0,0 +1,85 @@
+"""
+Load test: concurrent NLU parses, direct vs micro-batched.
+
+Loads the latest trained Rasa model and fires `--requests` parses with
+`--concurrency` in flight, once through agent.parse_message (the old path)
+and once through BatchedNLU. Reports p50/p99 latency and throughput.
+
+    python benchmarks/load_nlu.py [--concurrency 32] [--requests 2000]
+                                  [--max-batch 16] [--max-wait-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nlu_batching import BatchedNLU, install_batched_inference  # noqa: E402
+
+TEXTS = [
+    "hi", "show my payslip", "payslip for march", "upcoming holidays",
+    "how many casual leaves do I have", "what is the leave policy",
+    "I want to apply for sick leave", "what can you do",
+    "sick leave balance", "how many leaves are left",
+]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run(parse, requests: int, concurrency: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            await parse(TEXTS[i % len(TEXTS)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    return latencies, wall
+
+
+def report(name, latencies, wall):
+    print(
+        f"{name:<10} p50 {1000 * statistics.median(latencies):7.1f} ms   "
+        f"p99 {1000 * percentile(latencies, 0.99):7.1f} ms   "
+        f"{len(latencies) / wall:8.1f} req/s"
+    )
+
+
+async def main(args):
+    from rasa.core.agent import Agent
+    from rasa.model import get_latest_model
+
+    install_batched_inference()
+    agent = Agent.load(get_latest_model())
+    batched = BatchedNLU(agent, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    # Warm up both paths (TF graph tracing, tokenizer caches)
+    for text in TEXTS:
+        await agent.parse_message(text)
+    await asyncio.gather(*(batched.parse(text) for text in TEXTS))
+
+    print(f"{args.requests} parses, concurrency {args.concurrency}")
+    report("direct", *await run(agent.parse_message, args.requests, args.concurrency))
+    report("batched", *await run(batched.parse, args.requests, args.concurrency))
+    print(batched.stats())
+    batched.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,208 @@
+"""
+Independently loaded startup components with per-component readiness.
+
+Each heavy dependency (Rasa agent, speech model, policy RAG) is registered
+with a loader and an optional warm-up call. start() loads every eager
+component in its own background thread, so they come up concurrently and
+the app starts serving right away:
+
+  - endpoints `await components.require("rasa", ...)` and are admitted as
+    soon as the components they need are ready; a component still loading
+    is waited for up to COMPONENT_WAIT_SECONDS, then the request gets a 503
+    (ComponentUnavailable)
+  - components named in COMPONENTS_LAZY are not loaded at startup but by
+    the first request that needs them
+  - the warm-up runs one small inference after loading, so the first real
+    request doesn't pay for graph building, kernel selection or lazy
+    allocations; warm-up failures are logged and do not fail the component
+  - /health/live and /health/ready report every component's state; only
+    critical components (the ones nearly every request needs) hold up
+    readiness, the rest are gated per request
+
+Load failures are logged with their traceback and leave the component in
+the "failed" state.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+class ComponentUnavailable(Exception):
+    def __init__(self, name: str, state: str):
+        super().__init__(f"{name} is {state}")
+        self.name = name
+        self.state = state
+
+
+class Component:
+    def __init__(self, name: str, load, warmup=None, lazy: bool = False, requires=(), critical: bool = True):
+        self.name = name
+        self.load = load
+        self.warmup = warmup
+        self.lazy = lazy
+        self.critical = critical
+        self.requires = tuple(requires)
+        # -> loading -> warming -> ready | failed; "loaded" means loaded but not warmed up yet
+        self.state = "lazy" if lazy else "pending"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._waiters = []   # [(loop, future)] of requests waiting for this component
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def trigger(self, warmup: bool = True) -> bool:
+        """
+        Start loading in a background thread unless already started. A
+        component loaded without warm-up is only warmed up.
+        """
+        with self._lock:
+            if self.state == "loaded":
+                self._done.clear()
+                self.state = "warming"
+            elif self.state in ("pending", "lazy"):
+                self.state = "loading"
+            else:
+                return False
+        threading.Thread(target=self._run, args=(warmup,), name=f"load-{self.name}", daemon=True).start()
+        return True
+
+    def _run(self, warmup: bool = True):
+        try:
+            if self.load_seconds is None:
+                for dependency in self.requires:
+                    dependency.trigger()
+                    dependency._done.wait()
+                    if not dependency.ready:
+                        raise RuntimeError(f"{dependency.name} is {dependency.state}")
+
+                start = time.perf_counter()
+                self.load()
+                self.load_seconds = time.perf_counter() - start
+
+            if self.warmup is not None and settings.COMPONENT_WARMUP and not warmup:
+                self.state = "loaded"
+                logger.info(f"✅ {self.name} loaded in {self.load_seconds:.1f}s (warm-up skipped)")
+                return
+
+            if self.warmup is not None and settings.COMPONENT_WARMUP:
+                self.state = "warming"
+                start = time.perf_counter()
+                try:
+                    self.warmup()
+                except Exception:
+                    logger.exception(f"Warm-up of {self.name} failed")
+                self.warmup_seconds = time.perf_counter() - start
+
+            self.state = "ready"
+            logger.info(
+                f"✅ {self.name} ready (load {self.load_seconds:.1f}s"
+                + (f", warm-up {self.warmup_seconds:.1f}s)" if self.warmup_seconds is not None else ")")
+            )
+        except Exception as e:
+            logger.exception(f"❌ Failed to load {self.name}")
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self._done.set()
+            with self._lock:
+                waiters, self._waiters = self._waiters, []
+            for loop, future in waiters:
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def wait_blocking(self, timeout: float = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    async def wait(self, timeout: float = None) -> bool:
+        if self._done.is_set():
+            return self.ready
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._done.is_set():
+                return self.ready
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.ready
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "lazy": self.lazy,
+            "critical": self.critical,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ComponentRegistry:
+    def __init__(self):
+        self._components = {}
+
+    def register(self, name: str, load, warmup=None, lazy: bool = None, requires=(), critical: bool = True) -> Component:
+        if lazy is None:
+            lazy = name in settings.COMPONENTS_LAZY
+        component = Component(name, load, warmup, lazy, [self._components[r] for r in requires], critical)
+        self._components[name] = component
+        return component
+
+    def get(self, name: str) -> Component:
+        return self._components[name]
+
+    def start(self):
+        """
+        Begin loading every eager component in the background.
+        """
+        for component in self._components.values():
+            if not component.lazy:
+                component.trigger()
+
+    def load(self, names, timeout: float = None, warmup: bool = True):
+        """
+        Load the named components and block until they are done (serve.py
+        uses this in the master process before forking). With warmup=False
+        they are left "loaded" and start() warms them up later.
+        """
+        for name in names:
+            self._components[name].trigger(warmup)
+        for name in names:
+            self._components[name].wait_blocking(timeout)
+
+    async def require(self, *names, timeout: float = None):
+        timeout = settings.COMPONENT_WAIT_SECONDS if timeout is None else timeout
+        for name in names:
+            component = self._components[name]
+            if component.ready:
+                continue
+            component.trigger()
+            if not await component.wait(timeout):
+                raise ComponentUnavailable(name, component.state)
+
+    def readiness(self):
+        """
+        (ready, per-component status); only eager, critical components count.
+        """
+        ready = all(c.ready for c in self._components.values() if c.critical and not c.lazy)
+        return ready, {name: c.status() for name, c in self._components.items()}
+
+
+components = ComponentRegistry()
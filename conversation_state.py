@@ -0,0 +1,229 @@
+"""
+Expiring, bounded store for multi-turn conversation state.
+
+The apply_leave flow keeps a partially filled LeaveDraft per uid between
+turns. Drafts expire CONVERSATION_STATE_TTL seconds after their last update,
+so abandoned forms do not pile up. Two implementations share one interface
+(get / put / pop / `uid in store` / sweep / stats):
+
+  memory - an in-process LRU capped at CONVERSATION_STATE_MAX_ENTRIES;
+           records are __slots__ objects instead of dicts
+  sqlite - one WAL-mode SQLite file that every uvicorn worker on the host
+           opens, so a form started on one worker continues on another and
+           survives restarts
+
+Reads treat expired records as missing; the actual removal happens in a
+background sweeper thread every CONVERSATION_STATE_SWEEP_INTERVAL seconds,
+never on the request path. The sweeper (and the SQLite connection) are
+re-created in processes forked by serve.py.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+class LeaveDraft:
+    """A leave application being collected over several messages."""
+    __slots__ = ("leave_id", "leave_name", "leave_from", "leave_to", "reason", "updated_at")
+
+    def __init__(self, leave_id=None, leave_name=None, leave_from=None, leave_to=None, reason=None, updated_at=0.0):
+        self.leave_id = leave_id
+        self.leave_name = leave_name
+        self.leave_from = leave_from    # dd/mm/YYYY
+        self.leave_to = leave_to
+        self.reason = reason
+        self.updated_at = updated_at
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+
+class _Sweeper:
+    def _start_sweeper(self, interval: float):
+        if not hasattr(self, "_sweep_interval"):
+            os.register_at_fork(after_in_child=self._after_fork)
+        self._sweep_interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        if interval > 0:
+            self._thread = threading.Thread(target=self._sweep_loop, args=(interval,), name="state-sweeper", daemon=True)
+            self._thread.start()
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"Conversation state: {removed} expired records swept")
+            except Exception as e:
+                logger.warning(f"Conversation state sweep failed: {e}")
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._start_sweeper(self._sweep_interval)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+class MemoryStateStore(_Sweeper):
+    def __init__(self, ttl: float = None, max_entries: int = None, sweep_interval: float = None):
+        self.ttl = settings.CONVERSATION_STATE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.CONVERSATION_STATE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._records = OrderedDict()   # uid -> record, least recently updated first
+        self.expired = self.evicted = 0
+        self._start_sweeper(settings.CONVERSATION_STATE_SWEEP_INTERVAL if sweep_interval is None else sweep_interval)
+
+    def _live(self, record, now) -> bool:
+        return not self.ttl or now - record.updated_at < self.ttl
+
+    def get(self, uid: str):
+        with self._lock:
+            record = self._records.get(uid)
+        if record is None or not self._live(record, time.time()):
+            return None
+        return record
+
+    def __contains__(self, uid: str) -> bool:
+        return self.get(uid) is not None
+
+    def put(self, uid: str, record) -> None:
+        record.updated_at = time.time()
+        with self._lock:
+            self._records[uid] = record
+            self._records.move_to_end(uid)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+                self.evicted += 1
+
+    def pop(self, uid: str):
+        with self._lock:
+            return self._records.pop(uid, None)
+
+    def sweep(self) -> int:
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        removed = 0
+        with self._lock:
+            # Oldest updates come first, so stop at the first live record
+            while self._records:
+                uid, record = next(iter(self._records.items()))
+                if record.updated_at >= cutoff:
+                    break
+                del self._records[uid]
+                removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "records": len(self._records), "expired": self.expired, "evicted": self.evicted}
+
+
+class SQLiteStateStore(_Sweeper):
+    def __init__(self, path: str = None, ttl: float = None, record_type=LeaveDraft, sweep_interval: float = None):
+        self.path = path or settings.CONVERSATION_STATE_DB_PATH
+        self.ttl = settings.CONVERSATION_STATE_TTL if ttl is None else ttl
+        self.record_type = record_type
+        self.kind = record_type.__name__
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._inherited = []
+        self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_state ("
+            " kind TEXT NOT NULL, uid TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, uid))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS conversation_state_updated ON conversation_state (updated_at)")
+        self.expired = 0
+        self._start_sweeper(settings.CONVERSATION_STATE_SWEEP_INTERVAL if sweep_interval is None else sweep_interval)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _after_fork(self):
+        # The parent's connection must not be used (or closed) in the child
+        self._inherited.append(self._conn)
+        self._connect()
+        super()._after_fork()
+
+    def get(self, uid: str):
+        cutoff = time.time() - self.ttl if self.ttl else 0.0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM conversation_state WHERE kind = ? AND uid = ? AND updated_at >= ?",
+                (self.kind, uid, cutoff),
+            ).fetchone()
+        return self.record_type.from_dict(json.loads(row[0])) if row else None
+
+    def __contains__(self, uid: str) -> bool:
+        return self.get(uid) is not None
+
+    def put(self, uid: str, record) -> None:
+        record.updated_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversation_state (kind, uid, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(kind, uid) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (self.kind, uid, json.dumps(record.to_dict()), record.updated_at),
+            )
+
+    def pop(self, uid: str):
+        record = self.get(uid)
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_state WHERE kind = ? AND uid = ?", (self.kind, uid))
+        return record
+
+    def sweep(self) -> int:
+        if not self.ttl:
+            return 0
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM conversation_state WHERE kind = ? AND updated_at < ?",
+                (self.kind, time.time() - self.ttl),
+            ).rowcount
+        self.expired += removed
+        return removed
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            records = self._conn.execute(
+                "SELECT COUNT(*) FROM conversation_state WHERE kind = ?", (self.kind,)
+            ).fetchone()[0]
+        return {"backend": "sqlite", "records": records, "expired": self.expired}
+
+
+def create_state_store(backend: str = None, **kwargs):
+    backend = (backend or settings.CONVERSATION_STATE_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteStateStore(**kwargs)
+    if backend != "memory":
+        logger.warning(f"Unknown CONVERSATION_STATE_BACKEND '{backend}', using memory")
+    return MemoryStateStore(**kwargs)
+
+
+# Partially filled leave applications, keyed by uid
+leave_drafts = create_state_store()
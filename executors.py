@@ -0,0 +1,139 @@
+"""
+Bounded thread pools for blocking work called from async endpoints.
+
+Each workload class (audio transcription, policy RAG, blocking HTTP) gets its
+own pool and its own queue limit, so a burst of voice notes can't starve
+policy questions and neither can stall the event loop that serves text
+intents. When a pool already has `workers + max_queue` jobs in flight,
+run_in() raises PoolSaturated, which the app turns into HTTP 429.
+
+Process pools were left out on purpose: Whisper, the embedding model and
+Flan-T5 live in the main process, and torch releases the GIL during
+inference, so threads already run them in parallel with the event loop.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+class PoolSaturated(Exception):
+    def __init__(self, workload: str, in_flight: int):
+        super().__init__(f"{workload} pool is saturated ({in_flight} jobs in flight)")
+        self.workload = workload
+        self.in_flight = in_flight
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(self.name, self.in_flight)
+            self.in_flight += 1
+            self.submitted += 1
+
+        queued_at = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.wait_seconds += started - queued_at
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_seconds += time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(job)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        # The slot is released when the job itself ends (or is cancelled before
+        # it starts), not when the caller stops waiting: a request that
+        # disconnects leaves its job running, and that job still counts
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.in_flight - self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": 1000 * self.wait_seconds / done if done else 0.0,
+                "avg_run_ms": 1000 * self.run_seconds / done if done else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_pools = {}
+
+
+def get_executor(workload: str) -> BoundedExecutor:
+    pool = _pools.get(workload)
+    if pool is None:
+        pool = BoundedExecutor(
+            workload,
+            settings.EXECUTOR_WORKERS.get(workload, 1),
+            settings.EXECUTOR_MAX_QUEUE.get(workload, 0),
+        )
+        _pools[workload] = pool
+    return pool
+
+
+async def run_in(workload: str, fn, *args, **kwargs):
+    """
+    Run a blocking call on the pool for `workload` without blocking the event loop.
+    """
+    return await get_executor(workload).run(functools.partial(fn, *args, **kwargs))
+
+
+def executor_stats() -> dict:
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+
+def shutdown_executors():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
@@ -0,0 +1,280 @@
+"""
+Tier-0 intent classifier that runs ahead of agent.parse_message.
+
+It only answers short, unambiguous utterances such as "holidays",
+"payslip for march" or "sick leave balance". Everything else is left to
+Rasa (the classifier abstains and returns None). It combines:
+  - an exact-match table of data/nlu.yml examples that belong to one intent only
+  - an Aho-Corasick keyword automaton (payslip, holiday, balance words and the
+    leave-type keywords used by parse_leave_type)
+  - a few rules over the matched keyword groups, plus intent_registry.find_month
+"""
+import logging
+import os
+import re
+from collections import deque
+
+import yaml
+
+import settings
+from intent_registry import find_month
+from leave_service import LEAVE_TYPES
+
+logger = logging.getLogger("fastapi-rasa")
+
+NLU_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nlu.yml")
+
+# Intents the fast path may return. Anything that opens a form or needs
+# entities (apply_leave, inform, cancel, ...) always goes through Rasa.
+FAST_INTENTS = {
+    "greet", "goodbye", "thanks", "bot_challenge", "bot_features",
+    "upcoming_holidays", "pay_slip", "pay_slip_of_month", "policy_data",
+    "available_leaves", "available_casual_leaves", "available_sl_leaves",
+    "available_com_leaves", "available_lop_leaves",
+}
+
+# Backend LeaveID (see leave_service.LEAVE_TYPES) -> balance intent
+BALANCE_INTENT_BY_LEAVE_ID = {
+    1: "available_casual_leaves",
+    2: "available_sl_leaves",
+    3: "available_com_leaves",
+    4: "available_lop_leaves",
+}
+
+KEYWORD_GROUPS = {
+    "payslip": ["payslip", "payslips", "pay slip", "salary slip", "salary slips", "earnings slip"],
+    "holiday": ["holiday", "holidays"],
+    "policy": ["policy", "policies", "entitled", "entitlement", "allowed", "eligible",
+               "carried forward", "carry forward"],
+    "leave": ["leave", "leaves"],
+    # Not "status": "my leave application status" asks about a request, not the balance
+    "balance": ["balance", "remaining", "left", "available", "how many", "quota"],
+    # Words that suggest an action or a correction; Rasa handles those
+    "action": ["apply", "applying", "request", "submit", "file", "take", "cancel", "want to apply"],
+    "negation": ["not", "no", "don't", "dont", "never", "without"],
+}
+
+_ENTITY_MARKUP = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+_NON_WORD = re.compile(r"[^\w\s'/-]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    text = _NON_WORD.sub(" ", (text or "").lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+# -----------------------------
+# Aho-Corasick automaton
+# -----------------------------
+
+class KeywordAutomaton:
+    """
+    Multi-pattern matcher: finds every keyword occurrence in one pass over
+    the text. Matches are kept only on word boundaries.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, keyword: str, value):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), value))
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        return self
+
+    def find(self, text: str):
+        """
+        Yields the value of every whole-word keyword found in text.
+        """
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                start = i - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if i < last and text[i + 1].isalnum():
+                    continue
+                yield value
+
+
+# -----------------------------
+# Classifier
+# -----------------------------
+
+class FastIntentClassifier:
+    def __init__(self, nlu_path: str = NLU_DATA_PATH, max_tokens: int = None):
+        self.max_tokens = settings.FAST_INTENT_MAX_TOKENS if max_tokens is None else max_tokens
+        self.exact = self._load_exact_matches(nlu_path)
+
+        self.automaton = KeywordAutomaton()
+        for group, keywords in KEYWORD_GROUPS.items():
+            for keyword in keywords:
+                self.automaton.add(keyword, group)
+        for keywords, leave_id, _name in LEAVE_TYPES:
+            for keyword in keywords:
+                self.automaton.add(keyword, ("type", leave_id))
+        self.automaton.build()
+
+    @staticmethod
+    def _load_exact_matches(nlu_path: str) -> dict:
+        """
+        { normalized example: intent } for examples that only one intent uses.
+        """
+        try:
+            with open(nlu_path, encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except OSError as e:
+            logger.warning(f"Fast intent path has no training examples: {e}")
+            return {}
+
+        seen = {}
+        for item in data.get("nlu", []):
+            intent = item.get("intent")
+            if not intent:
+                continue
+            for line in (item.get("examples") or "").splitlines():
+                line = line.strip()
+                if not line.startswith("-"):
+                    continue
+                example = normalize(_ENTITY_MARKUP.sub(r"\1", line[1:]))
+                if example:
+                    seen.setdefault(example, set()).add(intent)
+        return {
+            example: next(iter(labels))
+            for example, labels in seen.items()
+            if len(labels) == 1 and next(iter(labels)) in FAST_INTENTS
+        }
+
+    def classify(self, text: str):
+        """
+        Returns (intent, confidence), or (None, 0.0) when the utterance is not
+        clear-cut enough for the fast path.
+        """
+        norm = normalize(text)
+        if not norm:
+            return None, 0.0
+
+        intent = self.exact.get(norm)
+        if intent:
+            return intent, 1.0
+        if len(norm.split()) > self.max_tokens:
+            return None, 0.0
+
+        groups = set()
+        leave_ids = set()
+        for value in self.automaton.find(norm):
+            if isinstance(value, tuple):
+                leave_ids.add(value[1])
+            else:
+                groups.add(value)
+
+        if groups & {"action", "negation"}:
+            return None, 0.0
+
+        if "payslip" in groups:
+            if groups & {"holiday", "policy", "leave"} or leave_ids:
+                return None, 0.0
+            if find_month(norm)[0]:
+                return "pay_slip_of_month", 0.95
+            return "pay_slip", 0.9
+
+        if "policy" in groups:
+            return "policy_data", 0.85
+
+        if "holiday" in groups:
+            # "how many public holidays are allowed" is a policy question
+            if groups & {"leave", "balance"} or leave_ids:
+                return None, 0.0
+            return "upcoming_holidays", 0.9
+
+        if "leave" in groups and "balance" in groups:
+            if not leave_ids:
+                return "available_leaves", 0.9
+            if len(leave_ids) == 1:
+                intent = BALANCE_INTENT_BY_LEAVE_ID.get(next(iter(leave_ids)))
+                if intent:
+                    return intent, 0.9
+        return None, 0.0
+
+
+# -----------------------------
+# Tiering and metrics
+# -----------------------------
+
+class FastPathStats:
+    """
+    Shadow-mode agreement with Rasa and time saved per intent. Saved time is
+    estimated from the running mean of agent.parse_message latency.
+    """
+
+    def __init__(self):
+        self.parse_seconds = {}  # { intent: [count, total seconds] } for Rasa parses
+        self.per_intent = {}     # { intent: {...} } for fast-path predictions
+        self.abstained = 0
+
+    def _intent(self, intent: str) -> dict:
+        return self.per_intent.setdefault(intent, {
+            "served": 0, "saved_seconds": 0.0, "shadow": 0, "agree": 0,
+        })
+
+    def record_parse(self, intent: str, seconds: float):
+        for key in (intent, "*"):
+            count_total = self.parse_seconds.setdefault(key, [0, 0.0])
+            count_total[0] += 1
+            count_total[1] += seconds
+
+    def mean_parse_seconds(self, intent: str) -> float:
+        count, total = self.parse_seconds.get(intent) or self.parse_seconds.get("*") or (0, 0.0)
+        return total / count if count else 0.0
+
+    def record_served(self, intent: str):
+        entry = self._intent(intent)
+        entry["served"] += 1
+        entry["saved_seconds"] += self.mean_parse_seconds(intent)
+
+    def record_shadow(self, fast_intent: str, rasa_intent: str):
+        entry = self._intent(fast_intent)
+        entry["shadow"] += 1
+        if fast_intent == rasa_intent:
+            entry["agree"] += 1
+
+    def as_dict(self) -> dict:
+        per_intent = {}
+        for intent, entry in self.per_intent.items():
+            per_intent[intent] = dict(entry)
+            if entry["shadow"]:
+                per_intent[intent]["agreement"] = entry["agree"] / entry["shadow"]
+        return {
+            "abstained": self.abstained,
+            "mean_parse_ms": {k: 1000 * v[1] / v[0] for k, v in self.parse_seconds.items() if v[0]},
+            "intents": per_intent,
+        }
@@ -0,0 +1,354 @@
+"""
+Handlers for the intents answered outside Rasa's dialogue policies,
+registered on intent_registry.intents. Importing this module registers them.
+"""
+import json
+import re
+from datetime import datetime, timedelta
+
+from components import components
+from conversation_state import LeaveDraft, leave_drafts
+from executors import PoolSaturated, run_in
+from intent_registry import find_month, intents
+from leave_service import (
+    LEAVE_TYPES,
+    extract_dates_from_text,
+    fetch_leave_summary,
+    fmt_date,
+    format_leave_response,
+    inclusive_days,
+    parse_leave_type,
+    save_leave_application,
+)
+from officekit_client import get_officekit_client, request_url
+from payslip import payslips
+from policy_context import cite
+from policy_rag import answer_policy_question
+from response_cache import cached_post_json
+
+# -----------------------------
+# Backend API helpers
+# -----------------------------
+
+#fetch policy data
+
+async def fetch_policy_data(OfficeContent: dict, Commonparam: dict):
+    url = request_url(Commonparam, "GetForm_PolicyData", OfficeContent, Commonparam)
+    print("📤 Request URL:", url)
+
+    response = await get_officekit_client().post(Commonparam, "GetForm_PolicyData", OfficeContent, Commonparam)
+    print("🔎 Raw Response Text:", response.text)
+
+    if response.status_code == 200:
+        try:
+            data = response.json()
+            if isinstance(data, str):  # sometimes backend double-encodes JSON
+                data = json.loads(data)
+
+            return {
+                "responseCode": "0004",
+                "responseData": "Completed successfully",
+                "policy": data,   
+            }
+        except Exception as e:
+            return {
+                "responseCode": "1002",
+                "responseData": f"Failed to parse JSON: {e}",
+                "raw": response.text,   # keep raw text for debugging
+            }
+    else:
+        return {
+            "responseCode": str(response.status_code),
+            "responseData": "Failed to fetch policy data",
+            "details": response.text,
+        }
+    
+
+
+
+async def fetch_upcoming_holidays(OfficeContent: dict, Commonparam: dict):
+    cp = dict(Commonparam or {})
+    cp["CurYear"] = str(datetime.now().year)
+
+    url = request_url(Commonparam, "GetHolidayList", OfficeContent, cp)
+    print("📤 Request URL:", url)
+
+    result = await cached_post_json(Commonparam, "GetHolidayList", OfficeContent, cp)
+    print("🔎 Raw Response Text:", result.text)
+
+    if result.status_code == 200:
+        try:
+            if result.error:
+                raise ValueError(result.error)
+            data = result.data
+
+            today = datetime.today().date()
+            upcoming = []
+            for item in data:
+                try:
+                    from_date = datetime.strptime(item.get("FromDate"), "%d/%m/%Y").date()
+                    if from_date >= today:
+                        upcoming.append({
+                            "Holiday_Name": item.get("Holiday_Name"),
+                            "FromDate": item.get("FromDate"),
+                            "ToDate": item.get("ToDate"),
+                            "RestrictedHoliday": item.get("RestrictedHoliday"),
+                            "PayType": item.get("PayType"),
+                            "Location": item.get("Location"),
+                        })
+                except Exception:
+                    continue
+
+            return {
+                "responseCode": "0000",
+                "responseData": "Completed successfully",
+                "upcoming_holidays": upcoming,
+            }
+        except Exception as e:
+            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
+    else:
+        return {
+            "responseCode": str(result.status_code),
+            "responseData": "Failed to fetch holiday list",
+            "details": result.text,
+        }
+
+# -----------------------------
+# Intent handler
+# -----------------------------
+
+# Leave-balance intents -> (code, display name in Leavecompilation)
+LEAVE_BALANCE_INTENTS = {
+    "available_casual_leaves": ("CL", "Casual Leave"),
+    "available_com_leaves": ("COM", "Compensatory Leave"),
+    "available_sl_leaves": ("SL", "Sick Leave"),
+    "available_lop_leaves": ("LOP", "Loss of Pay"),
+    "available_ent_leaves": ("ENT", "Electricity And Network Trouble Leave"),
+}
+
+
+async def handle_intent(intent, OfficeContent, Commonparam, text: str):
+    # If a leave flow is ongoing for this uid, continue it regardless of intent misclassifications
+    uid = (OfficeContent or {}).get("uid") or "default"
+
+    handler = intents.get(intent)
+    if handler is None and uid in leave_drafts:
+        handler = intents.get("apply_leave")
+    return await intents.dispatch(handler, intent, OfficeContent, Commonparam, text)
+
+
+# ---------------- GREET ----------------
+@intents.handler("greet")
+async def handle_greet(intent, OfficeContent, Commonparam, text: str):
+    return {"responseCode": "0000", "responseData": "Completed successfully", "message": "Hi, how can I help you?"}
+
+
+# ------------- UPCOMING HOLIDAYS -------------
+@intents.handler("upcoming_holidays")
+async def handle_upcoming_holidays(intent, OfficeContent, Commonparam, text: str):
+    return await fetch_upcoming_holidays(OfficeContent, Commonparam)
+
+
+@intents.handler("policy_data")
+async def handle_policy_data(intent, OfficeContent, Commonparam, text: str):
+    #return await fetch_policy_data(OfficeContent, Commonparam)
+    user_q = text
+    await components.require("policy")
+    try:
+        answer, pages = await run_in("rag", answer_policy_question, user_q)
+        if not answer:
+            bot_message = "Sorry, I couldn’t find anything in the company policy."
+        else:
+            src_txt = f" (see {cite(pages)})" if pages else ""
+            bot_message = f"{answer}{src_txt}"
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        print(f"RAG error: {e}")
+        bot_message = "⚠️ Sorry, I couldn't look that up right now."
+
+    return {
+        "responseCode": "0000",
+        "responseData": "success",
+        "message": bot_message,
+        "slots": {}
+    }
+
+
+@intents.handler("bot_features")
+async def handle_bot_features(intent, OfficeContent, Commonparam, text: str):
+    return {"responseCode": "0000", "responseData": "Completed successfully",     "message": "I can help you with viewing your payslip, applying for leave, checking company policies, upcoming holidays, and your remaining leave balance."
+      }
+
+
+# ------------- LEAVE SUMMARY -------------
+@intents.handler("available_leaves")
+async def handle_available_leaves(intent, OfficeContent, Commonparam, text: str):
+    return await fetch_leave_summary(OfficeContent, Commonparam)
+
+
+@intents.handler(*LEAVE_BALANCE_INTENTS)
+async def handle_leave_balance(intent, OfficeContent, Commonparam, text: str):
+    leave_data = await fetch_leave_summary(OfficeContent, Commonparam)
+    code, name = LEAVE_BALANCE_INTENTS[intent]
+    return format_leave_response(leave_data, code, name)
+
+
+# ------------- PAY SLIP (LATEST) -------------
+@intents.handler("pay_slip")
+async def handle_pay_slip(intent, OfficeContent, Commonparam, text: str):
+    periods, salary_slip = await payslips.salary_slip(OfficeContent, Commonparam)
+    if periods.error:
+        return {"responseCode": "1001", "responseData": periods.error}
+
+    if not periods.has_period():
+        return {"responseCode": "1004", "responseData": "No payroll periods found"}
+
+    return {
+        "responseCode": "0000",
+        "responseData": "Completed successfully",
+        "message": "Last generated payslip",
+        "salary_slip": salary_slip,
+    }
+
+
+# ------------- PAY SLIP OF MONTH -------------
+@intents.handler("pay_slip_of_month")
+async def handle_pay_slip_of_month(intent, OfficeContent, Commonparam, text: str):
+    month_number, month_name = find_month(text)
+    if not month_number:
+        return {
+            "responseCode": "1003",
+            "responseData": "Month not found in text",
+            "message": "Please specify a valid month (e.g., January)",
+        }
+
+    periods, salary_slip = await payslips.salary_slip(OfficeContent, Commonparam, month_number)
+    if periods.error:
+        return {"responseCode": "1001", "responseData":"something went wrong","message": periods.error}
+
+    if not periods.has_period(month_number):
+        return {"responseCode": "0000","responseData":"Completed Successfully", "message": f"No payroll found for {month_name}"}
+
+    return {
+        "responseCode": "0000",
+        "responseData": "Completed successfully",
+        "message": f"Payslip for {month_name}",
+        "salary_slip": salary_slip,
+    }
+
+
+# ------------- APPLY LEAVE (multi-turn, no Rasa forms) -------------
+# handle_intent also routes here when the Rasa intent isn't apply_leave,
+# as long as there is a partial record for this uid.
+@intents.handler("apply_leave")
+async def handle_apply_leave(intent, OfficeContent, Commonparam, text: str):
+    uid = (OfficeContent or {}).get("uid") or "default"
+
+    draft = leave_drafts.get(uid) or LeaveDraft()
+    # Try to auto-fill from the incoming text if fields are missing
+    if draft.leave_id is None:
+        leave_id, leave_name = parse_leave_type(text)
+        if leave_id:
+            draft.leave_id = leave_id
+            draft.leave_name = leave_name
+
+    if draft.leave_from is None or draft.leave_to is None:
+        d1, d2 = extract_dates_from_text(text)
+        if d1 and d2:
+            draft.leave_from = fmt_date(d1)
+            draft.leave_to = fmt_date(d2)
+
+    if draft.reason is None:
+        # crude heuristic: anything after 'because' or 'reason' becomes reason
+        m = re.search(r"(?:because|reason is|reason)\s+(.+)", text, re.IGNORECASE)
+        if m:
+            draft.reason = m.group(1).strip()
+
+    # Persist the partial info
+    leave_drafts.put(uid, draft)
+
+
+    # All info is present → call API
+    try:
+        leave_from_dt = datetime.strptime(draft.leave_from, "%d/%m/%Y")
+        leave_to_dt = datetime.strptime(draft.leave_to, "%d/%m/%Y")
+    except Exception:
+        # If parsing failed, ask again
+        # (this can happen if user typed invalid date format)
+        draft.leave_from = None
+        draft.leave_to = None
+        leave_drafts.put(uid, draft)
+        return {
+            "responseCode": "1005",
+            "responseData": "Invalid date format",
+            "message": "Please resend dates in dd/mm/yyyy format (e.g., 20/08/2025 to 22/08/2025).",
+        }
+
+    if draft.leave_id is None:
+        # Keep the draft (dates included) until the leave type arrives
+        return {
+            "responseCode": "1006",
+            "responseData": "Leave type missing",
+            "message": "What type of leave would you like to apply for? Please choose from: "
+                       + ", ".join(name for _, _, name in LEAVE_TYPES) + ".",
+        }
+
+    payload = { 
+        "Mode": "save",
+        "LeaveID": draft.leave_id,
+        "Leavefrom": draft.leave_from,
+        "Leaveto": draft.leave_to,
+        "Offdaysfrom": draft.leave_from,
+        "Offdaysto": draft.leave_to,
+        "Noofleavedays": inclusive_days(leave_from_dt, leave_to_dt),
+        "Timemode": 1,
+        "Reason": "Medical leave",  # <-- hardcoded instead of info["fever"]
+        "Holiday": 0,
+        "Weekend": 0,
+        "Daysleaveclubbing": 0,
+        "LeavePolicyInstanceLimitID": 0,
+        "Returndate": fmt_date(leave_to_dt + timedelta(days=1)),
+        "Approvalstatus": "P",
+        "Firsthalf": 0,
+        "Lasthalf": 0,
+        "Roledeligation": 0,
+        "Contactaddress": "",
+        "Contactnumber": "",
+        "Salaryadvance": 0,
+        "IsNoticePeriod": 0,
+        "Passportrequest": 0,
+        "Roldleavetrantype": None,
+        "Duallaps": 0,
+        "Balancedaystofuture": 0,
+    }
+
+    api_result = await save_leave_application(OfficeContent, Commonparam, payload)
+    # cleanup after submit
+    leave_drafts.pop(uid)
+
+    return {
+        "responseCode": "0000",
+        "responseData": "Completed successfully",
+        "message": "Leave application submitted.",
+        "api_result": api_result,
+        "submitted": payload,
+    }
+
+
+# ------------- FALLBACK -------------
+@intents.fallback_handler
+async def handle_fallback(intent, OfficeContent, Commonparam, text: str):
+    if intent == "nlu_fallback":
+        return {
+            "responseCode": "0000",
+            "responseData": "Fallback triggered",
+            "message": "Sorry, I didn’t understand that. Can you rephrase?",
+        }
+
+    # Generic fallback
+    return {
+        "responseCode": "0002",
+        "responseData": "Fallback triggered",
+        "message": "Sorry, I didn’t understand that. Can you rephrase?",
+    }
@@ -0,0 +1,149 @@
+"""
+Intent -> handler registry used by handle_intent.
+
+Handlers are coroutines registered at import time with
+`@intents.handler("intent_name", ...)` and share handle_intent's signature:
+`(intent, OfficeContent, Commonparam, text)`. New HR intents plug in by
+registering a handler; the central dispatcher never changes.
+"""
+import calendar
+import logging
+import re
+import time
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+# -----------------------------
+# Month names
+# -----------------------------
+
+# Full names and abbreviations as one alternation trie, e.g. jan(?:uary)?
+MONTH_PATTERN = re.compile(
+    r"\b("
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+    r")\b",
+    re.IGNORECASE,
+)
+# calendar.month_name formats through strftime on every access, so snapshot it
+_MONTH_NAMES = list(calendar.month_name)
+_MONTH_BY_PREFIX = {name[:3].lower(): num for num, name in enumerate(_MONTH_NAMES) if name}
+_FULL_NAMES = {name.lower() for name in _MONTH_NAMES if name}
+# "may I ...", "may we ..." is the modal verb, never the month
+_MODAL_MAY = re.compile(r"may\s+(?:i|we|you|he|she|they|it)\b", re.IGNORECASE)
+
+
+def _month_rank(token: str) -> int:
+    # Full names beat abbreviations; a bare "may" is usually the modal verb
+    token = token.lower()
+    if token == "may":
+        return 2
+    return 0 if token in _FULL_NAMES else 1
+
+
+def find_month(text: str):
+    """
+    Returns (month_number, month_name) for the month mentioned in text, or
+    (None, None). Full month names win over abbreviations, and "may" only
+    counts when no other month is mentioned ("may I get my payslip for
+    march" is March) and it isn't followed by a pronoun ("may I get my
+    payslip" has no month); ties go to the first mention.
+    """
+    text = text or ""
+    tokens = [
+        m.group(1) for m in MONTH_PATTERN.finditer(text)
+        if not _MODAL_MAY.match(text, m.start())
+    ]
+    if not tokens:
+        return None, None
+    token = min(tokens, key=_month_rank)
+    number = _MONTH_BY_PREFIX[token[:3].lower()]
+    return number, _MONTH_NAMES[number]
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+
+class HandlerTiming:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "avg_ms": 1000 * self.total / self.calls if self.calls else 0.0,
+            "max_ms": 1000 * self.max,
+        }
+
+
+class IntentRegistry:
+    def __init__(self):
+        self._handlers = {}  # { intent: coroutine function }
+        self._timings = {}   # { handler name: HandlerTiming }
+        self._hooks = []     # callables (intent, handler_name, seconds)
+        self.fallback = None
+
+    def handler(self, *intents):
+        """
+        Decorator registering a coroutine for one or more intents.
+        """
+        def register(fn):
+            for intent in intents:
+                if intent in self._handlers:
+                    raise ValueError(f"Intent '{intent}' already has a handler")
+                self._handlers[intent] = fn
+            self._timings.setdefault(fn.__name__, HandlerTiming())
+            return fn
+        return register
+
+    def fallback_handler(self, fn):
+        self.fallback = fn
+        self._timings.setdefault(fn.__name__, HandlerTiming())
+        return fn
+
+    def add_timing_hook(self, hook):
+        """
+        Register `hook(intent, handler_name, seconds)`, called after every dispatch.
+        """
+        self._hooks.append(hook)
+
+    def get(self, intent):
+        return self._handlers.get(intent)
+
+    def __contains__(self, intent) -> bool:
+        return intent in self._handlers
+
+    async def dispatch(self, handler, intent, OfficeContent, Commonparam, text: str):
+        """
+        Run `handler` (as returned by get(), or the fallback) and record its timing.
+        """
+        handler = handler or self.fallback
+        start = time.perf_counter()
+        try:
+            return await handler(intent, OfficeContent, Commonparam, text)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._timings[handler.__name__].add(elapsed)
+            for hook in self._hooks:
+                try:
+                    hook(intent, handler.__name__, elapsed)
+                except Exception as e:
+                    logger.warning(f"Intent timing hook failed: {e}")
+
+    def stats(self) -> dict:
+        return {name: timing.as_dict() for name, timing in self._timings.items() if timing.calls}
+
+
+intents = IntentRegistry()
@@ -1,25 +1,296 @@
+"""
+Leave helpers: leave-type and date parsing for the chat flows, and the
+OfficeKit calls that read balances and submit applications.
+"""
 import json
-import httpx
+import logging
+import re
+from datetime import datetime, timedelta
+
+from officekit_client import get_officekit_client, request_url
+from response_cache import cached_post_json, response_cache
+
+logger = logging.getLogger("fastapi-rasa")
+
+BASE_URL = "http://10.25.25.124:82"
+
+# (keywords, backend LeaveID, display name). Adjust IDs to match your backend.
+LEAVE_TYPES = [
+    (["casual", "cl"], 1, "Casual Leave"),
+    (["sick", "sl", "medical"], 2, "Sick Leave"),
+    (["compensatory", "com"], 3, "Compensatory Leave"),
+    (["lop", "loss of pay"], 4, "Loss of Pay"),
+    (["earned", "el"], 5, "Earned Leave"),
+]
+
+def parse_leave_type(text: str):
+    """
+    Very simple leave-type mapper. Adjust IDs to match your backend.
+    """
+    text_l = text.lower()
+    for keywords, leave_id, name in LEAVE_TYPES:
+        if any(k in text_l for k in keywords):
+            return leave_id, name
+    return None, None
 
 async def apply_leave(OfficeContent: dict, Commonparam: dict):
     """
     Call the SaveLeaveApplication API to apply leave.
     """
     try:
-        base_url = "http://10.25.25.124:82"
-
-        url = (
-            f"{base_url}/api/AjaxAPI/SaveLeaveApplication"
-            f"?OfficeContent={json.dumps(OfficeContent)}"
-            f"&Commonparam={json.dumps(Commonparam)}"
+        response = await get_officekit_client().request(
+            "GET", {"Domain": BASE_URL}, "SaveLeaveApplication", OfficeContent, Commonparam
         )
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        response.raise_for_status()
+        return response.json()
 
     except Exception as e:
         return {"error": str(e)}
 
+# -----------------------------
+# Dates
+# -----------------------------
+
+def fmt_date(dt: datetime) -> str:
+    return dt.strftime("%d/%m/%Y")
+
+def parse_date_token(tok: str):
+    """
+    Try to parse a single date token like 20/08/2025 or 20-08-2025
+    Returns datetime or None.
+    """
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y"):
+        try:
+            return datetime.strptime(tok, fmt)
+        except Exception:
+            pass
+    return None
+
+def extract_dates_from_text(text: str):
+    """
+    Extract 0/1/2 dates (From, To) from free text.
+    Supports dd/mm/yyyy or dd-mm-yyyy, plus 'today' / 'tomorrow'.
+    If only 1 date found -> From=To=that date.
+    Returns (from_dt, to_dt) or (None, None) if nothing found.
+    """
+    text_lower = text.lower()
+
+    # today/tomorrow quick checks
+    if "today" in text_lower:
+        d = datetime.today()
+        return d, d
+    if "tomorrow" in text_lower:
+        d = datetime.today() + timedelta(days=1)
+        return d, d
+
+    # regex for dd/mm/yyyy or dd-mm-yyyy
+    raw_dates = re.findall(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b", text)
+    parsed = [parse_date_token(d) for d in raw_dates]
+    parsed = [d for d in parsed if d is not None]
+
+    if len(parsed) >= 2:
+        return parsed[0], parsed[1]
+    elif len(parsed) == 1:
+        return parsed[0], parsed[0]
+    else:
+        return None, None
+
+def inclusive_days(from_dt: datetime, to_dt: datetime) -> int:
+    return (to_dt.date() - from_dt.date()).days + 1
+
+
+def parse_leave_date(text: str) -> str | None:
+    """Simple date parser with basic relative date handling"""
+    if not text:
+        return None
+
+    text = text.strip().lower()
+    now = datetime.now()  # More accurate than today()
+
+    if text == "today":
+        return now.strftime("%m/%d/%Y")
+    elif text == "tomorrow":
+        return (now + timedelta(days=1)).strftime("%m/%d/%Y")
+
+    try:
+        for fmt in ["%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d", "%m-%d-%Y"]:
+            try:
+                dt = datetime.strptime(text, fmt)
+                return dt.strftime("%m/%d/%Y")
+            except ValueError:
+                continue
+    except Exception:
+        pass
+
+    return None
+
+
+# -----------------------------
+# Backend API helpers
+# -----------------------------
+
+#API TO CALL LEAVE SUBMIT API
+async def submit_leave_application(
+    OfficeContent: dict,
+    Commonparam: dict,
+    leave_type: str,
+    leave_to: str,
+    reason: str
+):
+    Commonparamforleavelist = {"Description": "leavelistApp"}
+
+    response = await get_officekit_client().post(
+        Commonparam, "Leavecompilation", OfficeContent, Commonparamforleavelist
+    )
+
+     
+
+
+      
+    # ✅ sanitize Commonparam first
+    allowed_keys = {
+        "Mode", "LeaveID", "Leavefrom", "Leaveto", "Offdaysfrom", "Offdaysto",
+        "Noofleavedays", "Timemode", "Reason", "Holiday", "Weekend",
+        "Daysleaveclubbing", "LeavePolicyInstanceLimitID", "Returndate",
+        "Approvalstatus", "Firsthalf", "Lasthalf", "Roledeligation",
+        "Contactaddress", "Contactnumber", "Salaryadvance", "IsNoticePeriod",
+        "Passportrequest", "Roldleavetrantype", "Duallaps", "Balancedaystofuture"
+    }
+    cp = {k: v for k, v in (Commonparam or {}).items() if k in allowed_keys}
+
+    # Build Commonparam payload (leave_from == leave_to)
+    cp.update({
+        "Mode": "save",
+        "LeaveID": 2,   # map to backend leave ID if required
+        "Leavefrom": leave_to,
+        "Leaveto": leave_to,
+        "Offdaysfrom": leave_to,
+        "Offdaysto": leave_to,
+        "Noofleavedays": 1,
+        "Timemode": 1,
+        "Reason": reason,
+        "Holiday": 0,
+        "Weekend": 0,
+        "Daysleaveclubbing": 0,
+        "LeavePolicyInstanceLimitID": 0,
+        "Returndate": leave_to,
+        "Approvalstatus": "P",
+        "Firsthalf": 0,
+        "Lasthalf": 0,
+        "Roledeligation": 0,
+        "Contactaddress": "",
+        "Contactnumber": "",
+        "Salaryadvance": 0,
+        "IsNoticePeriod": 0,
+        "Passportrequest": 0,
+        "Roldleavetrantype": None,
+        "Duallaps": 0,
+        "Balancedaystofuture": 0,
+    })
+
+    # Build full URL with query params
+    url = request_url(Commonparam, "SaveLeaveApplication", OfficeContent, cp)
+    print("📤 Request URL:", url)
+    logger.info(f"📤 Request URL: {url}")
+
+
+    # POST without body (all in query string)
+    response = await get_officekit_client().post(Commonparam, "SaveLeaveApplication", OfficeContent, cp)
+    print("🔎 Raw Response Text:", response.text)
+
+    if response.status_code == 200:
+        # The balance shown by Leavecompilation is now out of date
+        response_cache.invalidate(Commonparam, OfficeContent, "Leavecompilation")
+        try:
+            data = response.json()
+            if isinstance(data, str):
+                data = json.loads(data)
+
+            return {
+                "responseCode": "0000",
+                "responseData": "Leave application submitted successfully",
+                "api_result": data,
+                "submitted": cp,   # debug payload
+            }
+        except Exception as e:
+            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
+    else:
+        return {
+            "responseCode": str(response.status_code),
+            "responseData": "Failed to submit leave application",
+            "details": response.text,
+        }
+
+
+
+
+
+
+
+async def fetch_leave_summary(OfficeContent: dict, Commonparam: dict):
+    result = await cached_post_json(Commonparam, "Leavecompilation", OfficeContent, Commonparam)
+
+    if result.status_code == 200:
+        try:
+            if result.error:
+                raise ValueError(result.error)
+            data = result.data
+            filtered = [
+                {"LeaveCode": item.get("Description"), "LeaveBalance": item.get("LeaveBalance")}
+                for item in data if isinstance(item, dict)
+            ]
+            return {
+                "responseCode": "0000",
+                "responseData": "Completed successfully",
+                "leave_summary": filtered,
+            }
+        except Exception as e:
+            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
+    else:
+        return {
+            "responseCode": str(result.status_code),
+            "responseData": "Failed to fetch leave compilation",
+            "details": result.text,
+        }
+
+
+def format_leave_response(leave_data, code, leave_name):
+    leave = next(
+        (item for item in leave_data.get("leave_summary", []) if item.get("LeaveCode") == leave_name),
+        None,
+    )
+    if leave:
+        return {
+            "responseCode": "0000",
+            "responseData": "Completed successfully",
+            "message": f"You have {leave['LeaveBalance']} {leave_name} left",
+        }
+    else:
+        return {
+            "responseCode": "0001",
+            "responseData": "Something went wrong",
+            "message": f"{leave_name} not found",
+        }
+
+async def save_leave_application(OfficeContent: dict, Commonparam: dict, payload: dict):
+    """
+    Calls SaveLeaveApplication with payload merged into Commonparam.
+    """
+    cp = dict(Commonparam or {})
+    cp.update(payload)
+    url = request_url(Commonparam, "SaveLeaveApplication", OfficeContent, cp)
+
+    resp = await get_officekit_client().post(Commonparam, "SaveLeaveApplication", OfficeContent, cp)
+    print(f"apply leave request {url}")
+    if resp.status_code == 200:
+        response_cache.invalidate(Commonparam, OfficeContent, "Leavecompilation")
+
+
+    try:
+        data = resp.json()
+        if isinstance(data, str):
+            data = json.loads(data)
+    except Exception:
+        data = {"status_code": resp.status_code, "raw": resp.text}
 
+    return data
@@ -1,32 +1,48 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from pydantic import BaseModel
-from rasa.core.agent import Agent
-from rasa.model import get_latest_model
-import whisper
-import tempfile
-import shutil
-import os
-import httpx
+"""
+FastAPI entry point: the app, its startup/shutdown hooks and endpoints.
+
+The heavy stacks (Rasa/TensorFlow, Whisper/torch, sentence-transformers,
+Flan-T5, FAISS, pdfplumber) are imported by the component loaders, not at
+module import, so `import main` stays fast for every worker spawn and test
+run; benchmarks/bench_import_time.py guards that.
+
+  rasa_agent.py       the Rasa agent, tracker store and form cancel
+  audio_pipeline.py   voice note decoding and transcription
+  policy_rag.py       policy question answering
+  intent_handlers.py  intents answered outside Rasa's dialogue policies
+  leave_service.py    leave/date parsing and the leave OfficeKit calls
+"""
+import asyncio
 import json
-from datetime import datetime, timedelta
-import calendar
-import re
-from rasa.core.channels.channel import UserMessage
-from rasa.core.channels.channel import CollectingOutputChannel
-from rasa.shared.core.events import SlotSet, AllSlotsReset
 import logging
+import secrets
+import time
 from logging.handlers import RotatingFileHandler
-from datetime import datetime
-import time# pip install dateparser
-import pdfplumber
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from transformers import pipeline
-import uvicorn
-
 
+import httpx
+from fastapi import FastAPI, File, Form, Header, Request, UploadFile
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 
-os.environ["PATH"] += os.pathsep + r"C:\ffmpeg\bin"
+import audio_pipeline
+import policy_rag
+import rasa_agent
+import settings
+from audio_pipeline import AudioRejected, audio_stats, load_speech, warm_up_speech
+from components import ComponentUnavailable, components
+from conversation_state import leave_drafts
+from executors import PoolSaturated, executor_stats, run_in, shutdown_executors
+from intent_handlers import handle_intent
+from intent_registry import intents
+from leave_service import parse_leave_date, submit_leave_application
+from nlu_service import nlu
+from officekit_client import close_officekit_client, get_officekit_client, start_officekit_client
+from payslip import payslips
+from policy_answer_cache import policy_answers
+from policy_extractive import policy_tiers
+from policy_rag import build_policy_store, warm_up_policy, watch_policy_documents
+from rasa_agent import cancel_form, load_agent, warm_up_agent
+from response_cache import response_cache
 
 logger = logging.getLogger("fastapi-rasa")
 logger.setLevel(logging.INFO)
@@ -53,689 +69,190 @@ logger.info("🚀 Logging initialized. FastAPI starting...")
 
 app = FastAPI()
 
-agent = None
-whisper_model = None
-
 class InputText(BaseModel):
     text: str
     OfficeContent: dict
     Commonparam: dict
 
-# In-memory multi-turn state for leave flow (keyed by user uid)
-leave_requests = {}  # { uid: { step, LeaveID, Leavefrom, Leaveto, Reason } }
-
-# -----------------------------
-# Utilities
-# -----------------------------
-
-def build_base_url(commonparam: dict) -> str:
-    """
-    Returns a base URL that safely points to the AjaxAPI root.
-    Accepts either:
-      - http://host:port             -> expands to http://host:port/api/AjaxAPI
-      - http://host:port/api/AjaxAPI -> used as-is
-    """
-    base = (commonparam or {}).get("Domain", "").rstrip("/")
-    if not base:
-        raise ValueError("Commonparam['Domain'] is required.")
-    # Detect if already pointing to AjaxAPI
-    lowered = base.lower()
-    if lowered.endswith("/api/ajaxapi"):
-        return base
-    # If it doesn't look like an API root, append
-    if "/api/" not in lowered:
-        return base + "/api/AjaxAPI"
-    return base  # assume caller passed a valid API root like /api/AjaxAPI
-
-def api_url(commonparam: dict, endpoint: str) -> str:
-    return f"{build_base_url(commonparam).rstrip('/')}/{endpoint.lstrip('/')}"
-
-def fmt_date(dt: datetime) -> str:
-    return dt.strftime("%d/%m/%Y")
-
-def parse_date_token(tok: str):
-    """
-    Try to parse a single date token like 20/08/2025 or 20-08-2025
-    Returns datetime or None.
-    """
-    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y"):
-        try:
-            return datetime.strptime(tok, fmt)
-        except Exception:
-            pass
-    return None
-
-def extract_dates_from_text(text: str):
-    """
-    Extract 0/1/2 dates (From, To) from free text.
-    Supports dd/mm/yyyy or dd-mm-yyyy, plus 'today' / 'tomorrow'.
-    If only 1 date found -> From=To=that date.
-    Returns (from_dt, to_dt) or (None, None) if nothing found.
-    """
-    text_lower = text.lower()
-
-    # today/tomorrow quick checks
-    if "today" in text_lower:
-        d = datetime.today()
-        return d, d
-    if "tomorrow" in text_lower:
-        d = datetime.today() + timedelta(days=1)
-        return d, d
-
-    # regex for dd/mm/yyyy or dd-mm-yyyy
-    raw_dates = re.findall(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b", text)
-    parsed = [parse_date_token(d) for d in raw_dates]
-    parsed = [d for d in parsed if d is not None]
-
-    if len(parsed) >= 2:
-        return parsed[0], parsed[1]
-    elif len(parsed) == 1:
-        return parsed[0], parsed[0]
-    else:
-        return None, None
-
-def parse_leave_type(text: str):
-    """
-    Very simple leave-type mapper. Adjust IDs to match your backend.
-    """
-    text_l = text.lower()
-    mapping = [
-        (["casual", "cl"], 1, "Casual Leave"),
-        (["sick", "sl", "medical"], 2, "Sick Leave"),
-        (["compensatory", "com"], 3, "Compensatory Leave"),
-        (["lop", "loss of pay"], 4, "Loss of Pay"),
-        (["earned", "el"], 5, "Earned Leave"),
-    ]
-    for keywords, leave_id, name in mapping:
-        if any(k in text_l for k in keywords):
-            return leave_id, name
-    return None, None
-
-def inclusive_days(from_dt: datetime, to_dt: datetime) -> int:
-    return (to_dt.date() - from_dt.date()).days + 1
+# Multi-turn state for the leave flow lives in conversation_state.leave_drafts (keyed by uid)
 
 # -----------------------------
 # Startup
 # -----------------------------
 
-@app.on_event("startup")
-def load_model():
-    global agent, whisper_model
-    try:
-        model_path = get_latest_model()
-        print(f"📦 Loading Rasa model from {model_path}")
-        logger.info("Loading the rasa moodel")
-
-        agent = Agent.load(model_path)
-        
-    except Exception as e:
-        print(f"❌ Failed to load Rasa model: {e}")
-        agent = None
-
-    try:
-        print("🎙 Loading Whisper model...")
-        whisper_model = whisper.load_model("tiny")
-        # whisper_model = whisper.load_model("small")
-    except Exception as e:
-        print(f"❌ Failed to load Whisper model: {e}")
-        whisper_model = None
-
-
-    try:
-        build_policy_store("documents/ocompanypolicy.pdf")
-    except Exception as e:
-        print(f"❌ Failed to build policy store: {e}")
-   
-
-        
-
-# -----------------------------
-# Backend API helpers
-# -----------------------------
-
-#API TO CALL LEAVE SUBMIT API
-async def submit_leave_application(
-    OfficeContent: dict,
-    Commonparam: dict,
-    leave_type: str,
-    leave_to: str,
-    reason: str
-):
-    Commonparamforleavelist = {"Description": "leavelistApp"}
-
-    url = api_url(Commonparam, "Leavecompilation")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(Commonparamforleavelist)}"
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
+# Each loader is a component (see the registrations at the end of the file);
+# they load concurrently in background threads and requests wait only for
+# the components they use.
 
-     
+@app.on_event("startup")
+def start_components():
+    # Already-loaded components (serve.py loads the shared ones before forking) are skipped
+    components.start()
 
 
-      
-    # ✅ sanitize Commonparam first
-    allowed_keys = {
-        "Mode", "LeaveID", "Leavefrom", "Leaveto", "Offdaysfrom", "Offdaysto",
-        "Noofleavedays", "Timemode", "Reason", "Holiday", "Weekend",
-        "Daysleaveclubbing", "LeavePolicyInstanceLimitID", "Returndate",
-        "Approvalstatus", "Firsthalf", "Lasthalf", "Roledeligation",
-        "Contactaddress", "Contactnumber", "Salaryadvance", "IsNoticePeriod",
-        "Passportrequest", "Roldleavetrantype", "Duallaps", "Balancedaystofuture"
-    }
-    cp = {k: v for k, v in (Commonparam or {}).items() if k in allowed_keys}
-
-    # Build Commonparam payload (leave_from == leave_to)
-    cp.update({
-        "Mode": "save",
-        "LeaveID": 2,   # map to backend leave ID if required
-        "Leavefrom": leave_to,
-        "Leaveto": leave_to,
-        "Offdaysfrom": leave_to,
-        "Offdaysto": leave_to,
-        "Noofleavedays": 1,
-        "Timemode": 1,
-        "Reason": reason,
-        "Holiday": 0,
-        "Weekend": 0,
-        "Daysleaveclubbing": 0,
-        "LeavePolicyInstanceLimitID": 0,
-        "Returndate": leave_to,
-        "Approvalstatus": "P",
-        "Firsthalf": 0,
-        "Lasthalf": 0,
-        "Roledeligation": 0,
-        "Contactaddress": "",
-        "Contactnumber": "",
-        "Salaryadvance": 0,
-        "IsNoticePeriod": 0,
-        "Passportrequest": 0,
-        "Roldleavetrantype": None,
-        "Duallaps": 0,
-        "Balancedaystofuture": 0,
-    })
-
-    # Build full URL with query params
-    url = api_url(Commonparam, "SaveLeaveApplication")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(cp)}"
-    print("📤 Request URL:", url)
-    logger.info(f"📤 Request URL: {url}")
-
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, timeout=30.0)  # POST without body (all in query string)
-        print("🔎 Raw Response Text:", response.text)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):
-                data = json.loads(data)
-
-            return {
-                "responseCode": "0000",
-                "responseData": "Leave application submitted successfully",
-                "api_result": data,
-                "submitted": cp,   # debug payload
-            }
-        except Exception as e:
-            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
-    else:
-        return {
-            "responseCode": str(response.status_code),
-            "responseData": "Failed to submit leave application",
-            "details": response.text,
-        }
+@app.on_event("startup")
+async def start_http_clients():
+    start_officekit_client()
 
 
+_nlu_batching_task = None
 
 
+@app.on_event("startup")
+async def start_nlu_batching():
+    global _nlu_batching_task
+    if settings.NLU_BATCHING:
+        _nlu_batching_task = asyncio.create_task(_enable_nlu_batching())
 
 
+async def _enable_nlu_batching():
+    if await components.get("rasa").wait():
+        await nlu.enable_batching(rasa_agent.agent)
 
-async def fetch_payroll_periods(OfficeContent: dict, Commonparam: dict):
-    Commonparam = dict(Commonparam or {})
-    Commonparam["AddNextYear"] = "2025"
 
-    url = api_url(Commonparam, "FillPayRollPeriod")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(Commonparam)}"
-    print("📤 Request URL:", url)
+_policy_watcher = None
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
-        print("🔎 Raw Response Text:", response.text)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):
-                data = json.loads(data)
-            return data
-        except Exception as e:
-            return {"error": f"Failed to parse JSON: {e}"}
-    else:
-        return {"error": f"Failed to fetch payroll periods: {response.text}"}
-
-async def fetch_salary_slip(OfficeContent: dict, ProcessPayRollID: int, Commonparam: dict):
-    # Only pass ProcessPayRollID to Commonparam for this API
-    cp = {"ProcessPayRollID": ProcessPayRollID}
-    url = api_url(Commonparam, "GetSalarySlip")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(cp)}"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
-        print("🔎 Raw Response Text:", response.text)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):
-                data = json.loads(data)
-            return data
-        except Exception as e:
-            return {"error": f"Failed to parse JSON: {e}"}
-    else:
-        return {"error": f"Failed to fetch salary slip: {response.text}"}
-
-async def fetch_leave_summary(OfficeContent: dict, Commonparam: dict):
-    url = api_url(Commonparam, "Leavecompilation")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(Commonparam)}"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):
-                data = json.loads(data)
-            filtered = [
-                {"LeaveCode": item.get("Description"), "LeaveBalance": item.get("LeaveBalance")}
-                for item in data if isinstance(item, dict)
-            ]
-            return {
-                "responseCode": "0000",
-                "responseData": "Completed successfully",
-                "leave_summary": filtered,
-            }
-        except Exception as e:
-            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
-    else:
-        return {
-            "responseCode": str(response.status_code),
-            "responseData": "Failed to fetch leave compilation",
-            "details": response.text,
-        }
-    
-
-#fetch policy data
-
-async def fetch_policy_data(OfficeContent: dict, Commonparam: dict):
-    url = api_url(Commonparam, "GetForm_PolicyData")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(Commonparam)}"
-    print("📤 Request URL:", url)
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
-        print("🔎 Raw Response Text:", response.text)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):  # sometimes backend double-encodes JSON
-                data = json.loads(data)
-
-            return {
-                "responseCode": "0004",
-                "responseData": "Completed successfully",
-                "policy": data,   
-            }
-        except Exception as e:
-            return {
-                "responseCode": "1002",
-                "responseData": f"Failed to parse JSON: {e}",
-                "raw": response.text,   # keep raw text for debugging
-            }
-    else:
-        return {
-            "responseCode": str(response.status_code),
-            "responseData": "Failed to fetch policy data",
-            "details": response.text,
-        }
-    
 
+@app.on_event("startup")
+async def start_policy_watcher():
+    global _policy_watcher
+    if settings.POLICY_WATCH_INTERVAL > 0:
+        _policy_watcher = asyncio.create_task(watch_policy_documents())
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    if _policy_watcher:
+        _policy_watcher.cancel()
+    if _nlu_batching_task:
+        _nlu_batching_task.cancel()
+    await close_officekit_client()
+    nlu.disable_batching()
+    if rasa_agent.tracker_store is not None:
+        rasa_agent.tracker_store.close()
+    leave_drafts.close()
+    shutdown_executors()
+
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated(request, exc: PoolSaturated):
+    logger.warning(f"Rejecting {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": "5"},
+        content={
+            "responseCode": "429",
+            "responseData": "Busy",
+            "message": "⚠️ I'm handling a lot of requests right now. Please try again in a few seconds.",
+        },
+    )
 
 
-async def fetch_upcoming_holidays(OfficeContent: dict, Commonparam: dict):
-    cp = dict(Commonparam or {})
-    cp["CurYear"] = str(datetime.now().year)
-
-    url = api_url(Commonparam, "GetHolidayList")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(cp)}"
-    print("📤 Request URL:", url)
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url)
-        print("🔎 Raw Response Text:", response.text)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            if isinstance(data, str):
-                data = json.loads(data)
-
-            today = datetime.today().date()
-            upcoming = []
-            for item in data:
-                try:
-                    from_date = datetime.strptime(item.get("FromDate"), "%d/%m/%Y").date()
-                    if from_date >= today:
-                        upcoming.append({
-                            "Holiday_Name": item.get("Holiday_Name"),
-                            "FromDate": item.get("FromDate"),
-                            "ToDate": item.get("ToDate"),
-                            "RestrictedHoliday": item.get("RestrictedHoliday"),
-                            "PayType": item.get("PayType"),
-                            "Location": item.get("Location"),
-                        })
-                except Exception:
-                    continue
-
-            return {
-                "responseCode": "0000",
-                "responseData": "Completed successfully",
-                "upcoming_holidays": upcoming,
-            }
-        except Exception as e:
-            return {"responseCode": "1002", "responseData": f"Failed to parse JSON: {e}"}
-    else:
-        return {
-            "responseCode": str(response.status_code),
-            "responseData": "Failed to fetch holiday list",
-            "details": response.text,
-        }
 
-def format_leave_response(leave_data, code, leave_name):
-    leave = next(
-        (item for item in leave_data.get("leave_summary", []) if item.get("LeaveCode") == leave_name),
-        None,
+@app.exception_handler(ComponentUnavailable)
+async def component_unavailable(request, exc: ComponentUnavailable):
+    logger.warning(f"Rejecting {request.url.path}: {exc}")
+    starting = exc.state != "failed"
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "10"} if starting else {},
+        content={
+            "responseCode": "503",
+            "responseData": "Unavailable",
+            "message": "⚠️ I'm still starting up. Please try again in a few seconds."
+            if starting else "⚠️ This feature is not available right now.",
+        },
     )
-    if leave:
-        return {
-            "responseCode": "0000",
-            "responseData": "Completed successfully",
-            "message": f"You have {leave['LeaveBalance']} {leave_name} left",
-        }
-    else:
-        return {
-            "responseCode": "0001",
-            "responseData": "Something went wrong",
-            "message": f"{leave_name} not found",
-        }
 
-async def save_leave_application(OfficeContent: dict, Commonparam: dict, payload: dict):
-    """
-    Calls SaveLeaveApplication with payload merged into Commonparam.
-    """
-    cp = dict(Commonparam or {})
-    cp.update(payload)
-    url = api_url(Commonparam, "SaveLeaveApplication")
-    url = f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(cp)}"
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url)
-        print(f"apply leave request {url}")
 
+@app.exception_handler(AudioRejected)
+async def audio_rejected(request, exc: AudioRejected):
+    logger.info(f"Rejecting voice note: {exc}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "responseCode": str(exc.status_code),
+            "responseData": "Rejected",
+            "message": f"⚠️ {exc}",
+        },
+    )
 
-    try:
-        data = resp.json()
-        if isinstance(data, str):
-            data = json.loads(data)
-    except Exception:
-        data = {"status_code": resp.status_code, "raw": resp.text}
-
-    return data
 
 # -----------------------------
-# Intent handler
+# Endpoints
 # -----------------------------
 
-async def handle_intent(intent, OfficeContent, Commonparam, text: str):
-    # If a leave flow is ongoing for this uid, continue it regardless of intent misclassifications
-    uid = (OfficeContent or {}).get("uid") or "default"
-
-    # --- Leave-related map used elsewhere ---
-    leave_map = {
-        "available_casual_leaves": ("CL", "Casual Leave"),
-        "available_com_leaves": ("COM", "Compensatory Leave"),
-        "available_sl_leaves": ("SL", "Sick Leave"),
-        "available_lop_leaves": ("LOP", "Loss of Pay"),
-        "available_ent_leaves": ("ENT", "Electricity And Network Trouble Leave"),
-    }
-
-    # ---------------- GREET ----------------
-    if intent == "greet":
-        return {"responseCode": "0000", "responseData": "Completed successfully", "message": "Hi, how can I help you?"}
-
-    # ------------- UPCOMING HOLIDAYS -------------
-    if intent == "upcoming_holidays":
-        return await fetch_upcoming_holidays(OfficeContent, Commonparam)
-    
-
-
-    if intent == "policy_data":
-      
-      #return await fetch_policy_data(OfficeContent, Commonparam)
-     user_q = text
-     try:
-        answer, pages = answer_policy_question(user_q)
-        if not answer:
-            bot_message = "Sorry, I couldn’t find anything in the company policy."
-        else:
-            src_txt = f" (see page {', '.join(map(str, pages))})" if pages else ""
-            bot_message = f"{answer}{src_txt}"
-     except Exception as e:
-        print(f"RAG error: {e}")
-        bot_message = "⚠️ Sorry, I couldn't look that up right now."
-
-     return {
-        "responseCode": "0000",
-        "responseData": "success",
-        "message": bot_message,
-        "slots": {}
-     }
-
-    if intent == "bot_features":
-     return {"responseCode": "0000", "responseData": "Completed successfully",     "message": "I can help you with viewing your payslip, applying for leave, checking company policies, upcoming holidays, and your remaining leave balance."
-      }
-
-
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
 
-    # ------------- LEAVE SUMMARY -------------
-    if intent == "available_leaves":
-        return await fetch_leave_summary(OfficeContent, Commonparam)
 
-    if intent in leave_map:
-        leave_data = await fetch_leave_summary(OfficeContent, Commonparam)
-        code, name = leave_map[intent]
-        return format_leave_response(leave_data, code, name)
-
-    # ------------- PAY SLIP (LATEST) -------------
-    if intent == "pay_slip":
-        payroll_periods = await fetch_payroll_periods(OfficeContent, Commonparam)
-        if isinstance(payroll_periods, dict) and payroll_periods.get("error"):
-            return {"responseCode": "1001", "responseData": payroll_periods["error"]}
-
-        first_period = payroll_periods[0] if payroll_periods else None
-        if not first_period:
-            return {"responseCode": "1004", "responseData": "No payroll periods found"}
-
-        process_id = first_period.get("ProcessPayRollID")
-        salary_slip = await fetch_salary_slip(OfficeContent, process_id, Commonparam)
-        return {
-            "responseCode": "0000",
-            "responseData": "Completed successfully",
-            "message": "Last generated payslip",
-            "salary_slip": salary_slip,
-        }
-    
-
-
-
-
-
-
-    # ------------- PAY SLIP OF MONTH -------------
-    if intent == "pay_slip_of_month":
-        # collect month names + abbreviations
-        months = [m.lower() for m in calendar.month_name if m] + [m.lower() for m in calendar.month_abbr if m]
-        month_found = None
-        t_low = text.lower()
-        for m in months:
-            if m and m in t_low:
-                month_found = m
-                break
-
-        if not month_found:
-            return {
-                "responseCode": "1003",
-                "responseData": "Month not found in text",
-                "message": "Please specify a valid month (e.g., January)",
-            }
-
-        # convert name/abbr to number
-        try:
-            month_number = list(calendar.month_name).index(month_found.capitalize())
-        except ValueError:
-            month_number = list(calendar.month_abbr).index(month_found.capitalize())
-
-        payroll_periods = await fetch_payroll_periods(OfficeContent, Commonparam)
-        if isinstance(payroll_periods, dict) and payroll_periods.get("error"):
-            return {"responseCode": "1001", "responseData":"something went wrong","message": payroll_periods["error"]}
-
-        target_period = next((p for p in payroll_periods if p.get("Payrollmonth") == month_number), None)
-        if not target_period:
-            return {"responseCode": "0000","responseData":"Completed Successfully", "message": f"No payroll found for {month_found.capitalize()}"}
-
-        process_id = target_period["ProcessPayRollID"]
-        salary_slip = await fetch_salary_slip(OfficeContent, process_id, Commonparam)
+@app.get("/health/ready")
+async def health_ready():
+    """
+    200 once the critical components are loaded and warmed up, 503 until then.
+    """
+    ready, status = components.readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "components": status})
 
-        return {
-            "responseCode": "0000",
-            "responseData": "Completed successfully",
-            "message": f"Payslip for {month_found.capitalize()}",
-            "salary_slip": salary_slip,
-        }
 
-    # ------------- APPLY LEAVE (multi-turn, no Rasa forms) -------------
-    # Continue an ongoing leave flow even if Rasa intent isn't apply_leave,
-    # as long as there is a partial record for this uid.
-    if intent == "apply_leave" or uid in leave_requests:
-        info = leave_requests.get(uid, {})
-        # Try to auto-fill from the incoming text if fields are missing
-        if "LeaveID" not in info:
-            leave_id, leave_name = parse_leave_type(text)
-            if leave_id:
-                info["LeaveID"] = leave_id
-                info["LeaveName"] = leave_name
-
-        if "Leavefrom" not in info or "Leaveto" not in info:
-            d1, d2 = extract_dates_from_text(text)
-            if d1 and d2:
-                info["Leavefrom"] = fmt_date(d1)
-                info["Leaveto"] = fmt_date(d2)
-
-        if "Reason" not in info:
-            # crude heuristic: anything after 'because' or 'reason' becomes reason
-            m = re.search(r"(?:because|reason is|reason)\s+(.+)", text, re.IGNORECASE)
-            if m:
-                info["Reason"] = m.group(1).strip()
-
-        # Persist the partial info
-        leave_requests[uid] = info
-
-
-        # All info is present → call API
-        try:
-            leave_from_dt = datetime.strptime(info["Leavefrom"], "%d/%m/%Y")
-            leave_to_dt = datetime.strptime(info["Leaveto"], "%d/%m/%Y")
-        except Exception:
-            # If parsing failed, ask again
-            # (this can happen if user typed invalid date format)
-            info.pop("Leavefrom", None)
-            info.pop("Leaveto", None)
-            leave_requests[uid] = info
-            return {
-                "responseCode": "1005",
-                "responseData": "Invalid date format",
-                "message": "Please resend dates in dd/mm/yyyy format (e.g., 20/08/2025 to 22/08/2025).",
-            }
-
-        payload = { 
-            "Mode": "save",
-            "LeaveID": info["LeaveID"],
-            "Leavefrom": info["Leavefrom"],
-            "Leaveto": info["Leaveto"],
-            "Offdaysfrom": info["Leavefrom"],
-            "Offdaysto": info["Leaveto"],
-            "Noofleavedays": inclusive_days(leave_from_dt, leave_to_dt),
-            "Timemode": 1,
-            "Reason": "Medical leave",  # <-- hardcoded instead of info["fever"]
-            "Holiday": 0,
-            "Weekend": 0,
-            "Daysleaveclubbing": 0,
-            "LeavePolicyInstanceLimitID": 0,
-            "Returndate": fmt_date(leave_to_dt + timedelta(days=1)),
-            "Approvalstatus": "P",
-            "Firsthalf": 0,
-            "Lasthalf": 0,
-            "Roledeligation": 0,
-            "Contactaddress": "",
-            "Contactnumber": "",
-            "Salaryadvance": 0,
-            "IsNoticePeriod": 0,
-            "Passportrequest": 0,
-            "Roldleavetrantype": None,
-            "Duallaps": 0,
-            "Balancedaystofuture": 0,
-        }
+@app.get("/metrics")
+async def metrics():
+    return {
+        "components": components.readiness()[1],
+        "officekit": get_officekit_client().stats(),
+        "response_cache": response_cache.stats(),
+        "payslips": payslips.stats(),
+        "intent_handlers": intents.stats(),
+        "nlu": nlu.stats(),
+        "trackers": rasa_agent.tracker_store.stats() if rasa_agent.tracker_store else {},
+        "leave_drafts": leave_drafts.stats(),
+        "executors": executor_stats(),
+        "audio": audio_pipeline.transcriber.stats() if audio_pipeline.transcriber else audio_stats.as_dict(),
+        "policy_answers": policy_answers.stats(),
+        "policy_tiers": policy_tiers.as_dict(),
+        "policy_index": policy_rag.index_status(),
+    }
 
-        api_result = await save_leave_application(OfficeContent, Commonparam, payload)
-        # cleanup after submit
-        leave_requests.pop(uid, None)
 
-        return {
-            "responseCode": "0000",
-            "responseData": "Completed successfully",
-            "message": "Leave application submitted.",
-            "api_result": api_result,
-            "submitted": payload,
-        }
-
-    # ------------- FALLBACK -------------
-    if intent == "nlu_fallback":
-        return {
-            "responseCode": "0000",
-            "responseData": "Fallback triggered",
-            "message": "Sorry, I didn’t understand that. Can you rephrase?",
-        }
+@app.post("/admin/policy/reload")
+async def reload_policy_index(x_admin_token: str = Header(default="")):
+    """
+    Re-sync the policy index with the documents directory in the background;
+    chat keeps answering from the current index until the new one is ready.
 
-    # Generic fallback
-    return {
-        "responseCode": "0002",
-        "responseData": "Fallback triggered",
-        "message": "Sorry, I didn’t understand that. Can you rephrase?",
-    }
+    Under serve.py with several workers this re-syncs only the worker that
+    got the request; the others follow through their own document watcher
+    (POLICY_WATCH_INTERVAL), loading the cache entries this one wrote.
+    """
+    if not settings.ADMIN_TOKEN:
+        return JSONResponse(
+            status_code=404,
+            content={"responseCode": "404", "responseData": "Not Found", "message": "Admin endpoints are disabled"},
+        )
+    if not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        return JSONResponse(
+            status_code=403,
+            content={"responseCode": "403", "responseData": "Forbidden", "message": "Invalid admin token"},
+        )
+    # Loads a lazy or still-loading policy component through the registry
+    # (503 until it is ready), so the models are never loaded behind its back
+    await components.require("policy")
+    changes = await run_in("index", build_policy_store)
+    return {"responseCode": "0000", "responseData": "Policy index reloaded", **changes}
 
-# -----------------------------
-# Endpoints
-# -----------------------------
 
 
 
 @app.post("/analyze-old/")
 async def analyze_rasa(input: InputText):
+    await components.require("rasa")
+    from rasa.core.channels.channel import UserMessage
+
+    agent = rasa_agent.agent
     sender_id = input.OfficeContent.get("uid", "default_user")
 
-    nlu_result = await agent.parse_message(input.text)
+    nlu_result = await nlu.parse(agent, input.text)
     intent = nlu_result.get("intent", {}).get("name")
 
     if intent != "apply_leave":
@@ -804,11 +321,15 @@ async def analyze_rasa(input: InputText):
 
 @app.post("/analyze/")
 async def analyze_rasa(input: InputText):
+    await components.require("rasa")
+    from rasa.core.channels.channel import UserMessage
+
+    agent = rasa_agent.agent
     sender_id = input.OfficeContent.get("uid", "default_user")
     
     # Get tracker to inspect form state
     start = time.time()
-    nlu_result = await agent.parse_message(input.text)
+    nlu_result = await nlu.parse(agent, input.text)
     parse_time = time.time() - start
     
     print(f"⏱️ parse_message took: {parse_time:.2f}s")  # This will show you the actual delay
@@ -888,73 +409,8 @@ async def analyze_rasa(input: InputText):
         }
     }
 
-from rasa.shared.core.events import SlotSet, ActiveLoop
-
-async def cancel_form(tracker, agent):
-    """Properly cancel the active form and reset all slots"""
-  
-    # Create events to properly deactivate the form
-    events = [
-        # Deactivate the active loop (form)
-        ActiveLoop(None),
-        # Reset all form-related slots
-        SlotSet("leave_type", None),
-        SlotSet("leave_from", None), 
-
-        
-        SlotSet("leave_to", None),
-        SlotSet("reason", None),
-        SlotSet("requested_slot", None)
-    ]
-    
-    # Apply all events to the tracker
-    for event in events:
-        tracker.update(event)
-    
-    # Save the updated tracker
-    await agent.tracker_store.save(tracker)
-    
-    return "Your leave form has been cancelled. How can I help you now?"
-
-
-
-
-
-
-
-
-from datetime import datetime, timedelta
-
-def parse_leave_date(text: str) -> str | None:
-    """Simple date parser with basic relative date handling"""
-    if not text:
-        return None
-
-    text = text.strip().lower()
-    now = datetime.now()  # More accurate than today()
-
-    if text == "today":
-        return now.strftime("%m/%d/%Y")
-    elif text == "tomorrow":
-        return (now + timedelta(days=1)).strftime("%m/%d/%Y")
-
-    try:
-        for fmt in ["%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d", "%m-%d-%Y"]:
-            try:
-                dt = datetime.strptime(text, fmt)
-                return dt.strftime("%m/%d/%Y")
-            except ValueError:
-                continue
-    except Exception:
-        pass
-
-    return None
-
-
 
 RASA_URL = "http://localhost:5005/webhooks/rest/webhook"  # adjust if different
-from fastapi import FastAPI, Request
-import requests
 
 @app.post("/analyze-test/")
 async def analyze_test(request: Request):
@@ -976,7 +432,8 @@ async def analyze_test(request: Request):
     }
 
     # Send user input to Rasa
-    rasa_response = requests.post(RASA_URL, json=message_payload)
+    async with httpx.AsyncClient(timeout=settings.RASA_HTTP_TIMEOUT or None) as client:
+        rasa_response = await client.post(RASA_URL, json=message_payload)
     responses = rasa_response.json()
 
     # Extract only text messages from bot
@@ -1000,16 +457,17 @@ async def analyze_audio(
     OfficeContent = json.loads(OfficeContent)
     Commonparam = json.loads(Commonparam)
 
-    ext = os.path.splitext(file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-
-    transcription = whisper_model.transcribe(tmp_path)
+    await components.require("speech", "rasa")
+    transcription = await audio_pipeline.transcriber.transcribe_upload(file)
     text = transcription["text"]
+    timings = ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in transcription["timings"].items())
+    logger.info(
+        f"Transcribed {transcription['duration']:.1f}s voice note "
+        f"(batch of {transcription['batch_size']}): {timings}"
+    )
     print(f"🎤 Transcribed audio text: {text}")
 
-    result = await agent.parse_message(text)
+    result = await nlu.parse(rasa_agent.agent, text)
     intent = result.get("intent", {}).get("name")
     print(f"🎤 intent = {intent}")
 
@@ -1017,159 +475,28 @@ async def analyze_audio(
 
 
 async def parse_with_rasa(text: str):
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(timeout=settings.RASA_HTTP_TIMEOUT or None) as client:
         response = await client.post(
             "http://localhost:5005/model/parse",
             json={"text": text}
         )
         return response.json()
-    
 
 
-# loading the policy 
-# ===============================
-# PDF QA Pipeline - Optimized
-# ===============================
-
-import pdfplumber
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from transformers import pipeline
-import faiss
-from sklearn.metrics.pairwise import cosine_similarity
-
 # -------------------------------
-# Globals
+# Components
 # -------------------------------
-CHUNK_TEXTS = []
-CHUNK_META  = []
-VEC_INDEX = None
-EMBED_MODEL = None
-QA_PIPELINE = None
 
-# -------------------------------
-# 1) Chunking function
-# -------------------------------
-def _chunk(text: str, chunk_size=1000, overlap=400):
-    """Split long text into overlapping chunks for better QA context."""
-    chunks = []
-    start = 0
-    step = chunk_size - overlap
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunks.append(text[start:end])
-        start += step if step > 0 else chunk_size
-        if start >= len(text):
-            break
-    return chunks
-
-# -------------------------------
-# 2) Build FAISS store
-# -------------------------------
-def build_policy_store(pdf_path="documents/ocompanypolicy.pdf"):
-    """
-    Load PDF, extract text, create embeddings, and build FAISS index.
-    """
-    global CHUNK_TEXTS, CHUNK_META, VEC_INDEX, EMBED_MODEL, QA_PIPELINE
-    CHUNK_TEXTS, CHUNK_META = [], []
-
-    # 1) Extract text from PDF
-    with pdfplumber.open(pdf_path) as pdf:
-        chunk_id = 0
-        for pageno, page in enumerate(pdf.pages, start=1):
-            page_text = page.extract_text() or ""
-            if not page_text.strip():
-                continue
-            for frag in _chunk(page_text):
-                CHUNK_TEXTS.append(frag)
-                CHUNK_META.append({"page": pageno, "chunk_id": chunk_id})
-                chunk_id += 1
-
-    # 2) Embeddings
-    EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-    embs = EMBED_MODEL.encode(CHUNK_TEXTS, show_progress_bar=True)
-    embs = np.array(embs).astype("float32")
-
-    # 3) FAISS index
-    VEC_INDEX = faiss.IndexFlatL2(embs.shape[1])
-    VEC_INDEX.add(embs)
-
-    # 4) Generative QA pipeline (Flan-T5)
-    QA_PIPELINE = pipeline("text2text-generation", model="google/flan-t5-base", device=-1)
-
-    print(f"📑 Indexed {len(CHUNK_TEXTS)} chunks from company policy PDF")
-
-# -------------------------------
-# 3) Vector search
-# -------------------------------
-def _search_vectors(query: str, top_k=7):
-    """
-    Retrieve top chunks relevant to the query and re-rank using cosine similarity.
-    Returns a list of (text, meta, score) tuples.
-    """
-    if VEC_INDEX is None or EMBED_MODEL is None:
-        return []
-
-    # Encode query
-    q_emb = EMBED_MODEL.encode(query).astype("float32")
-
-    # Search FAISS (get extra candidates for re-ranking)
-    D, I = VEC_INDEX.search(np.array([q_emb]), top_k * 3)
-
-    candidates = []
-    for idx, dist in zip(I[0], D[0]):
-        if idx < 0 or idx >= len(CHUNK_TEXTS):
-            continue
-        candidates.append((CHUNK_TEXTS[idx], CHUNK_META[idx]))
-
-    if not candidates:
-        return []
-
-    # Re-rank using cosine similarity
-    cand_texts = [text for text, meta in candidates]
-    cand_embs = EMBED_MODEL.encode(cand_texts).astype("float32")
-    sims = cosine_similarity(q_emb.reshape(1, -1), cand_embs)[0]
-
-    # Return ranked top_k tuples
-    ranked = sorted(
-        [(text, meta, float(sim)) for (text, meta), sim in zip(candidates, sims)],
-        key=lambda x: x[2],
-        reverse=True
-    )
-
-    return ranked[:top_k]
-
-# -------------------------------
-# 4) Answer a question
-# -------------------------------
-def answer_policy_question(question: str, top_k=7):
-    """
-    Answer a policy question using retrieved chunks and generative QA.
-    Returns full answer and pages where info came from.
-    """
-    try:
-        # Retrieve top relevant chunks
-        retrieved = _search_vectors(question, top_k=top_k)
-        if not retrieved:
-            return "Sorry, I couldn't find anything in the policy.", []
-
-        # Combine chunk texts into single context
-        context = " \n".join([item[0] for item in retrieved])
-        pages = sorted({item[1]["page"] for item in retrieved})
-
-        # Generate coherent answer
-        input_text = f"Answer the question based on the context:\nContext: {context}\nQuestion: {question}"
-        result = QA_PIPELINE(input_text, max_length=512, do_sample=False)[0]["generated_text"]
-
-        return result, pages
-
-    except Exception as e:
-        print("RAG error:", e)
-        return "⚠️ Sorry, something went wrong in the policy lookup.", []
+# Text intents need only rasa, so it alone decides readiness
+components.register("rasa", load_agent, warm_up_agent)
+components.register("speech", load_speech, warm_up_speech, critical=False)
+components.register("policy", build_policy_store, warm_up_policy, critical=False)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
-
-
+    # Single process; serve.py is the multi-worker entry point. Passing the app
+    # object (not "main:app") avoids importing this module a second time.
+    # For auto-reload during development: uvicorn main:app --reload
+    import uvicorn
 
+    uvicorn.run(app, host=settings.SERVER_HOST, port=settings.SERVER_PORT)
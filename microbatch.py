@@ -0,0 +1,77 @@
+"""
+Async micro-batching queue.
+
+Callers `await batcher.submit(item)`; items are collected until either
+`max_batch` are waiting or `max_wait_ms` has passed since the first one
+arrived, then handed to `process_batch(items)` in one call. Its results
+(one per item, same order) are fanned back to the waiting callers.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_batch: int, max_wait_ms: float, name: str = "batch"):
+        self.process_batch = process_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._pending = []   # [(item, future)]
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            # Callers that gave up while queued don't need a slot in the batch
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: got {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.warning(f"{self.name} batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": len(self._pending),
+        }
@@ -0,0 +1,187 @@
+"""
+Micro-batched Rasa NLU inference.
+
+Concurrent /analyze/ turns each used to call agent.parse_message on their own,
+so the NLU graph and the DIET model ran one batch-of-1 forward pass per
+message. BatchedNLU queues messages for a few milliseconds (see
+microbatch.py), runs the NLU graph once for the whole batch in a dedicated
+inference thread, and fans the parse results back to the waiting requests.
+
+Rasa's DIETClassifier/ResponseSelector predict message by message, so
+install_batched_inference() teaches them to run one model.run_inference over
+all messages of a graph call and then hand each message its slice of the
+output. This relies on Rasa 3.6 internals; every failure falls back to the
+regular agent.parse_message path.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import settings
+from microbatch import MicroBatcher
+
+logger = logging.getLogger("fastapi-rasa")
+
+_local = threading.local()
+_MISSING = object()
+
+
+# -----------------------------
+# Batched DIET inference
+# -----------------------------
+
+def _slice_output(output, index: int, size: int):
+    """
+    Take row `index` (kept as a batch of 1) out of a run_inference result.
+    """
+    if isinstance(output, dict):
+        return {k: _slice_output(v, index, size) for k, v in output.items()}
+    if isinstance(output, np.ndarray) and output.ndim > 0 and output.shape[0] == size:
+        return output[index:index + 1]
+    return output
+
+
+def _predict_batch(component, messages):
+    """
+    { id(message): model output } for all messages in one forward pass, or
+    None when the batch can't be built (the caller then predicts one by one).
+    """
+    if getattr(component, "model", None) is None:
+        return None
+    model_data = component._create_model_data(messages, training=False)
+    if model_data.is_empty() or model_data.number_of_examples() != len(messages):
+        return None
+    output = component.model.run_inference(model_data, batch_size=len(messages))
+    return {id(m): _slice_output(output, i, len(messages)) for i, m in enumerate(messages)}
+
+
+def _batched_process(original_process):
+    def process(self, messages, *args, **kwargs):
+        if len(messages) > 1:
+            try:
+                outputs = _predict_batch(self, messages)
+            except Exception as e:
+                logger.warning(f"Batched {type(self).__name__} inference failed, predicting one by one: {e}")
+                outputs = None
+            if outputs is not None:
+                _local.outputs = outputs
+                try:
+                    return original_process(self, messages, *args, **kwargs)
+                finally:
+                    _local.outputs = None
+        return original_process(self, messages, *args, **kwargs)
+    process._batched = True
+    return process
+
+
+def _batched_predict(original_predict):
+    def _predict(self, message, *args, **kwargs):
+        outputs = getattr(_local, "outputs", None)
+        if outputs is not None:
+            out = outputs.get(id(message), _MISSING)
+            if out is not _MISSING:
+                return out
+        return original_predict(self, message, *args, **kwargs)
+    _predict._batched = True
+    return _predict
+
+
+def install_batched_inference() -> bool:
+    """
+    Patch DIETClassifier and ResponseSelector for batched prediction. Must run
+    before Agent.load, since graph nodes bind the component methods on load.
+    """
+    try:
+        from rasa.nlu.classifiers.diet_classifier import DIETClassifier
+        from rasa.nlu.selectors.response_selector import ResponseSelector
+    except ImportError as e:
+        logger.warning(f"Batched NLU inference unavailable: {e}")
+        return False
+
+    for cls in (DIETClassifier, ResponseSelector):
+        if "process" in cls.__dict__ and not getattr(cls.process, "_batched", False):
+            cls.process = _batched_process(cls.__dict__["process"])
+        if "_predict" in cls.__dict__ and not getattr(cls._predict, "_batched", False):
+            cls._predict = _batched_predict(cls.__dict__["_predict"])
+    return True
+
+
+# -----------------------------
+# Batched parsing
+# -----------------------------
+
+class BatchedNLU:
+    def __init__(self, agent, max_batch: int = None, max_wait_ms: float = None):
+        self.agent = agent
+        self.batcher = MicroBatcher(
+            self._parse_batch,
+            settings.NLU_BATCH_MAX_SIZE if max_batch is None else max_batch,
+            settings.NLU_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+            name="nlu",
+        )
+        # TF inference is serialized on one thread; batching is what buys throughput
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlu-batch")
+        self.fallbacks = 0
+
+    async def parse(self, text: str) -> dict:
+        # Slash syntax (/intent{...}) and remote interpreters take Rasa's own path
+        if text.startswith("/") or getattr(self.agent.processor, "http_interpreter", None):
+            return await self.agent.parse_message(text)
+        return await self.batcher.submit(text)
+
+    async def _parse_batch(self, texts):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self._run_graph, texts)
+        except Exception as e:
+            self.fallbacks += 1
+            logger.warning(f"Batched NLU parse failed, parsing {len(texts)} messages one by one: {e}")
+            return await asyncio.gather(*(self.agent.parse_message(text) for text in texts))
+
+    def _run_graph(self, texts):
+        from rasa.core.channels.channel import UserMessage
+        from rasa.engine.constants import PLACEHOLDER_MESSAGE, PLACEHOLDER_TRACKER
+
+        processor = self.agent.processor
+        target = processor.model_metadata.nlu_target
+        messages = [UserMessage(text) for text in texts]
+        results = processor.graph_runner.run(
+            inputs={PLACEHOLDER_MESSAGE: messages, PLACEHOLDER_TRACKER: None},
+            targets=[target],
+        )
+        parsed_messages = results[target]
+        if len(parsed_messages) != len(texts):
+            raise RuntimeError(f"NLU graph returned {len(parsed_messages)} results for {len(texts)} messages")
+
+        parsed = []
+        for message in parsed_messages:
+            parse_data = {"text": "", "intent": {"name": None, "confidence": 0.0}, "entities": []}
+            parse_data.update(message.as_dict(only_output_properties=True))
+            if hasattr(processor, "_update_full_retrieval_intent"):
+                processor._update_full_retrieval_intent(parse_data)
+            parsed.append(parse_data)
+        return parsed
+
+    async def self_check(self, text: str = "hello") -> bool:
+        """
+        Compare one batched parse against agent.parse_message before trusting it.
+        """
+        try:
+            expected = await self.agent.parse_message(text)
+            got = (await self._parse_batch([text, text]))[0]
+        except Exception as e:
+            logger.warning(f"Batched NLU self-check failed: {e}")
+            return False
+        same = got.get("intent", {}).get("name") == expected.get("intent", {}).get("name")
+        if not same:
+            logger.warning("Batched NLU self-check disagrees with agent.parse_message; batching disabled")
+        return same
+
+    def stats(self) -> dict:
+        return dict(self.batcher.stats(), fallbacks=self.fallbacks)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,116 @@
+"""
+LRU memoization of Rasa parse results for repeated utterances.
+
+Keys are normalized text: lowercased, whitespace collapsed, and dates and
+numbers replaced by placeholders, so "leave on 20/08/2025" and
+"leave on 21/08/2025" share one entry. Entity spans only make sense for the
+exact text they were extracted from, so a hit on different raw text returns
+the cached intent with an empty entity list (handlers re-extract dates from
+the text themselves).
+
+The cache flushes itself when the loaded or latest trained model changes.
+"""
+import logging
+import re
+import time
+from collections import OrderedDict
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+_MONTHS = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DATE_PATTERNS = [
+    re.compile(r"\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b"),
+    re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b"),
+    re.compile(r"\b\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTHS + r"\b(?:\s+\d{4})?"),
+    re.compile(r"\b" + _MONTHS + r"\s+\d{1,2}(?:st|nd|rd|th)?\b(?:,?\s+\d{4})?"),
+]
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def cache_key(text: str) -> str:
+    key = _SPACES.sub(" ", (text or "").lower()).strip()
+    for pattern in _DATE_PATTERNS:
+        key = pattern.sub("<date>", key)
+    return _NUMBER.sub("<num>", key)
+
+
+def _latest_model_path():
+    from rasa.model import get_latest_model
+    return get_latest_model()
+
+
+class NLUParseCache:
+    def __init__(self, max_entries: int = None, model_check_seconds: float = None, model_probe=None):
+        self.max_entries = settings.NLU_CACHE_SIZE if max_entries is None else max_entries
+        self.model_check_seconds = (
+            settings.NLU_CACHE_MODEL_CHECK_SECONDS if model_check_seconds is None else model_check_seconds
+        )
+        self.model_probe = model_probe or _latest_model_path
+        self._entries = OrderedDict()  # { key: (raw text, parse result) }
+        self._model = None             # (loaded agent id, latest model path) the entries belong to
+        self._next_check = 0.0
+        self.hits = self.masked_hits = self.misses = self.flushes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_model(self, agent):
+        now = time.monotonic()
+        loaded = id(agent)
+        latest = self._model[1] if self._model else None
+        if now >= self._next_check:
+            self._next_check = now + self.model_check_seconds
+            try:
+                latest = str(self.model_probe())
+            except Exception as e:
+                logger.warning(f"NLU cache could not check the latest model: {e}")
+        model = (loaded, latest)
+        if model != self._model:
+            if self._entries:
+                self.flushes += 1
+                logger.info("🧹 NLU parse cache flushed: model changed")
+            self._entries.clear()
+            self._model = model
+
+    def get(self, agent, text: str):
+        self._check_model(agent)
+        key = cache_key(text)
+        cached = self._entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        raw, result = cached
+        result = dict(result, text=text)
+        if raw == text:
+            self.hits += 1
+        else:
+            self.masked_hits += 1
+            result["entities"] = []
+        return result
+
+    def put(self, text: str, result: dict):
+        key = cache_key(text)
+        self._entries[key] = (text, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.masked_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "masked_hits": self.masked_hits,
+            "misses": self.misses,
+            "flushes": self.flushes,
+            "hit_rate": (self.hits + self.masked_hits) / lookups if lookups else 0.0,
+        }
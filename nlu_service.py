@@ -0,0 +1,92 @@
+"""
+Single entry point for NLU parsing used by the chat endpoints.
+
+Wraps agent.parse_message with the optional tier-0 fast path
+(see fast_intent.py), the parse-result cache (see nlu_cache.py) and
+micro-batching of concurrent parses (see nlu_batching.py).
+"""
+import logging
+import time
+
+import settings
+from fast_intent import FastIntentClassifier, FastPathStats
+from nlu_batching import BatchedNLU
+from nlu_cache import NLUParseCache
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+class NLUService:
+    def __init__(self, fast_mode: str = None, fast_threshold: float = None):
+        self.fast_mode = settings.FAST_INTENT_MODE if fast_mode is None else fast_mode
+        self.fast_threshold = settings.FAST_INTENT_THRESHOLD if fast_threshold is None else fast_threshold
+        self.fast = FastIntentClassifier() if self.fast_mode in ("shadow", "on") else None
+        self.fast_stats = FastPathStats()
+        self.cache = NLUParseCache()
+        self.batched = None
+
+    async def enable_batching(self, agent) -> bool:
+        self.disable_batching()
+        batched = BatchedNLU(agent)
+        if not await batched.self_check():
+            batched.close()
+            return False
+        self.batched = batched
+        logger.info(f"NLU micro-batching on (max {batched.batcher.max_batch} msgs / {settings.NLU_BATCH_MAX_WAIT_MS} ms)")
+        return True
+
+    def disable_batching(self):
+        if self.batched:
+            self.batched.close()
+            self.batched = None
+
+    def _parser(self, agent):
+        if self.batched and self.batched.agent is agent:
+            return self.batched.parse
+        return agent.parse_message
+
+    async def parse(self, agent, text: str) -> dict:
+        fast_intent, confidence = self.fast.classify(text) if self.fast else (None, 0.0)
+        if self.fast and fast_intent is None:
+            self.fast_stats.abstained += 1
+
+        if self.fast_mode == "on" and fast_intent and confidence >= self.fast_threshold:
+            self.fast_stats.record_served(fast_intent)
+            return {
+                "text": text,
+                "intent": {"name": fast_intent, "confidence": confidence},
+                "entities": [],
+                "intent_ranking": [{"name": fast_intent, "confidence": confidence}],
+                "source": "fast_path",
+            }
+
+        if self.cache.enabled:
+            cached = self.cache.get(agent, text)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        result = await self._parser(agent)(text)
+        elapsed = time.perf_counter() - start
+        if self.cache.enabled:
+            self.cache.put(text, result)
+
+        rasa_intent = result.get("intent", {}).get("name")
+        if self.fast:
+            self.fast_stats.record_parse(rasa_intent, elapsed)
+            if fast_intent:
+                self.fast_stats.record_shadow(fast_intent, rasa_intent)
+        return result
+
+    def stats(self) -> dict:
+        stats = {
+            "fast_path": {"mode": self.fast_mode, "threshold": self.fast_threshold},
+            "parse_cache": self.cache.stats(),
+            "batching": self.batched.stats() if self.batched else {"enabled": False},
+        }
+        if self.fast:
+            stats["fast_path"].update(self.fast_stats.as_dict())
+        return stats
+
+
+nlu = NLUService()
@@ -0,0 +1,234 @@
+"""
+Shared HTTP client for the OfficeKit AjaxAPI.
+
+One pooled httpx.AsyncClient is kept per Commonparam["Domain"], so chat turns
+reuse keep-alive (and, where the server negotiates it, HTTP/2) connections
+instead of paying a fresh TCP+TLS handshake on every backend call.
+"""
+import importlib.util
+import json
+import logging
+
+import httpx
+
+import settings
+from singleflight import SingleFlight
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+def build_base_url(commonparam: dict) -> str:
+    """
+    Returns a base URL that safely points to the AjaxAPI root.
+    Accepts either:
+      - http://host:port             -> expands to http://host:port/api/AjaxAPI
+      - http://host:port/api/AjaxAPI -> used as-is
+    """
+    base = (commonparam or {}).get("Domain", "").rstrip("/")
+    if not base:
+        raise ValueError("Commonparam['Domain'] is required.")
+    # Detect if already pointing to AjaxAPI
+    lowered = base.lower()
+    if lowered.endswith("/api/ajaxapi"):
+        return base
+    # If it doesn't look like an API root, append
+    if "/api/" not in lowered:
+        return base + "/api/AjaxAPI"
+    return base  # assume caller passed a valid API root like /api/AjaxAPI
+
+
+def api_url(commonparam: dict, endpoint: str) -> str:
+    return f"{build_base_url(commonparam).rstrip('/')}/{endpoint.lstrip('/')}"
+
+
+def request_url(commonparam: dict, endpoint: str, OfficeContent: dict, cp: dict) -> str:
+    """
+    AjaxAPI takes both parameter objects as JSON in the query string.
+    """
+    url = api_url(commonparam, endpoint)
+    return f"{url}?OfficeContent={json.dumps(OfficeContent)}&Commonparam={json.dumps(cp)}"
+
+
+def is_company_scoped(endpoint: str) -> bool:
+    return endpoint in settings.OFFICEKIT_COMPANY_SCOPED_ENDPOINTS
+
+
+def request_key(commonparam: dict, endpoint: str, OfficeContent: dict, cp: dict) -> tuple:
+    """
+    Identity of an AjaxAPI call for coalescing. Company-scoped endpoints drop
+    the uid so that every employee of the company shares one call.
+    """
+    office = dict(OfficeContent or {})
+    if is_company_scoped(endpoint):
+        office.pop("uid", None)
+    return (
+        build_base_url(commonparam),
+        endpoint,
+        json.dumps(office, sort_keys=True, default=str),
+        json.dumps(cp, sort_keys=True, default=str),
+    )
+
+
+class OfficeKitResult:
+    """
+    A decoded AjaxAPI response. The backend sometimes double-encodes its JSON,
+    so `data` is unwrapped once more when the first decode yields a string.
+    """
+    __slots__ = ("status_code", "data", "text", "error")
+
+    def __init__(self, status_code: int, data=None, text: str = "", error: str = None):
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+        self.error = error
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "OfficeKitResult":
+        if response.status_code != 200:
+            return cls(response.status_code, text=response.text)
+        try:
+            data = response.json()
+            if isinstance(data, str):
+                data = json.loads(data)
+            return cls(response.status_code, data=data, text=response.text)
+        except Exception as e:
+            return cls(response.status_code, text=response.text, error=str(e))
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200 and self.error is None
+
+    @property
+    def nbytes(self) -> int:
+        # Rough in-memory footprint: the parsed object is of the same order as its text
+        return 2 * len(self.text) + 64
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class OfficeKitClient:
+    """
+    Pool of keep-alive AsyncClients, one per OfficeKit domain.
+    """
+
+    def __init__(self, limits: httpx.Limits = None, http2: bool = None,
+                 default_timeout: float = None, endpoint_timeouts: dict = None):
+        self.limits = limits or httpx.Limits(
+            max_connections=settings.OFFICEKIT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OFFICEKIT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OFFICEKIT_KEEPALIVE_EXPIRY,
+        )
+        want_http2 = settings.OFFICEKIT_HTTP2 if http2 is None else http2
+        if want_http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is missing; using HTTP/1.1")
+            want_http2 = False
+        self.http2 = want_http2
+        self.default_timeout = (
+            settings.OFFICEKIT_DEFAULT_TIMEOUT if default_timeout is None else default_timeout
+        )
+        self.endpoint_timeouts = dict(
+            settings.OFFICEKIT_ENDPOINT_TIMEOUTS if endpoint_timeouts is None else endpoint_timeouts
+        )
+        self._clients = {}  # { base_url: httpx.AsyncClient }
+        self.inflight = SingleFlight()
+
+    def timeout_for(self, endpoint: str) -> httpx.Timeout:
+        seconds = self.endpoint_timeouts.get(endpoint, self.default_timeout)
+        return httpx.Timeout(seconds, connect=min(seconds, settings.OFFICEKIT_CONNECT_TIMEOUT))
+
+    def client_for(self, commonparam: dict) -> httpx.AsyncClient:
+        base = build_base_url(commonparam)
+        client = self._clients.get(base)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.default_timeout,
+            )
+            self._clients[base] = client
+            logger.info(f"🔌 Opened OfficeKit connection pool for {base} (http2={self.http2})")
+        return client
+
+    async def request(self, method: str, commonparam: dict, endpoint: str,
+                      OfficeContent: dict, cp: dict) -> httpx.Response:
+        """
+        Send one AjaxAPI call over the pooled client for commonparam["Domain"].
+        `commonparam` only selects the domain; `cp` is what goes on the wire.
+        """
+        url = request_url(commonparam, endpoint, OfficeContent, cp)
+        client = self.client_for(commonparam)
+        return await client.request(method, url, timeout=self.timeout_for(endpoint))
+
+    async def post(self, commonparam: dict, endpoint: str, OfficeContent: dict, cp: dict) -> httpx.Response:
+        return await self.request("POST", commonparam, endpoint, OfficeContent, cp)
+
+    async def post_json(self, commonparam: dict, endpoint: str, OfficeContent: dict, cp: dict) -> OfficeKitResult:
+        """
+        POST and decode. Identical concurrent read calls share one upstream
+        request and one parsed result, so callers must not mutate `data`.
+        """
+        async def call():
+            response = await self.post(commonparam, endpoint, OfficeContent, cp)
+            return OfficeKitResult.from_response(response)
+
+        if endpoint in settings.OFFICEKIT_WRITE_ENDPOINTS:
+            return await call()
+        return await self.inflight.do(request_key(commonparam, endpoint, OfficeContent, cp), call)
+
+    def forget_inflight(self, commonparam: dict, OfficeContent: dict, endpoint: str = None):
+        """
+        Stop coalescing onto an employee's read calls that are already in
+        flight (after a write made their answer out of date), optionally only
+        for one endpoint.
+        """
+        base = build_base_url(commonparam)
+        uid = (OfficeContent or {}).get("uid")
+        for key in self.inflight.keys():
+            key_base, key_endpoint, office, _ = key
+            if key_base != base or (endpoint is not None and key_endpoint != endpoint):
+                continue
+            if json.loads(office).get("uid") == uid:
+                self.inflight.forget(key)
+
+    def stats(self) -> dict:
+        return {
+            "pools": sorted(self._clients),
+            "http2": self.http2,
+            "singleflight": self.inflight.stats(),
+        }
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close OfficeKit client: {e}")
+
+
+# -----------------------------
+# Process-wide instance
+# -----------------------------
+
+_client = None
+
+
+def start_officekit_client() -> OfficeKitClient:
+    global _client
+    if _client is None:
+        _client = OfficeKitClient()
+    return _client
+
+
+def get_officekit_client() -> OfficeKitClient:
+    # Falls back to lazy creation so helpers also work outside the app lifecycle
+    return _client or start_officekit_client()
+
+
+async def close_officekit_client():
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,169 @@
+"""
+Payslip pipeline: payroll periods, month lookup and salary slips.
+
+The period list of each employee is indexed once (latest period and a
+month -> ProcessPayRollID map) and remembered, so a payslip question for an
+employee we have seen needs only the GetSalarySlip round trip, issued in
+parallel with revalidating the period list.
+
+Salary slips are not response-cached, so a corrected or regenerated slip
+shows up at once.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+
+import settings
+from officekit_client import request_url
+from response_cache import cached_post_json, response_cache
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+# -----------------------------
+# Backend API helpers
+# -----------------------------
+
+async def fetch_payroll_periods(OfficeContent: dict, Commonparam: dict):
+    Commonparam = dict(Commonparam or {})
+    Commonparam["AddNextYear"] = "2025"
+
+    url = request_url(Commonparam, "FillPayRollPeriod", OfficeContent, Commonparam)
+    print("📤 Request URL:", url)
+
+    result = await cached_post_json(Commonparam, "FillPayRollPeriod", OfficeContent, Commonparam)
+    print("🔎 Raw Response Text:", result.text)
+
+    if result.status_code == 200:
+        if result.error:
+            return {"error": f"Failed to parse JSON: {result.error}"}
+        return result.data
+    else:
+        return {"error": f"Failed to fetch payroll periods: {result.text}"}
+
+async def fetch_salary_slip(OfficeContent: dict, ProcessPayRollID: int, Commonparam: dict):
+    # Only pass ProcessPayRollID to Commonparam for this API
+    cp = {"ProcessPayRollID": ProcessPayRollID}
+
+    result = await cached_post_json(Commonparam, "GetSalarySlip", OfficeContent, cp)
+    print("🔎 Raw Response Text:", result.text)
+
+    if result.status_code == 200:
+        if result.error:
+            return {"error": f"Failed to parse JSON: {result.error}"}
+        return result.data
+    else:
+        return {"error": f"Failed to fetch salary slip: {result.text}"}
+
+
+# -----------------------------
+# Period index
+# -----------------------------
+
+class PeriodIndex:
+    """
+    Precomputed lookups over one FillPayRollPeriod response. The backend
+    lists the most recent period first.
+    """
+    __slots__ = ("periods", "error", "latest", "by_month")
+
+    def __init__(self, periods):
+        self.periods = periods
+        self.error = periods.get("error") if isinstance(periods, dict) else None
+        rows = periods if isinstance(periods, list) else []
+        self.latest = rows[0] if rows else None
+        self.by_month = {}
+        for period in rows:
+            # First match wins, like a linear scan would
+            self.by_month.setdefault(period.get("Payrollmonth"), period.get("ProcessPayRollID"))
+
+    def process_id(self, month: int = None):
+        """
+        ProcessPayRollID for `month`, or for the latest period when month is None.
+        Returns None when there is no such period.
+        """
+        if month is None:
+            return self.latest.get("ProcessPayRollID") if self.latest else None
+        return self.by_month.get(month)
+
+    def has_period(self, month: int = None) -> bool:
+        if month is None:
+            return self.latest is not None
+        return month in self.by_month
+
+
+class PayslipPipeline:
+    def __init__(self, max_entries: int = None):
+        self.max_entries = settings.PAYSLIP_INDEX_MAX_ENTRIES if max_entries is None else max_entries
+        self._indexes = OrderedDict()  # { (domain, uid): PeriodIndex }, least recently used first
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+
+    def _remember(self, key: tuple, index: PeriodIndex):
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_entries:
+            self._indexes.popitem(last=False)
+
+    @staticmethod
+    def _discard(task: asyncio.Task):
+        task.cancel()
+        # It may already have failed; don't let asyncio log an unretrieved exception
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def period_index(self, OfficeContent: dict, Commonparam: dict) -> PeriodIndex:
+        periods = await fetch_payroll_periods(OfficeContent, Commonparam)
+        key = response_cache.employee(Commonparam, OfficeContent)
+        known = self._indexes.get(key)
+        # Same cached response as last time -> reuse the index as-is
+        if known is not None and known.periods is periods:
+            self._indexes.move_to_end(key)
+            return known
+
+        index = PeriodIndex(periods)
+        if index.error is None:
+            self._remember(key, index)
+        return index
+
+    async def salary_slip(self, OfficeContent: dict, Commonparam: dict, month: int = None):
+        """
+        Returns (PeriodIndex, salary slip) for `month` (latest when None). The
+        slip is None when the period list failed or has no matching period.
+        """
+        key = response_cache.employee(Commonparam, OfficeContent)
+        known = self._indexes.get(key)
+        guess = known.process_id(month) if known is not None and known.has_period(month) else None
+
+        if guess is None:
+            index = await self.period_index(OfficeContent, Commonparam)
+            if index.error or not index.has_period(month):
+                return index, None
+            return index, await fetch_salary_slip(OfficeContent, index.process_id(month), Commonparam)
+
+        # Fetch the slip we expect while the period list is revalidated
+        slip_task = asyncio.create_task(fetch_salary_slip(OfficeContent, guess, Commonparam))
+        try:
+            index = await self.period_index(OfficeContent, Commonparam)
+        except BaseException:
+            self._discard(slip_task)
+            raise
+
+        if not index.error and index.has_period(month) and index.process_id(month) == guess:
+            self.speculative_hits += 1
+            return index, await slip_task
+
+        self.speculative_misses += 1
+        self._discard(slip_task)
+        if index.error or not index.has_period(month):
+            return index, None
+        return index, await fetch_salary_slip(OfficeContent, index.process_id(month), Commonparam)
+
+    def stats(self) -> dict:
+        return {
+            "indexed_employees": len(self._indexes),
+            "speculative_hits": self.speculative_hits,
+            "speculative_misses": self.speculative_misses,
+        }
+
+
+payslips = PayslipPipeline()
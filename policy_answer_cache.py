@@ -0,0 +1,137 @@
+"""
+Two-level cache in front of answer_policy_question.
+
+1. exact:    normalized question text -> (answer, pages)
+2. semantic: the question embedding (already computed for retrieval) is
+             compared with the embeddings of cached questions; a cosine score
+             of at least POLICY_ANSWER_SIMILARITY returns that answer
+
+Entries expire after POLICY_ANSWER_CACHE_TTL, the cache holds at most
+POLICY_ANSWER_CACHE_SIZE entries (LRU), and clear() drops everything when
+the policy index is rebuilt. Answers computed against an older index are
+discarded instead of stored.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import settings
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    text = _NON_WORD.sub(" ", (question or "").lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+class _Answer:
+    __slots__ = ("answer", "pages", "embedding", "expires_at")
+
+    def __init__(self, answer, pages, embedding, expires_at):
+        self.answer = answer
+        self.pages = pages
+        self.embedding = embedding
+        self.expires_at = expires_at
+
+
+class PolicyAnswerCache:
+    def __init__(self, max_entries: int = None, ttl: float = None, threshold: float = None):
+        self.max_entries = settings.POLICY_ANSWER_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = settings.POLICY_ANSWER_CACHE_TTL if ttl is None else ttl
+        self.threshold = settings.POLICY_ANSWER_SIMILARITY if threshold is None else threshold
+        self._entries = OrderedDict()  # { normalized question: _Answer }
+        self._matrix = None            # (keys, stacked embeddings), rebuilt after changes
+        self.generation = 0            # bumped by clear()
+        self._lock = threading.Lock()  # answers are computed on the rag executor threads
+        self.exact_hits = self.semantic_hits = self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_exact(self, question: str):
+        """
+        (answer, pages) for the same question asked before, else None.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            self.exact_hits += 1
+            return entry.answer, list(entry.pages)
+
+    def get_similar(self, embedding: np.ndarray):
+        """
+        (answer, pages) for the closest cached question when it is similar
+        enough, else None. `embedding` must be L2-normalized.
+        """
+        embedding = np.asarray(embedding, dtype="float32").reshape(-1)
+        with self._lock:
+            entry = None
+            if self._entries:
+                if self._matrix is None:
+                    keys = list(self._entries)
+                    self._matrix = (keys, np.stack([self._entries[k].embedding for k in keys]))
+                keys, matrix = self._matrix
+                scores = matrix @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self._live(keys[best])
+            if entry is None:
+                self.misses += 1
+                return None
+            self.semantic_hits += 1
+            return entry.answer, list(entry.pages)
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, question: str, embedding: np.ndarray, answer: str, pages: list, generation: int):
+        if not self.enabled:
+            return
+        key = normalize_question(question)
+        embedding = np.asarray(embedding, dtype="float32").reshape(-1)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = _Answer(answer, list(pages), embedding, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.generation += 1
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "generation": self.generation,
+        }
+
+
+policy_answers = PolicyAnswerCache()
@@ -0,0 +1,112 @@
+"""
+Lexical BM25 index over policy chunks, fused with vector search.
+
+MiniLM ranks exact policy terms ("LOP", "CL", "gratuity", "notice period")
+poorly, so each PolicySnapshot also carries a BM25 index. Postings are kept
+in CSR form: one int32 array of chunk rows and one float32 array of term
+frequencies, sliced per term through an int64 offsets array. Scoring a query
+is one numpy slice and one vectorized update per query term.
+
+rrf_fuse() merges the BM25 and vector rankings with reciprocal rank fusion,
+which needs no score calibration between the two.
+"""
+import re
+
+import numpy as np
+
+K1 = 1.5
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its "
+    "me my of on or our should the their there this to was we what when where which "
+    "who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        # Light plural folding: "leaves" -> "leave", "holidays" -> "holiday"
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, ids, texts):
+        """
+        `ids` are the index ids of the chunks, `texts` what to index for each.
+        """
+        self.ids = np.asarray(list(ids), dtype="int64")
+        vocab = {}
+        rows, terms, freqs = [], [], []
+        doc_len = np.zeros(len(self.ids), dtype="float32")
+        for row, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            doc_len[row] = sum(counts.values())
+            for token, tf in counts.items():
+                rows.append(row)
+                terms.append(vocab.setdefault(token, len(vocab)))
+                freqs.append(tf)
+
+        # CSR by term: postings of term t are [indptr[t], indptr[t + 1])
+        terms = np.asarray(terms, dtype="int64")
+        order = np.argsort(terms, kind="stable")
+        self.vocab = vocab
+        self.indptr = np.zeros(len(vocab) + 1, dtype="int64")
+        np.cumsum(np.bincount(terms, minlength=len(vocab)), out=self.indptr[1:])
+        self.rows = np.asarray(rows, dtype="int32")[order]
+        self.tfs = np.asarray(freqs, dtype="float32")[order]
+
+        n = len(self.ids)
+        df = np.diff(self.indptr).astype("float32")
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype("float32")
+        avg_len = float(doc_len.mean()) if n else 0.0
+        # Per-document length normalization, folded once at build time
+        self.norm = (K1 * (1 - B + B * doc_len / avg_len)).astype("float32") if n and avg_len else doc_len
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, k: int):
+        """
+        [(index id, score)] for the k best-scoring chunks, best first.
+        """
+        if not len(self.ids):
+            return []
+        scores = np.zeros(len(self.ids), dtype="float32")
+        for token in set(tokenize(query)):
+            t = self.vocab.get(token)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            rows, tf = self.rows[lo:hi], self.tfs[lo:hi]
+            # A term has one posting per chunk, so plain fancy-index += is safe
+            scores[rows] += self.idf[t] * tf * (K1 + 1) / (tf + self.norm[rows])
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(int(self.ids[row]), float(scores[row])) for row in hits]
+
+
+def rrf_fuse(rankings, k: int, rrf_k: int = 60):
+    """
+    Reciprocal rank fusion of several [(id, score)] rankings.
+    Returns [(id, fused score)] for the top k ids.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _score) in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,125 @@
+"""
+Token-budgeted context assembly for the policy generator.
+
+Joining every retrieved chunk produced long, duplicated prompts (the old
+fixed-width chunks overlapped by 400 chars) that the T5 tokenizer silently
+cut at 512 tokens. build_context():
+  1. merges chunks of the same document page whose spans overlap or touch
+     (using the start/end offsets in the chunk meta), so every passage
+     appears once
+  2. packs the merged passages best-score first into a token budget measured
+     with the generator's own tokenizer, trimming the last one to fit
+  3. returns the packed passages in page order plus the (document, page)
+     pairs they came from; cite() turns those into text for the reply
+"""
+import settings
+
+
+class _Passage:
+    __slots__ = ("doc", "page", "start", "end", "text", "score")
+
+    def __init__(self, doc, page, start, end, text, score):
+        self.doc = doc
+        self.page = page
+        self.start = start
+        self.end = end
+        self.text = text
+        self.score = score
+
+
+def merge_chunks(retrieved) -> list:
+    """
+    [(text, meta, score)] -> passages with overlapping chunks of the same
+    document page merged.
+    """
+    passages = []
+    by_page = {}
+    for text, meta, score in retrieved:
+        if "start" not in meta:
+            passages.append(_Passage(meta.get("doc"), meta.get("page"), None, None, text, score))
+            continue
+        key = (meta.get("doc"), meta["page"])
+        by_page.setdefault(key, []).append((meta["start"], meta["start"] + len(text), text, score))
+
+    for (doc, page), spans in by_page.items():
+        spans.sort()
+        current = None
+        for start, end, text, score in spans:
+            if current is not None and start <= current.end:
+                if end > current.end:
+                    current.text += text[current.end - start:]
+                    current.end = end
+                current.score = max(current.score, score)
+                continue
+            current = _Passage(doc, page, start, end, text, score)
+            passages.append(current)
+    return passages
+
+
+def _token_counter(tokenizer):
+    if tokenizer is None:
+        return lambda text: max(1, len(text) // 4)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _trim(text: str, tokens: int, tokenizer) -> str:
+    if tokenizer is None:
+        return text[:tokens * 4]
+    ids = tokenizer.encode(text, add_special_tokens=False)[:tokens]
+    return tokenizer.decode(ids, skip_special_tokens=True)
+
+
+def build_context(retrieved, tokenizer=None, budget: int = None):
+    """
+    (context, [(doc, page)]) packed into at most `budget` tokens.
+    """
+    budget = settings.POLICY_CONTEXT_MAX_TOKENS if budget is None else budget
+    count = _token_counter(tokenizer)
+
+    packed = []
+    remaining = budget
+    for passage in sorted(merge_chunks(retrieved), key=lambda p: p.score, reverse=True):
+        if remaining <= 0:
+            break
+        tokens = count(passage.text)
+        if tokens > remaining:
+            # Only worth trimming when a meaningful piece still fits
+            if remaining < settings.POLICY_CONTEXT_MIN_TAIL_TOKENS:
+                break
+            passage.text = _trim(passage.text, remaining, tokenizer)
+            tokens = remaining
+        packed.append(passage)
+        remaining -= tokens
+
+    packed.sort(key=lambda p: (p.doc or "", p.page or 0, p.start or 0))
+    context = " \n".join(p.text for p in packed)
+    pages = sorted({(p.doc or "", p.page) for p in packed if p.page is not None})
+    return context, pages
+
+
+def cite(pages) -> str:
+    """
+    [(doc, page)] -> "page 3 of leave.pdf; pages 2, 7 of handbook.pdf".
+    """
+    by_doc = {}
+    for doc, page in pages:
+        by_doc.setdefault(doc, []).append(page)
+    parts = []
+    for doc, numbers in by_doc.items():
+        label = ("page " if len(numbers) == 1 else "pages ") + ", ".join(map(str, numbers))
+        parts.append(f"{label} of {doc}" if doc else label)
+    return "; ".join(parts)
+
+
+def context_budget(tokenizer, prompt_without_context: str) -> int:
+    """
+    Tokens left for context once the prompt template and question are counted,
+    capped by POLICY_CONTEXT_MAX_TOKENS.
+    """
+    if tokenizer is None:
+        return settings.POLICY_CONTEXT_MAX_TOKENS
+    model_max = getattr(tokenizer, "model_max_length", 512)
+    if not model_max or model_max > 100000:  # "unlimited" sentinel on some tokenizers
+        model_max = 512
+    overhead = len(tokenizer.encode(prompt_without_context))
+    return max(0, min(settings.POLICY_CONTEXT_MAX_TOKENS, model_max - overhead))
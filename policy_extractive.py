@@ -0,0 +1,116 @@
+"""
+Extractive tier of policy answering.
+
+Many policy answers already exist verbatim as a sentence of a policy
+document. At index time every page is split into sentences, each sentence
+remembers the chunks it overlaps, and its normalized embedding is stored next
+to the chunk embeddings. At question time the sentences of the retrieved chunks are scored
+against the query embedding; when the best one clears
+POLICY_EXTRACTIVE_THRESHOLD it is returned (with its neighbours in the top
+POLICY_EXTRACTIVE_MAX_SENTENCES) instead of running the generator.
+
+TierStats records which tier answered each question and how long it took,
+so /metrics can show the generator time the cheaper tiers saved.
+"""
+import re
+import threading
+
+import numpy as np
+
+import settings
+
+# Sentence ends at . ! ? followed by whitespace, or at a line break
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+# Line wraps inside a sentence: newline followed by a lowercase continuation
+_SOFT_WRAP = re.compile(r"\n(?=[a-z(])")
+_MIN_WORDS = 4
+
+
+def split_sentences(text: str):
+    """
+    [(start, end, sentence)] with offsets into `text`.
+    """
+    text = _SOFT_WRAP.sub(" ", text)  # same length, offsets stay valid
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    sentences = []
+    for s, e in spans:
+        sentence = text[s:e].strip()
+        if len(sentence.split()) >= _MIN_WORDS:
+            sentences.append((s, e, sentence))
+    return sentences
+
+
+def page_sentences(page_text: str, page: int, chunk_spans) -> list:
+    """
+    Sentence records for one page, each linked to the chunks it overlaps.
+    `chunk_spans` is [(chunk id, start, end)] with offsets into page_text.
+    """
+    records = []
+    for start, end, sentence in split_sentences(page_text):
+        chunk_ids = [cid for cid, c_start, c_end in chunk_spans if c_start < end and start < c_end]
+        records.append({"text": sentence, "page": page, "chunks": chunk_ids})
+    return records
+
+
+def extract_answer(q_emb, chunk_ids, sentences: list, sentence_embs, threshold: float = None, max_sentences: int = None):
+    """
+    (answer, [(doc, page)], score) from the sentences of the retrieved chunks, or
+    None when no sentence is a confident enough match.
+    """
+    threshold = settings.POLICY_EXTRACTIVE_THRESHOLD if threshold is None else threshold
+    max_sentences = settings.POLICY_EXTRACTIVE_MAX_SENTENCES if max_sentences is None else max_sentences
+    if sentence_embs is None or not sentences or max_sentences <= 0:
+        return None
+
+    wanted = set(chunk_ids)
+    candidates = [i for i, s in enumerate(sentences) if wanted.intersection(s["chunks"])]
+    if not candidates:
+        return None
+
+    scores = sentence_embs[candidates] @ np.asarray(q_emb, dtype="float32").reshape(-1)
+    order = np.argsort(-scores)
+    best = float(scores[order[0]])
+    if best < threshold:
+        return None
+
+    # Keep runner-up sentences that score close to the best one, in reading order
+    picked = [candidates[i] for i in order[:max_sentences] if scores[i] >= best - settings.POLICY_EXTRACTIVE_MARGIN]
+    picked.sort()
+    answer = " ".join(sentences[i]["text"] for i in picked)
+    pages = sorted({(sentences[i].get("doc") or "", sentences[i]["page"]) for i in picked})
+    return answer, pages, best
+
+
+class TierStats:
+    TIERS = ("cache_exact", "cache_semantic", "extractive", "generative", "none")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {tier: [0, 0.0] for tier in self.TIERS}
+
+    def record(self, tier: str, seconds: float):
+        with self._lock:
+            entry = self._counts.setdefault(tier, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            tiers = {
+                tier: {"answered": count, "avg_ms": 1000 * total / count if count else 0.0}
+                for tier, (count, total) in self._counts.items()
+            }
+        gen_count, gen_total = self._counts["generative"]
+        gen_mean = gen_total / gen_count if gen_count else 0.0
+        cheap = ("cache_exact", "cache_semantic", "extractive")
+        saved = sum(self._counts[t][0] * gen_mean - self._counts[t][1] for t in cheap)
+        return {"tiers": tiers, "generator_seconds_saved": max(0.0, saved)}
+
+
+policy_tiers = TierStats()
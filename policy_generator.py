@@ -0,0 +1,85 @@
+"""
+Generator backends for the policy QA pipeline (Flan-T5).
+
+POLICY_QA_BACKEND selects how QA_PIPELINE is built:
+  pytorch - fp32 transformers pipeline (the original setup)
+  int8    - the same model with torch dynamic int8 quantization of the
+            Linear layers; smaller and faster on CPU
+  onnx    - encoder/decoder exported to ONNX Runtime with KV-cache through
+            optimum (see requirements-optional.txt); the export is kept
+            under POLICY_QA_ONNX_DIR so it only happens once
+
+Every backend returns a text2text-generation pipeline, so callers keep using
+QA_PIPELINE(prompt, max_length=..., do_sample=False)[0]["generated_text"].
+A backend that fails to load falls back to pytorch.
+"""
+import logging
+import os
+import time
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+BACKENDS = ("pytorch", "int8", "onnx")
+TASK = "text2text-generation"
+
+
+def _load_pytorch(model_name: str):
+    from transformers import pipeline
+    return pipeline(TASK, model=model_name, device=-1)
+
+
+def _load_int8(model_name: str):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline(TASK, model=model, tokenizer=tokenizer, device=-1)
+
+
+def _load_onnx(model_name: str):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = os.path.join(settings.POLICY_QA_ONNX_DIR, model_name.replace("/", "--"))
+    if os.path.isfile(os.path.join(export_dir, "config.json")):
+        model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    else:
+        print(f"📦 Exporting {model_name} to ONNX (one-time)...")
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+    return pipeline(TASK, model=model, tokenizer=tokenizer, device=-1)
+
+
+_LOADERS = {"pytorch": _load_pytorch, "int8": _load_int8, "onnx": _load_onnx}
+
+
+def load_generator(backend: str = None, model_name: str = None):
+    """
+    Build the QA generation pipeline for `backend` (default POLICY_QA_BACKEND).
+    """
+    backend = (backend or settings.POLICY_QA_BACKEND).lower()
+    model_name = model_name or settings.POLICY_QA_MODEL
+    if backend not in _LOADERS:
+        logger.warning(f"Unknown POLICY_QA_BACKEND '{backend}', using pytorch")
+        backend = "pytorch"
+
+    start = time.perf_counter()
+    try:
+        generator = _LOADERS[backend](model_name)
+    except Exception as e:
+        if backend == "pytorch":
+            raise
+        logger.warning(f"Could not load the {backend} QA backend ({e}), falling back to pytorch")
+        backend = "pytorch"
+        generator = _load_pytorch(model_name)
+    print(f"🧠 Policy QA generator: {model_name} [{backend}] loaded in {time.perf_counter() - start:.1f}s")
+    generator.backend = backend
+    return generator
@@ -0,0 +1,225 @@
+"""
+On-disk cache of the policy vector store.
+
+Layout under POLICY_INDEX_CACHE_DIR:
+
+    docs/<key>/              one entry per ingested document version
+        manifest.json        what the entry was built from
+        chunks.json          chunk texts, chunk meta and sentence records
+        embeddings.npy       L2-normalized float32 chunk embeddings (memory-mapped)
+        sentences.npy        L2-normalized float32 sentence embeddings (memory-mapped)
+    index.faiss              the FAISS IndexIDMap2 over every document's chunks
+    index.json               which document owns which ids in index.faiss
+
+A document <key> hashes its content, the embedding model name, the chunk
+size and INDEX_FORMAT_VERSION, so only changed documents are re-extracted
+and re-embedded. Document entries no longer referenced by index.json are
+pruned down to POLICY_INDEX_CACHE_KEEP spares.
+
+Workers forked by serve.py share one cache directory; writers hold
+lock() (an flock on .lock in the cache root) so their saves and prunes
+never interleave.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no fork, so a single process owns the cache
+    fcntl = None
+
+import numpy as np
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+# Bump when the chunking or index layout changes in a way the key can't see
+INDEX_FORMAT_VERSION = 5
+
+MANIFEST = "manifest.json"
+CHUNKS = "chunks.json"
+EMBEDDINGS = "embeddings.npy"
+SENTENCE_EMBEDDINGS = "sentences.npy"
+INDEX = "index.faiss"
+INDEX_MANIFEST = "index.json"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_key(doc_sha256: str, model_name: str, chunk_size: int) -> str:
+    parts = [f"v{INDEX_FORMAT_VERSION}", doc_sha256, model_name, str(chunk_size)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def _write_atomic(path: str, write):
+    """
+    Call write(tmp_path) and rename the result over `path`.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class PolicyIndexCache:
+    def __init__(self, root: str = None, keep: int = None):
+        self.root = settings.POLICY_INDEX_CACHE_DIR if root is None else root
+        self.keep = settings.POLICY_INDEX_CACHE_KEEP if keep is None else keep
+        self.docs_root = os.path.join(self.root, "docs")
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.docs_root, key)
+
+    @contextmanager
+    def lock(self):
+        """
+        Exclusive across processes; blocks until the holder is done.
+        """
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # -----------------------------
+    # Per-document entries
+    # -----------------------------
+
+    def load(self, key: str):
+        """
+        The stored document for `key` as a dict (texts, meta, embeddings,
+        sentences, sentence_embeddings), or None on a miss or an unreadable
+        entry.
+        """
+        entry = self.path(key)
+        try:
+            with open(os.path.join(entry, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != INDEX_FORMAT_VERSION or manifest.get("key") != key:
+                return None
+            with open(os.path.join(entry, CHUNKS), encoding="utf-8") as f:
+                store = json.load(f)
+            store["embeddings"] = np.load(os.path.join(entry, EMBEDDINGS), mmap_mode="r")
+            store["sentence_embeddings"] = np.load(os.path.join(entry, SENTENCE_EMBEDDINGS), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable policy index cache {entry}: {e}")
+            return None
+
+        if not (len(store["texts"]) == len(store["meta"]) == store["embeddings"].shape[0]
+                and len(store["sentences"]) == store["sentence_embeddings"].shape[0]):
+            logger.warning(f"Ignoring inconsistent policy index cache {entry}")
+            return None
+        os.utime(entry)  # keep recently used entries out of prune()
+        return store
+
+    def save(self, key: str, store: dict, source: dict = None):
+        """
+        Write the entry to a temp dir and rename it into place, so a crash
+        mid-write never leaves a half-built entry behind. Call under lock().
+        """
+        os.makedirs(self.docs_root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=self.docs_root)
+        try:
+            with open(os.path.join(tmp, CHUNKS), "w", encoding="utf-8") as f:
+                json.dump({k: store[k] for k in ("texts", "meta", "sentences")}, f, ensure_ascii=False)
+            np.save(os.path.join(tmp, EMBEDDINGS), np.ascontiguousarray(store["embeddings"], dtype="float32"))
+            np.save(os.path.join(tmp, SENTENCE_EMBEDDINGS),
+                    np.ascontiguousarray(store["sentence_embeddings"], dtype="float32"))
+            manifest = dict(source or {}, version=INDEX_FORMAT_VERSION, key=key,
+                            chunks=len(store["texts"]), sentences=len(store["sentences"]),
+                            created=time.time())
+            with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            entry = self.path(key)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def prune(self, in_use=()):
+        """
+        Drop document entries not in `in_use`, keeping the newest
+        POLICY_INDEX_CACHE_KEEP of them as spares (e.g. for a quick revert).
+        """
+        in_use = set(in_use)
+        try:
+            entries = [
+                name for name in os.listdir(self.docs_root)
+                if not name.startswith(".") and os.path.isdir(self.path(name))
+            ]
+        except OSError:
+            return
+        spare = sorted((n for n in entries if n not in in_use),
+                       key=lambda n: os.path.getmtime(self.path(n)), reverse=True)
+        for name in spare[self.keep:]:
+            shutil.rmtree(self.path(name), ignore_errors=True)
+
+    # -----------------------------
+    # Combined index
+    # -----------------------------
+
+    def load_index(self):
+        """
+        (faiss index, index manifest), or None when missing or unreadable.
+        """
+        import faiss
+
+        try:
+            with open(os.path.join(self.root, INDEX_MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != INDEX_FORMAT_VERSION:
+                return None
+            index = faiss.read_index(os.path.join(self.root, INDEX))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable policy index: {e}")
+            return None
+        # The two files are replaced one after the other; a crash in between shows up here
+        if index.ntotal != manifest.get("ntotal"):
+            logger.warning("Ignoring policy index that doesn't match its manifest")
+            return None
+        return index, manifest
+
+    def save_index(self, index, manifest: dict):
+        import faiss
+
+        os.makedirs(self.root, exist_ok=True)
+        manifest = dict(manifest, version=INDEX_FORMAT_VERSION, ntotal=int(index.ntotal), saved=time.time())
+        _write_atomic(os.path.join(self.root, INDEX), lambda tmp: faiss.write_index(index, tmp))
+
+        def write_manifest(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        _write_atomic(os.path.join(self.root, INDEX_MANIFEST), write_manifest)
+
+
+policy_index_cache = PolicyIndexCache()
@@ -0,0 +1,445 @@
+"""
+Incremental, structure-aware ingestion of the policy documents directory.
+
+Every PDF under POLICY_DOCS_DIR is hashed. Only new or changed documents
+are extracted and embedded: their pages stream out of pdfplumber (spread
+over POLICY_INGEST_WORKERS processes for larger files) and are cut into
+chunks on headings, then paragraphs, then sentences, never mid-sentence
+unless a single sentence is longer than POLICY_CHUNK_SIZE. Their vectors are
+added to the FAISS IndexIDMap2 with add_with_ids; vectors of changed or
+deleted documents are dropped with remove_ids. The index itself is never
+rebuilt unless the embedding model, chunk size or cache format changes.
+
+Each document's chunks, sentences and embeddings are cached on disk by
+content hash (see policy_index_cache.py), so unchanged documents cost a
+memory-mapped load at startup.
+
+Readers never see the store mid-update: PolicyStore.snapshot() hands out an
+immutable PolicySnapshot, and the next sync works on a copy of the index.
+
+faiss and pdfplumber are imported where they are used, so main.py can
+import this module without loading them.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import settings
+from policy_bm25 import BM25Index
+from policy_extractive import page_sentences
+from policy_index_cache import file_sha256, index_key, policy_index_cache
+
+logger = logging.getLogger("fastapi-rasa")
+
+PAGES_PER_TASK = 8
+
+_NUMBERED = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.|(?:section|article|chapter|part)\s+\w+)\s+\S", re.I)
+_BULLET = re.compile(r"^(?:[-•▪●◦*]|\(?[a-z0-9]{1,2}[.)])\s+", re.I)
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_LINE = re.compile(r"[^\n]*\n?")
+
+
+# -----------------------------
+# Page extraction
+# -----------------------------
+
+def _extract_range(args):
+    import pdfplumber
+
+    path, first, last = args
+    with pdfplumber.open(path) as pdf:
+        pages = []
+        for n in range(first, last):
+            page = pdf.pages[n]
+            pages.append((n + 1, page.extract_text() or ""))
+            page.close()
+        return pages
+
+
+def iter_pages(path: str, workers: int = None):
+    """
+    Yields (page number, text) in page order. Files of more than
+    2 * PAGES_PER_TASK pages are extracted in parallel worker processes,
+    spawned rather than forked: this runs on the "index" pool thread of a
+    process with torch/TF threads alive, and forking that can deadlock.
+    """
+    import pdfplumber
+
+    workers = settings.POLICY_INGEST_WORKERS if workers is None else workers
+    with pdfplumber.open(path) as pdf:
+        count = len(pdf.pages)
+        if workers <= 1 or count <= 2 * PAGES_PER_TASK:
+            for pageno, page in enumerate(pdf.pages, start=1):
+                yield pageno, page.extract_text() or ""
+                page.close()
+            return
+
+    ranges = [(path, first, min(first + PAGES_PER_TASK, count)) for first in range(0, count, PAGES_PER_TASK)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as pool:
+        for pages in pool.map(_extract_range, ranges):
+            yield from pages
+
+
+# -----------------------------
+# Structure-aware chunking
+# -----------------------------
+
+def is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 80 or line[-1] in ".,;":
+        return False
+    words = line.split()
+    if len(words) > 10 or _BULLET.match(line):
+        return False
+    if _NUMBERED.match(line) and len(words) <= 8:
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    # Short Title Case lines ("Leave Encashment", "ON DUTY Request (OD)")
+    long_words = [w for w in words if len(w) > 3 and w[0].isalpha()]
+    return len(words) <= 6 and bool(long_words) and all(w[0].isupper() for w in long_words)
+
+
+def _blocks(page_text: str):
+    """
+    [(kind, start, end)] where kind is "heading" or "para". Paragraphs end at
+    blank lines, bullets, headings, and short lines that close a sentence.
+    """
+    lines = [(m.start(), m.end()) for m in _LINE.finditer(page_text) if m.end() > m.start()]
+    width = max((len(page_text[s:e].rstrip()) for s, e in lines), default=0)
+    blocks = []
+    para = None
+    for start, end in lines:
+        line = page_text[start:end].strip()
+        if not line:
+            if para:
+                blocks.append(("para", *para))
+                para = None
+            continue
+        if is_heading(line):
+            if para:
+                blocks.append(("para", *para))
+                para = None
+            blocks.append(("heading", start, end))
+            continue
+        if para and _BULLET.match(line):
+            blocks.append(("para", *para))
+            para = None
+        para = (para[0], end) if para else (start, end)
+        if line[-1] in ".!?:" and len(line) < 0.6 * width:
+            blocks.append(("para", *para))
+            para = None
+    if para:
+        blocks.append(("para", *para))
+    return blocks
+
+
+def _units(page_text: str, max_chars: int):
+    """
+    Blocks split down to pieces no longer than max_chars: whole paragraphs
+    when they fit, else sentences, else fixed-width slices.
+    """
+    for kind, start, end in _blocks(page_text):
+        if kind == "heading" or end - start <= max_chars:
+            yield kind, start, end
+            continue
+        first = True
+        s_start = start
+        breaks = [m.end() for m in _SENTENCE_BREAK.finditer(page_text, start, end)] + [end]
+        for s_end in breaks:
+            for piece in range(s_start, s_end, max_chars):
+                yield ("para" if first else "sent"), piece, min(piece + max_chars, s_end)
+                first = False
+            s_start = s_end
+
+
+def structured_chunks(page_text: str, max_chars: int, heading: str = ""):
+    """
+    ([(start, end, heading)], last heading) for one page. Chunks are
+    contiguous slices of page_text; `heading` carries the section title over
+    from the previous page.
+    """
+    chunks = []
+    current = None  # [start, end, heading, has_body]
+
+    def flush():
+        if current and current[3]:
+            chunks.append((current[0], current[1], current[2]))
+
+    for kind, start, end in _units(page_text, max_chars):
+        if kind == "heading":
+            if current and not current[3]:
+                current[1] = end  # consecutive headings stay together
+            else:
+                flush()
+                current = [start, end, "", False]
+            current[2] = heading = " ".join(page_text[current[0]:end].split())
+            continue
+        if current is None:
+            current = [start, end, heading, True]
+        elif not current[3] or end - current[0] <= max_chars:
+            # A heading always keeps its first piece of body text
+            current[1], current[3] = end, True
+        else:
+            flush()
+            current = [start, end, heading, True]
+    flush()
+    return chunks, heading
+
+
+# -----------------------------
+# Documents
+# -----------------------------
+
+def list_documents(docs_dir: str) -> dict:
+    """
+    { path relative to docs_dir: absolute path } for every PDF below docs_dir.
+    """
+    found = {}
+    for root, _dirs, files in os.walk(docs_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(root, name)
+                found[os.path.relpath(path, docs_dir).replace(os.sep, "/")] = path
+    return found
+
+
+def ingest_document(path: str, name: str, embed_model, chunk_size: int) -> dict:
+    """
+    Extract, chunk and embed one document. Chunk ids in the result are local
+    (0..n-1); PolicyStore maps them to index ids.
+    """
+    texts, meta, sentences, embed_inputs = [], [], [], []
+    heading = ""
+    for pageno, page_text in iter_pages(path):
+        if not page_text.strip():
+            continue
+        spans, heading = structured_chunks(page_text, chunk_size, heading)
+        chunk_spans = []
+        for start, end, chunk_heading in spans:
+            local_id = len(texts)
+            texts.append(page_text[start:end])
+            meta.append({"doc": name, "page": pageno, "chunk_id": local_id,
+                         "start": start, "end": end, "heading": chunk_heading})
+            # The section title gives short chunks the context they lack on their own
+            embed_inputs.append(f"{chunk_heading}\n{texts[-1]}" if chunk_heading else texts[-1])
+            chunk_spans.append((local_id, start, end))
+        sentences.extend(page_sentences(page_text, pageno, chunk_spans))
+
+    dim = embed_model.get_sentence_embedding_dimension()
+    embs = embed_model.encode(embed_inputs, normalize_embeddings=True) if texts else np.zeros((0, dim))
+    sent_embs = (embed_model.encode([s["text"] for s in sentences], normalize_embeddings=True)
+                 if sentences else np.zeros((0, dim)))
+    for s in sentences:
+        s["doc"] = name
+    return {
+        "texts": texts,
+        "meta": meta,
+        "sentences": sentences,
+        "embeddings": np.ascontiguousarray(embs, dtype="float32").reshape(len(texts), dim),
+        "sentence_embeddings": np.ascontiguousarray(sent_embs, dtype="float32").reshape(len(sentences), dim),
+    }
+
+
+class PolicyStore:
+    """
+    Documents, their cached chunk data and the combined FAISS index.
+    """
+
+    def __init__(self, embed_model, model_name: str = None, chunk_size: int = None, cache=None):
+        self.embed_model = embed_model
+        self.model_name = model_name or settings.POLICY_EMBED_MODEL
+        self.chunk_size = settings.POLICY_CHUNK_SIZE if chunk_size is None else chunk_size
+        self.cache = cache or policy_index_cache
+        self.dim = embed_model.get_sentence_embedding_dimension()
+        self.index = None
+        self.docs = {}      # { name: {"sha256", "key", "first", "count", "store"} }
+        self.next_id = 0
+        self._index_shared = False  # a snapshot still searches self.index
+
+    def _new_index(self):
+        import faiss
+
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    def _restore(self):
+        """
+        Pick up the index and document table saved by the previous run.
+        """
+        self.index, self.docs, self.next_id = self._new_index(), {}, 0
+        saved = self.cache.load_index()
+        if saved is None:
+            return
+        index, manifest = saved
+        if manifest.get("model") != self.model_name or manifest.get("chunk_size") != self.chunk_size:
+            return
+        self.index, self.next_id = index, manifest.get("next_id", 0)
+        for name, doc in manifest.get("docs", {}).items():
+            store = self.cache.load(doc["key"])
+            if store is None or len(store["texts"]) != doc["count"]:
+                self._remove_ids(doc["first"], doc["count"])
+                continue
+            self.docs[name] = dict(doc, store=store)
+
+    def _writable_index(self):
+        if self._index_shared:
+            import faiss
+
+            self.index = faiss.clone_index(self.index)
+            self._index_shared = False
+        return self.index
+
+    def _remove_ids(self, first: int, count: int):
+        if count:
+            self._writable_index().remove_ids(np.arange(first, first + count, dtype="int64"))
+
+    def _add(self, name: str, sha256: str, key: str, store: dict):
+        count = len(store["texts"])
+        first = self.next_id
+        self.next_id += count
+        if count:
+            self._writable_index().add_with_ids(store["embeddings"], np.arange(first, first + count, dtype="int64"))
+        self.docs[name] = {"sha256": sha256, "key": key, "first": first, "count": count, "store": store}
+
+    def sync(self, docs_dir: str) -> dict:
+        """
+        Bring the index in line with docs_dir. Returns the names of added,
+        updated, removed and unchanged documents.
+
+        Runs under the cache lock: when several workers see the same change,
+        the first one embeds the new documents and the others load its
+        cache entries.
+        """
+        with self.cache.lock():
+            return self._sync(docs_dir)
+
+    def _sync(self, docs_dir: str) -> dict:
+        if self.index is None:
+            self._restore()
+
+        found = list_documents(docs_dir)
+        changes = {"added": [], "updated": [], "removed": [], "unchanged": []}
+
+        for name in sorted(set(self.docs) - set(found)):
+            doc = self.docs.pop(name)
+            self._remove_ids(doc["first"], doc["count"])
+            changes["removed"].append(name)
+
+        for name, path in sorted(found.items()):
+            sha256 = file_sha256(path)
+            old = self.docs.get(name)
+            if old and old["sha256"] == sha256:
+                changes["unchanged"].append(name)
+                continue
+
+            key = index_key(sha256, self.model_name, self.chunk_size)
+            store = self.cache.load(key)
+            if store is None:
+                print(f"📄 Ingesting {name}...")
+                store = ingest_document(path, name, self.embed_model, self.chunk_size)
+                try:
+                    self.cache.save(key, store, source={
+                        "doc": name, "sha256": sha256, "model": self.model_name, "chunk_size": self.chunk_size,
+                    })
+                except Exception as e:
+                    logger.warning(f"Could not cache policy document {name}: {e}")
+            if old:
+                self._remove_ids(old["first"], old["count"])
+            self._add(name, sha256, key, store)
+            changes["updated" if old else "added"].append(name)
+
+        if changes["added"] or changes["updated"] or changes["removed"]:
+            self.save()
+        return changes
+
+    def save(self):
+        manifest = {
+            "model": self.model_name,
+            "chunk_size": self.chunk_size,
+            "next_id": self.next_id,
+            "docs": {name: {k: v for k, v in doc.items() if k != "store"} for name, doc in self.docs.items()},
+        }
+        try:
+            self.cache.save_index(self.index, manifest)
+            self.cache.prune(in_use=[doc["key"] for doc in self.docs.values()])
+        except Exception as e:
+            logger.warning(f"Could not save policy index: {e}")
+
+    def snapshot(self, version: int = 0) -> "PolicySnapshot":
+        """
+        Freeze the current documents and index into lookup tables keyed by
+        index id, for search and the extractive tier.
+        """
+        texts, meta, sentences, sent_blocks = {}, {}, [], []
+        for name in sorted(self.docs):
+            doc = self.docs[name]
+            store, first = doc["store"], doc["first"]
+            for local_id, (text, m) in enumerate(zip(store["texts"], store["meta"])):
+                texts[first + local_id] = text
+                meta[first + local_id] = dict(m, chunk_id=first + local_id)
+            sentences.extend(dict(s, chunks=[first + c for c in s["chunks"]]) for s in store["sentences"])
+            sent_blocks.append(store["sentence_embeddings"])
+        sentence_embs = (np.ascontiguousarray(np.concatenate(sent_blocks), dtype="float32")
+                         if sent_blocks else np.zeros((0, self.dim), dtype="float32"))
+        # Lexical index over the same chunks, section heading included
+        lexical = BM25Index(texts.keys(), (f"{meta[i]['heading']} {texts[i]}" for i in texts))
+        self._index_shared = True
+        return PolicySnapshot(
+            texts, meta, tuple(sentences), sentence_embs, self.index, lexical,
+            version, {name: doc["sha256"] for name, doc in self.docs.items()},
+        )
+
+
+class PolicySnapshot:
+    """
+    One consistent version of the policy index. Never modified after
+    creation; a reload builds a new one and swaps the reference.
+    """
+    __slots__ = ("texts", "meta", "sentences", "sentence_embs", "index", "lexical", "version", "docs", "created")
+
+    def __init__(self, texts, meta, sentences, sentence_embs, index, lexical=None, version=0, docs=None):
+        self.texts = texts              # { index id: chunk text }
+        self.meta = meta                # { index id: {"doc", "page", "chunk_id", "start", "end", "heading"} }
+        self.sentences = sentences
+        self.sentence_embs = sentence_embs
+        self.index = index
+        self.lexical = lexical          # BM25Index over the same chunk ids
+        self.version = version
+        self.docs = docs or {}          # { document name: sha256 }
+        self.created = time.time()
+        if sentence_embs is not None:
+            sentence_embs.flags.writeable = False
+
+    @classmethod
+    def empty(cls):
+        return cls({}, {}, (), None, None)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "documents": len(self.docs),
+            "chunks": len(self.texts),
+            "sentences": len(self.sentences),
+            "created": self.created,
+        }
+
+
+def docs_fingerprint(docs_dir: str):
+    """
+    Cheap change detector for the watcher: (name, size, mtime) of every PDF.
+    """
+    fingerprint = []
+    for name, path in sorted(list_documents(docs_dir).items()):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((name, st.st_size, st.st_mtime_ns))
+    return tuple(fingerprint)
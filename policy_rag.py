@@ -0,0 +1,229 @@
+"""
+Policy question answering over the PDFs in POLICY_DOCS_DIR: hybrid
+retrieval over the FAISS/BM25 index (policy_ingest.py), then the cheapest
+answer tier that works (cache, extractive, Flan-T5).
+
+The embedding model and the generator are loaded by build_policy_store(),
+which the "policy" component runs in a background thread; importing this
+module doesn't pull in torch or transformers.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+import numpy as np
+
+import settings
+from executors import PoolSaturated, run_in
+from policy_answer_cache import policy_answers
+from policy_bm25 import rrf_fuse
+from policy_context import build_context, context_budget
+from policy_extractive import extract_answer, policy_tiers
+from policy_generator import load_generator
+from policy_ingest import PolicySnapshot, PolicyStore, docs_fingerprint
+
+logger = logging.getLogger("fastapi-rasa")
+
+# -------------------------------
+# Globals
+# -------------------------------
+POLICY = PolicySnapshot.empty()   # swapped as a whole on every rebuild; never mutated
+EMBED_MODEL = None
+QA_PIPELINE = None
+POLICY_STORE = None
+_POLICY_BUILD_LOCK = threading.Lock()
+# Watcher rebuild failures, reported next to POLICY.info() in /metrics
+REBUILD_STATUS = {"failures": 0, "last_error": None, "last_error_at": None, "next_retry_at": None}
+
+QA_PROMPT = "Answer the question based on the context:\nContext: {context}\nQuestion: {question}"
+
+# -------------------------------
+# 1) Build FAISS store
+# -------------------------------
+def build_policy_store(docs_dir=None):
+    """
+    Bring the policy index up to date with the documents directory: only new
+    or changed PDFs are extracted and embedded (see policy_ingest.py).
+    Queries keep using the previous snapshot until the new one is swapped in.
+    """
+    global POLICY, EMBED_MODEL, QA_PIPELINE, POLICY_STORE
+    docs_dir = docs_dir or settings.POLICY_DOCS_DIR
+
+    with _POLICY_BUILD_LOCK:
+        if POLICY_STORE is None:
+            from sentence_transformers import SentenceTransformer
+
+            EMBED_MODEL = SentenceTransformer(settings.POLICY_EMBED_MODEL)
+            POLICY_STORE = PolicyStore(EMBED_MODEL)
+
+        changes = POLICY_STORE.sync(docs_dir)
+        changed = bool(changes["added"] or changes["updated"] or changes["removed"])
+        if changed or POLICY.index is None:
+            POLICY = POLICY_STORE.snapshot(version=POLICY.version + 1)
+            # Answers computed against the previous index are no longer valid
+            policy_answers.clear()
+        print(
+            f"📑 Policy index v{POLICY.version}: {len(POLICY.texts)} chunks from {len(POLICY.docs)} documents "
+            f"(added {len(changes['added'])}, updated {len(changes['updated'])}, removed {len(changes['removed'])})"
+        )
+
+        # 2) Generative QA pipeline (Flan-T5)
+        if QA_PIPELINE is None:
+            QA_PIPELINE = load_generator()
+    return dict(changes, snapshot=POLICY.info())
+
+
+def index_status() -> dict:
+    return dict(POLICY.info(), rebuild=dict(REBUILD_STATUS))
+
+
+async def watch_policy_documents():
+    """
+    Poll the documents directory and rebuild the index once a change has
+    been stable for one interval (so half-copied PDFs aren't ingested).
+    A failed rebuild is retried with exponential backoff until it succeeds.
+    """
+    docs_dir = settings.POLICY_DOCS_DIR
+    interval = settings.POLICY_WATCH_INTERVAL
+    applied = seen = docs_fingerprint(docs_dir)
+    retry_at = 0.0
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            current = docs_fingerprint(docs_dir)
+            if current != seen:
+                # A new change may fix what failed; try it without waiting out the backoff
+                seen = current
+                retry_at = 0.0
+                continue
+            if current == applied or time.monotonic() < retry_at:
+                continue
+            logger.info("📂 Policy documents changed, rebuilding the index")
+            await run_in("index", build_policy_store, docs_dir)
+            applied = current
+            retry_at = 0.0
+            REBUILD_STATUS.update(failures=0, next_retry_at=None)
+        except PoolSaturated:
+            pass  # a reload is already running; look again next interval
+        except Exception as e:
+            failures = REBUILD_STATUS["failures"] + 1
+            delay = min(interval * 2 ** failures, settings.POLICY_REBUILD_MAX_BACKOFF)
+            retry_at = time.monotonic() + delay
+            REBUILD_STATUS.update(
+                failures=failures,
+                last_error=f"{type(e).__name__}: {e}",
+                last_error_at=time.time(),
+                next_retry_at=time.time() + delay,
+            )
+            logger.exception(f"Policy index rebuild failed ({failures} in a row); retrying in {delay:.0f}s")
+
+# -------------------------------
+# 2) Vector search
+# -------------------------------
+def _embed_query(query: str):
+    return np.ascontiguousarray(EMBED_MODEL.encode([query], normalize_embeddings=True), dtype="float32")
+
+
+def _search_vectors(query: str, top_k=None, q_emb=None, snapshot=None):
+    """
+    Retrieve the top chunks for the query: cosine similarity over the
+    embeddings fused with BM25 over the chunk text (reciprocal rank fusion).
+    Returns a list of (text, meta, score) tuples, best first.
+    """
+    top_k = top_k or settings.POLICY_TOP_K
+    snapshot = snapshot or POLICY
+    if snapshot.index is None or EMBED_MODEL is None:
+        return []
+
+    hybrid = settings.POLICY_HYBRID_SEARCH and snapshot.lexical is not None
+    candidates = max(top_k, settings.POLICY_FUSION_CANDIDATES) if hybrid else top_k
+
+    # Chunk embeddings are normalized, so the inner-product search already
+    # returns cosine scores in ranked order
+    if q_emb is None:
+        q_emb = _embed_query(query)
+    D, I = snapshot.index.search(q_emb, candidates)
+    ranked = [(int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx in snapshot.texts]
+
+    if hybrid:
+        lexical = snapshot.lexical.search(query, candidates)
+        ranked = rrf_fuse([ranked, lexical], top_k, settings.POLICY_RRF_K)
+
+    return [(snapshot.texts[idx], snapshot.meta[idx], score) for idx, score in ranked[:top_k]]
+
+# -------------------------------
+# 3) Answer a question
+# -------------------------------
+def answer_policy_question(question: str, top_k=None):
+    """
+    Answer a policy question using retrieved chunks and generative QA.
+    Returns full answer and the (document, page) pairs it came from.
+    """
+    start = time.perf_counter()
+    answer, pages, tier = _answer_policy_question(question, top_k)
+    policy_tiers.record(tier, time.perf_counter() - start)
+    logger.info(f"Policy question answered by tier '{tier}'")
+    return answer, pages
+
+
+def _answer_policy_question(question: str, top_k: int):
+    """
+    Cheapest tier first: answer cache, extractive sentence match, then the
+    generator. Returns (answer, pages, tier).
+    """
+    try:
+        cached = policy_answers.get_exact(question)
+        if cached:
+            return (*cached, "cache_exact")
+        if EMBED_MODEL is None:
+            return "Sorry, I couldn't find anything in the policy.", [], "none"
+
+        generation = policy_answers.generation
+        q_emb = _embed_query(question)
+        cached = policy_answers.get_similar(q_emb)
+        if cached:
+            return (*cached, "cache_semantic")
+
+        # Retrieve top relevant chunks
+        snapshot = POLICY  # one consistent index for the whole question
+        retrieved = _search_vectors(question, top_k=top_k, q_emb=q_emb, snapshot=snapshot)
+        if not retrieved:
+            return "Sorry, I couldn't find anything in the policy.", [], "none"
+
+        # A sentence of the retrieved chunks may already be the answer
+        extracted = extract_answer(
+            q_emb, [item[1]["chunk_id"] for item in retrieved], snapshot.sentences, snapshot.sentence_embs
+        )
+        if extracted:
+            result, pages, _score = extracted
+            policy_answers.put(question, q_emb, result, pages, generation)
+            return result, pages, "extractive"
+
+        # Merge overlapping chunks and pack the best ones into the model's input budget
+        tokenizer = getattr(QA_PIPELINE, "tokenizer", None)
+        budget = context_budget(tokenizer, QA_PROMPT.format(context="", question=question))
+        context, pages = build_context(retrieved, tokenizer, budget)
+
+        # Generate coherent answer
+        input_text = QA_PROMPT.format(context=context, question=question)
+        result = QA_PIPELINE(input_text, max_length=512, do_sample=False)[0]["generated_text"]
+
+        policy_answers.put(question, q_emb, result, pages, generation)
+        return result, pages, "generative"
+
+    except Exception as e:
+        print("RAG error:", e)
+        return "⚠️ Sorry, something went wrong in the policy lookup.", [], "error"
+
+
+# -------------------------------
+# 4) Warm-up
+# -------------------------------
+def warm_up_policy():
+    # Straight through the models, so no cache entries or tier stats are recorded
+    question = "How many casual leaves do I get in a year?"
+    _search_vectors(question, q_emb=_embed_query(question))
+    if QA_PIPELINE is not None:
+        prompt = QA_PROMPT.format(context="Employees get 12 casual leaves per year.", question=question)
+        QA_PIPELINE(prompt, max_length=16, do_sample=False)
@@ -0,0 +1,69 @@
+"""
+The Rasa agent and the tracker store behind it.
+
+Rasa (and TensorFlow under it) is only imported by load_agent(), which the
+"rasa" component runs in a background thread, so importing this module is
+cheap.
+"""
+import asyncio
+import logging
+
+import settings
+from nlu_batching import install_batched_inference
+
+logger = logging.getLogger("fastapi-rasa")
+
+agent = None
+tracker_store = None
+
+
+def load_agent():
+    global agent, tracker_store
+    from rasa.core.agent import Agent
+    from rasa.model import get_latest_model
+    from tracker_store import SQLiteTrackerStore
+
+    model_path = get_latest_model()
+    print(f"📦 Loading Rasa model from {model_path}")
+    logger.info("Loading the rasa moodel")
+
+    if settings.NLU_BATCHING:
+        install_batched_inference()
+    store = SQLiteTrackerStore()
+    loaded = Agent.load(model_path, tracker_store=store)
+    # Session expiry (idle eviction) comes from the trained domain
+    store.domain = loaded.domain
+    tracker_store, agent = store, loaded
+
+
+def warm_up_agent():
+    # The first parse builds the TensorFlow graphs of DIET and the ResponseSelector
+    asyncio.run(agent.parse_message("hello"))
+
+
+async def cancel_form(tracker, agent):
+    """Properly cancel the active form and reset all slots"""
+    from rasa.shared.core.events import ActiveLoop, SlotSet
+  
+    # Create events to properly deactivate the form
+    events = [
+        # Deactivate the active loop (form)
+        ActiveLoop(None),
+        # Reset all form-related slots
+        SlotSet("leave_type", None),
+        SlotSet("leave_from", None), 
+
+        
+        SlotSet("leave_to", None),
+        SlotSet("reason", None),
+        SlotSet("requested_slot", None)
+    ]
+    
+    # Apply all events to the tracker
+    for event in events:
+        tracker.update(event)
+    
+    # Save the updated tracker
+    await agent.tracker_store.save(tracker)
+    
+    return "Your leave form has been cancelled. How can I help you now?"
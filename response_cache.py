@@ -0,0 +1,225 @@
+"""
+TTL + LRU cache for read-only OfficeKit AjaxAPI responses.
+
+Entries are keyed by (Domain, uid, endpoint, normalized Commonparam), with
+company-scoped endpoints such as GetHolidayList shared across uids. Each
+endpoint has its own TTL; once that expires the entry is still served for a
+grace period while a background task refreshes it (stale-while-revalidate).
+The cache is bounded by an approximate byte budget and evicts least recently
+used entries first.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+import settings
+from officekit_client import OfficeKitResult, build_base_url, get_officekit_client, is_company_scoped
+
+logger = logging.getLogger("fastapi-rasa")
+
+
+def normalize_commonparam(cp: dict) -> str:
+    """
+    Canonical form of a Commonparam for cache keys. Domain is already part of
+    the key, and key order must not matter.
+    """
+    cleaned = {k: v for k, v in (cp or {}).items() if k != "Domain"}
+    return json.dumps(cleaned, sort_keys=True, default=str)
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "fresh_until", "stale_until")
+
+    def __init__(self, value: OfficeKitResult, nbytes: int, fresh_until: float, stale_until: float):
+        self.value = value
+        self.nbytes = nbytes
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    def __init__(self, ttls: dict = None, stale_seconds: dict = None, max_bytes: int = None):
+        self.ttls = dict(settings.RESPONSE_CACHE_TTLS if ttls is None else ttls)
+        self.stale_seconds = dict(
+            settings.RESPONSE_CACHE_STALE_SECONDS if stale_seconds is None else stale_seconds
+        )
+        self.max_bytes = settings.RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+        self._entries = OrderedDict()  # { key: _Entry }, least recently used first
+        self._by_employee = {}         # { (domain, uid): set(keys) }
+        # { (domain, uid): int }, bumped on invalidation. Only kept while that
+        # employee has fetches in flight (_pending), so it stays bounded
+        self._generation = {}
+        self._pending = {}             # { (domain, uid): fetches in flight }
+        self._refreshing = set()       # keys with a background refresh in flight
+        self._tasks = set()            # strong refs so refresh tasks aren't GC'd
+        self.nbytes = 0
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+
+    # -------- keys --------
+
+    @staticmethod
+    def employee(Commonparam: dict, OfficeContent: dict) -> tuple:
+        return build_base_url(Commonparam), (OfficeContent or {}).get("uid")
+
+    def key(self, Commonparam: dict, OfficeContent: dict, endpoint: str, cp: dict) -> tuple:
+        domain, uid = self.employee(Commonparam, OfficeContent)
+        if is_company_scoped(endpoint):
+            # One entry per company, shared by all of its employees
+            uid = ("company", (OfficeContent or {}).get("ApiKey"))
+        return domain, uid, endpoint, normalize_commonparam(cp)
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self.ttls.get(endpoint, 0) > 0
+
+    # -------- lookups --------
+
+    async def get_or_fetch(self, key: tuple, fetch) -> OfficeKitResult:
+        """
+        Return the cached result for `key`, calling `fetch()` (a coroutine
+        factory) on a miss. Only successful results are stored.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch)
+                return entry.value
+            self._remove(key)
+
+        self.misses += 1
+        generation = self._begin_fetch(key)
+        try:
+            result = await fetch()
+            self._store(key, result, generation)
+        finally:
+            self._end_fetch(key)
+        return result
+
+    def _begin_fetch(self, key: tuple) -> int:
+        employee = key[:2]
+        self._pending[employee] = self._pending.get(employee, 0) + 1
+        return self._generation.get(employee, 0)
+
+    def _end_fetch(self, key: tuple):
+        employee = key[:2]
+        left = self._pending[employee] - 1
+        if left:
+            self._pending[employee] = left
+        else:
+            # Nothing in flight can carry an old generation any more
+            del self._pending[employee]
+            self._generation.pop(employee, None)
+
+    def _schedule_refresh(self, key: tuple, fetch):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, fetch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: tuple, fetch):
+        generation = self._begin_fetch(key)
+        try:
+            self._store(key, await fetch(), generation)
+        except Exception as e:
+            # Keep serving the stale copy until it runs out of grace
+            logger.warning(f"Background refresh of {key[2]} failed: {e}")
+        finally:
+            self._end_fetch(key)
+            self._refreshing.discard(key)
+
+    # -------- storage --------
+
+    def _store(self, key: tuple, result: OfficeKitResult, generation: int):
+        if not result.ok:
+            return
+        # The employee was invalidated while this fetch was in flight
+        if self._generation.get(key[:2], 0) != generation:
+            return
+        endpoint = key[2]
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0 or result.nbytes > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        grace = self.stale_seconds.get(endpoint, ttl)
+        self._remove(key)
+        entry = _Entry(result, result.nbytes, now + ttl, now + ttl + grace)
+        self._entries[key] = entry
+        self._by_employee.setdefault(key[:2], set()).add(key)
+        self.nbytes += entry.nbytes
+
+        while self.nbytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.nbytes -= entry.nbytes
+        keys = self._by_employee.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_employee[key[:2]]
+
+    def invalidate(self, Commonparam: dict, OfficeContent: dict, endpoint: str = None):
+        """
+        Drop an employee's cached responses, optionally only for one endpoint.
+        """
+        employee = self.employee(Commonparam, OfficeContent)
+        # A read issued from now on must not join a call that started before the write
+        get_officekit_client().forget_inflight(Commonparam, OfficeContent, endpoint)
+        if employee in self._pending:
+            # Responses already being fetched must not be cached
+            self._generation[employee] = self._generation.get(employee, 0) + 1
+        for key in list(self._by_employee.get(employee, ())):
+            if endpoint is None or key[2] == endpoint:
+                self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_employee.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
+
+
+async def cached_post_json(Commonparam: dict, endpoint: str, OfficeContent: dict, cp: dict) -> OfficeKitResult:
+    """
+    POST an AjaxAPI call, answering from the response cache when the endpoint
+    has a TTL configured.
+    """
+    def fetch():
+        return get_officekit_client().post_json(Commonparam, endpoint, OfficeContent, cp)
+
+    if not response_cache.is_cacheable(endpoint):
+        return await fetch()
+    key = response_cache.key(Commonparam, OfficeContent, endpoint, cp)
+    return await response_cache.get_or_fetch(key, fetch)
@@ -0,0 +1,219 @@
+"""
+Production entry point: load the models once, then fork workers.
+
+    python serve.py            # SERVER_WORKERS workers on SERVER_HOST:SERVER_PORT
+
+The master process:
+  1. caps math-library threads per worker (SERVER_WORKER_THREADS) before
+     torch/numpy are imported, so N workers don't each start one thread
+     per core
+  2. binds the listening socket
+  3. loads the speech and policy components (Whisper, the embedding model,
+     Flan-T5 and the FAISS index), then gc.freeze()s everything allocated
+     so far so the garbage collector never writes to those pages. With
+     more than one worker the master runs torch and FAISS single-threaded
+     and skips the warm-ups: OpenMP thread pools started before a fork are
+     not usable in the child (with libgomp its first parallel op can hang),
+     so the pools are only created in the workers, which run the warm-ups
+     from their startup hooks
+  4. forks the workers, which inherit the socket and the loaded models.
+     Model weights and the index are only ever read, so the pages stay
+     shared copy-on-write and adding workers adds little RSS. The index
+     embeddings cached on disk are mmapped on top of that
+  5. restarts workers that die, and forwards SIGTERM/SIGINT to them
+
+Each worker runs uvicorn on the inherited socket and logs to stderr only
+(RotatingFileHandler cannot rotate app.log safely from several processes); its startup hooks load
+the Rasa agent in the background (TensorFlow does not survive a fork, and
+the model is small) and start the per-process clients, batchers and
+watchers. Components listed in COMPONENTS_LAZY are left to the workers.
+
+With more than one worker, the tracker store writes through to SQLite and
+leave drafts use the SQLite backend, so a conversation can hop between
+workers. The response cache stays per worker, and invalidation is not
+shared: endpoints in RESPONSE_CACHE_WRITTEN_ENDPOINTS (the leave balance,
+which a leave submission changes) are not cached at all, so a balance read
+on another worker never serves the pre-submit figure. Read-only endpoints
+(holidays, payroll periods) and the payslip period index are still cached
+per worker.
+
+Every worker keeps its own policy index and runs its own document watcher.
+Rebuilds take the index cache's file lock, so when a PDF changes only the
+first worker embeds it and the others load its cache entries.
+/admin/policy/reload re-syncs just the worker that serves it; keep
+POLICY_WATCH_INTERVAL on so the rest follow.
+"""
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from logging.handlers import RotatingFileHandler
+
+import uvicorn
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+# Loaded before forking; the Rasa agent is loaded by each worker
+SHARED_COMPONENTS = ("speech", "policy")
+
+THREAD_ENV = (
+    "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+    # Read by Rasa when it configures TensorFlow
+    "TF_INTRA_OP_PARALLELISM_THREADS",
+)
+
+
+def worker_threads(workers: int) -> int:
+    if settings.SERVER_WORKER_THREADS > 0:
+        return settings.SERVER_WORKER_THREADS
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def limit_threads(threads: int):
+    """
+    Environment caps must be set before the libraries are imported; the
+    runtime calls cover libraries already imported in this process.
+    """
+    for name in THREAD_ENV:
+        os.environ.setdefault(name, str(threads))
+    os.environ.setdefault("TF_INTER_OP_PARALLELISM_THREADS", "1")
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    if "faiss" in sys.modules:
+        sys.modules["faiss"].omp_set_num_threads(threads)
+
+
+def limit_master_threads():
+    """
+    Loading may embed policy documents (index cache miss); keep torch and
+    FAISS from starting OpenMP pools in the process that forks.
+    """
+    if importlib.util.find_spec("torch"):
+        import torch
+        torch.set_num_threads(1)
+    if importlib.util.find_spec("faiss"):
+        import faiss
+        faiss.omp_set_num_threads(1)
+
+
+def log_to_stderr_only():
+    for handler in list(logger.handlers):
+        if isinstance(handler, RotatingFileHandler):
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(settings.SERVER_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, threads: int):
+    limit_threads(threads)
+    config = uvicorn.Config(app, lifespan="on", timeout_keep_alive=30)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve():
+    workers = max(1, settings.SERVER_WORKERS)
+    threads = worker_threads(workers)
+    limit_threads(threads)
+
+    if workers > 1:
+        # Per-process memory would split one conversation across workers
+        settings.TRACKER_SHARED = True
+        if settings.CONVERSATION_STATE_BACKEND == "memory":
+            settings.CONVERSATION_STATE_BACKEND = "sqlite"
+        # A write only invalidates the cache of the worker that made it
+        for endpoint in settings.RESPONSE_CACHE_WRITTEN_ENDPOINTS:
+            settings.RESPONSE_CACHE_TTLS.pop(endpoint, None)
+
+    sock = bind_socket(settings.SERVER_HOST, settings.SERVER_PORT)
+
+    import main
+
+    if workers > 1:
+        log_to_stderr_only()
+        limit_master_threads()
+
+    start = time.perf_counter()
+    shared = [name for name in SHARED_COMPONENTS if not main.components.get(name).lazy]
+    # Warm-ups run inference, so with several workers they run after the fork
+    main.components.load(shared, warmup=workers == 1)
+    gc.collect()
+    gc.freeze()
+    print(
+        f"🚀 Models loaded in {time.perf_counter() - start:.1f}s; "
+        f"serving on {settings.SERVER_HOST}:{settings.SERVER_PORT} "
+        f"with {workers} worker(s) x {threads} thread(s)"
+    )
+
+    if workers == 1:
+        run_worker(main.app, sock, threads)
+        return
+
+    children = {}   # pid -> worker number
+    stopping = False
+
+    def spawn(number: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(main.app, sock, threads)
+            except Exception:
+                logger.exception(f"Worker {number} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = number
+        logger.info(f"Started worker {number} (pid {pid})")
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for number in range(workers):
+        spawn(number)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        number = children.pop(pid, None)
+        if number is None or stopping:
+            continue
+        logger.warning(f"Worker {number} (pid {pid}) exited with status {status}; restarting")
+        time.sleep(1)
+        spawn(number)
+
+    sock.close()
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    serve()
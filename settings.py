@@ -0,0 +1,311 @@
+"""
+Runtime settings for the OfficeKit chat bot.
+
+Every value can be overridden with an environment variable of the same name,
+so deployments can tune the service without editing code.
+"""
+import os
+
+
+def env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name: str, default: list) -> list:
+    raw = os.environ.get(name)
+    if raw in (None, ""):
+        return list(default)
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def env_mapping(name: str, default: dict, cast=float) -> dict:
+    """
+    Parse "Key=value,Other=value" overrides on top of a default mapping.
+    """
+    result = dict(default)
+    raw = os.environ.get(name, "")
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        key, value = item.split("=", 1)
+        result[key.strip()] = cast(value.strip())
+    return result
+
+
+# -----------------------------
+# OfficeKit HTTP client
+# -----------------------------
+
+# Connection pool limits, applied per Commonparam["Domain"]
+OFFICEKIT_MAX_CONNECTIONS = env_int("OFFICEKIT_MAX_CONNECTIONS", 100)
+OFFICEKIT_MAX_KEEPALIVE = env_int("OFFICEKIT_MAX_KEEPALIVE", 20)
+OFFICEKIT_KEEPALIVE_EXPIRY = env_float("OFFICEKIT_KEEPALIVE_EXPIRY", 60.0)
+
+# Negotiate HTTP/2 via ALPN when the server supports it (needs the h2 package)
+OFFICEKIT_HTTP2 = env_bool("OFFICEKIT_HTTP2", True)
+
+# Seconds; endpoints not listed use OFFICEKIT_DEFAULT_TIMEOUT
+OFFICEKIT_DEFAULT_TIMEOUT = env_float("OFFICEKIT_DEFAULT_TIMEOUT", 5.0)
+OFFICEKIT_CONNECT_TIMEOUT = env_float("OFFICEKIT_CONNECT_TIMEOUT", 5.0)
+OFFICEKIT_ENDPOINT_TIMEOUTS = env_mapping("OFFICEKIT_ENDPOINT_TIMEOUTS", {
+    "SaveLeaveApplication": 30.0,
+    "GetSalarySlip": 15.0,
+    "GetForm_PolicyData": 15.0,
+})
+
+# Endpoints whose response is the same for every employee of a company; their
+# in-flight calls and cache entries are shared across uids
+OFFICEKIT_COMPANY_SCOPED_ENDPOINTS = set(env_list("OFFICEKIT_COMPANY_SCOPED_ENDPOINTS", [
+    "GetHolidayList",
+]))
+# Endpoints with side effects; identical concurrent calls are never coalesced
+OFFICEKIT_WRITE_ENDPOINTS = set(env_list("OFFICEKIT_WRITE_ENDPOINTS", [
+    "SaveLeaveApplication",
+]))
+
+# -----------------------------
+# Backend response cache
+# -----------------------------
+
+# Seconds a response is served as fresh; endpoints not listed are never cached
+RESPONSE_CACHE_TTLS = env_mapping("RESPONSE_CACHE_TTLS", {
+    "GetHolidayList": 24 * 3600,
+    "FillPayRollPeriod": 3600,
+    "Leavecompilation": 300,
+})
+# Extra seconds an expired entry may still be served while it is refreshed in
+# the background; endpoints not listed get a grace period equal to their TTL
+RESPONSE_CACHE_STALE_SECONDS = env_mapping("RESPONSE_CACHE_STALE_SECONDS", {
+    "Leavecompilation": 60,
+})
+RESPONSE_CACHE_MAX_BYTES = env_int("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+# Endpoints our own writes invalidate (SaveLeaveApplication -> Leavecompilation).
+# Invalidation only reaches the worker that made the write, so serve.py stops
+# caching these when it runs more than one worker
+RESPONSE_CACHE_WRITTEN_ENDPOINTS = set(env_list("RESPONSE_CACHE_WRITTEN_ENDPOINTS", [
+    "Leavecompilation",
+]))
+
+# -----------------------------
+# Payslip pipeline
+# -----------------------------
+
+# Employees whose payroll-period index is kept in memory
+PAYSLIP_INDEX_MAX_ENTRIES = env_int("PAYSLIP_INDEX_MAX_ENTRIES", 10000)
+
+# -----------------------------
+# Server (serve.py)
+# -----------------------------
+
+SERVER_HOST = env_str("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = env_int("SERVER_PORT", 8000)
+# Worker processes forked after the models are loaded once in the master
+SERVER_WORKERS = env_int("SERVER_WORKERS", max(1, min(4, (os.cpu_count() or 1) // 2)))
+# Math-library threads per worker (torch, OpenMP/MKL/OpenBLAS, FAISS); 0 splits the cores evenly
+SERVER_WORKER_THREADS = env_int("SERVER_WORKER_THREADS", 0)
+SERVER_BACKLOG = env_int("SERVER_BACKLOG", 2048)
+
+# -----------------------------
+# Startup components (see components.py): rasa, speech, policy
+# -----------------------------
+
+# Loaded by the first request that needs them instead of at startup
+COMPONENTS_LAZY = env_list("COMPONENTS_LAZY", [])
+# Run one small inference per component after loading
+COMPONENT_WARMUP = env_bool("COMPONENT_WARMUP", True)
+# How long a request waits for a component that is still loading before a 503
+COMPONENT_WAIT_SECONDS = env_float("COMPONENT_WAIT_SECONDS", 10.0)
+
+# -----------------------------
+# Admin
+# -----------------------------
+
+# Required in the X-Admin-Token header of /admin/* endpoints; they are
+# disabled (404) while it is unset
+ADMIN_TOKEN = env_str("ADMIN_TOKEN", "")
+
+# -----------------------------
+# Blocking work executors
+# -----------------------------
+
+# Threads per workload class: audio (Whisper), rag (policy QA), io (blocking HTTP),
+# index (policy index rebuilds; one at a time, extra reload requests get a 429)
+EXECUTOR_WORKERS = env_mapping("EXECUTOR_WORKERS", {"audio": 1, "rag": 1, "io": 8, "index": 1}, cast=int)
+# Jobs allowed to wait on top of the running ones before requests get a 429
+EXECUTOR_MAX_QUEUE = env_mapping("EXECUTOR_MAX_QUEUE", {"audio": 4, "rag": 8, "io": 32, "index": 0}, cast=int)
+
+# -----------------------------
+# NLU
+# -----------------------------
+
+# Tier-0 keyword classifier ahead of agent.parse_message:
+#   off    - never used
+#   shadow - runs alongside Rasa and only records agreement
+#   on     - answers on its own when confidence >= FAST_INTENT_THRESHOLD
+FAST_INTENT_MODE = env_str("FAST_INTENT_MODE", "off").lower()
+FAST_INTENT_THRESHOLD = env_float("FAST_INTENT_THRESHOLD", 0.9)
+# Longer utterances skip the keyword rules (exact training matches still apply)
+FAST_INTENT_MAX_TOKENS = env_int("FAST_INTENT_MAX_TOKENS", 8)
+
+# Normalized-text LRU in front of agent.parse_message; 0 disables it
+NLU_CACHE_SIZE = env_int("NLU_CACHE_SIZE", 2048)
+# How often to look for a newer trained model (which flushes the cache)
+NLU_CACHE_MODEL_CHECK_SECONDS = env_float("NLU_CACHE_MODEL_CHECK_SECONDS", 30.0)
+
+# Micro-batch concurrent Rasa parses into one NLU graph run
+NLU_BATCHING = env_bool("NLU_BATCHING", True)
+NLU_BATCH_MAX_SIZE = env_int("NLU_BATCH_MAX_SIZE", 16)
+# How long the first message of a batch waits for company
+NLU_BATCH_MAX_WAIT_MS = env_float("NLU_BATCH_MAX_WAIT_MS", 5.0)
+
+# Seconds /analyze-test/ waits on the Rasa HTTP server; a webhook turn runs
+# custom actions that call OfficeKit, so keep it well above those timeouts.
+# 0 waits forever
+RASA_HTTP_TIMEOUT = env_float("RASA_HTTP_TIMEOUT", 120.0)
+
+# -----------------------------
+# Conversation trackers
+# -----------------------------
+
+# SQLite file behind the Rasa tracker store (see tracker_store.py)
+TRACKER_DB_PATH = env_str(
+    "TRACKER_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".state", "trackers.db"),
+)
+# Hot trackers kept in memory; saves reach SQLite every FLUSH_INTERVAL seconds
+TRACKER_CACHE_SIZE = env_int("TRACKER_CACHE_SIZE", 2000)
+TRACKER_FLUSH_INTERVAL = env_float("TRACKER_FLUSH_INTERVAL", 1.0)
+# Events kept per tracker; older ones are folded into the current slot values.
+# Policies only look at the last 5 turns (max_history in config.yml)
+TRACKER_MAX_EVENT_HISTORY = env_int("TRACKER_MAX_EVENT_HISTORY", 100)
+# Idle seconds before a tracker leaves memory; 0 uses the domain's session_expiration_time
+TRACKER_IDLE_SECONDS = env_float("TRACKER_IDLE_SECONDS", 0)
+# Write through and skip the LRU on reads, for several workers sharing one
+# database (serve.py turns this on when it forks more than one worker)
+TRACKER_SHARED = env_bool("TRACKER_SHARED", False)
+# Stored trackers untouched for this many days are deleted; 0 keeps them forever
+TRACKER_RETENTION_DAYS = env_float("TRACKER_RETENTION_DAYS", 30)
+
+# -----------------------------
+# Multi-turn conversation state (see conversation_state.py)
+# -----------------------------
+
+# memory (per process) or sqlite (shared by every worker on the host)
+CONVERSATION_STATE_BACKEND = env_str("CONVERSATION_STATE_BACKEND", "memory").lower()
+CONVERSATION_STATE_DB_PATH = env_str(
+    "CONVERSATION_STATE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".state", "conversation_state.db"),
+)
+# Seconds an unfinished leave application is kept after its last message
+CONVERSATION_STATE_TTL = env_float("CONVERSATION_STATE_TTL", 1800.0)
+CONVERSATION_STATE_MAX_ENTRIES = env_int("CONVERSATION_STATE_MAX_ENTRIES", 10000)
+CONVERSATION_STATE_SWEEP_INTERVAL = env_float("CONVERSATION_STATE_SWEEP_INTERVAL", 60.0)
+
+# -----------------------------
+# Voice notes (/analyze_audio/)
+# -----------------------------
+
+# Speech backend (see asr_backends.py): whisper or faster-whisper; the latter
+# needs the optional extras (pip install -r requirements-optional.txt)
+ASR_BACKEND = env_str("ASR_BACKEND", "whisper").lower()
+# Whisper checkpoint: tiny, base, small, ...
+WHISPER_MODEL = env_str("WHISPER_MODEL", "tiny")
+# "cpu", "cuda"; empty picks cuda when available
+WHISPER_DEVICE = env_str("WHISPER_DEVICE", "")
+# Language code such as "en"; empty detects it per note
+WHISPER_LANGUAGE = env_str("WHISPER_LANGUAGE", "")
+# faster-whisper only: CTranslate2 weight type, decoding beam and VAD silence trimming
+ASR_COMPUTE_TYPE = env_str("ASR_COMPUTE_TYPE", "int8")
+ASR_CPU_THREADS = env_int("ASR_CPU_THREADS", 0)
+ASR_BEAM_SIZE = env_int("ASR_BEAM_SIZE", 1)
+ASR_VAD = env_bool("ASR_VAD", True)
+ASR_VAD_MIN_SILENCE_MS = env_int("ASR_VAD_MIN_SILENCE_MS", 500)
+# Where converted models are downloaded; empty uses the Hugging Face cache
+ASR_MODEL_DIR = env_str("ASR_MODEL_DIR", "")
+# ffmpeg executable used to decode uploads; a full path if it is not on PATH
+FFMPEG_BINARY = env_str("FFMPEG_BINARY", "ffmpeg")
+AUDIO_DECODE_TIMEOUT = env_float("AUDIO_DECODE_TIMEOUT", 20.0)
+# Larger or longer voice notes are refused with a 413
+AUDIO_MAX_BYTES = env_int("AUDIO_MAX_BYTES", 10 * 1024 * 1024)
+AUDIO_MAX_SECONDS = env_float("AUDIO_MAX_SECONDS", 60.0)
+# Notes up to 30 s are transcribed in micro-batches of up to this many
+AUDIO_BATCH_MAX_SIZE = env_int("AUDIO_BATCH_MAX_SIZE", 8)
+AUDIO_BATCH_MAX_WAIT_MS = env_float("AUDIO_BATCH_MAX_WAIT_MS", 25.0)
+
+# -----------------------------
+# Policy RAG
+# -----------------------------
+
+# Every PDF below this directory is indexed
+POLICY_DOCS_DIR = env_str(
+    "POLICY_DOCS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents"),
+)
+POLICY_EMBED_MODEL = env_str("POLICY_EMBED_MODEL", "all-MiniLM-L6-v2")
+# Upper bound for a chunk; chunks break on headings, paragraphs and sentences
+POLICY_CHUNK_SIZE = env_int("POLICY_CHUNK_SIZE", 1000)
+# Processes extracting pages of large PDFs
+POLICY_INGEST_WORKERS = env_int("POLICY_INGEST_WORKERS", min(4, os.cpu_count() or 1))
+
+# Chunks handed to the extractive tier / generator per question
+POLICY_TOP_K = env_int("POLICY_TOP_K", 4)
+# Fuse BM25 with vector search (reciprocal rank fusion over the top candidates of each)
+POLICY_HYBRID_SEARCH = env_bool("POLICY_HYBRID_SEARCH", True)
+POLICY_FUSION_CANDIDATES = env_int("POLICY_FUSION_CANDIDATES", 20)
+POLICY_RRF_K = env_int("POLICY_RRF_K", 60)
+
+# Seconds between checks of POLICY_DOCS_DIR for changed PDFs; 0 disables the watcher
+POLICY_WATCH_INTERVAL = env_float("POLICY_WATCH_INTERVAL", 30.0)
+# A failed rebuild is retried after 2, 4, 8, ... watch intervals, at most this many seconds apart
+POLICY_REBUILD_MAX_BACKOFF = env_float("POLICY_REBUILD_MAX_BACKOFF", 600.0)
+
+# Per-document chunks and embeddings plus the FAISS index survive restarts here
+POLICY_INDEX_CACHE_DIR = env_str(
+    "POLICY_INDEX_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "policy_index"),
+)
+# Unused document cache entries (old versions of changed PDFs) kept on disk
+POLICY_INDEX_CACHE_KEEP = env_int("POLICY_INDEX_CACHE_KEEP", 3)
+
+# Flan-T5 answer generator and how it runs: pytorch | int8 | onnx (see policy_generator.py)
+POLICY_QA_MODEL = env_str("POLICY_QA_MODEL", "google/flan-t5-base")
+POLICY_QA_BACKEND = env_str("POLICY_QA_BACKEND", "pytorch").lower()
+POLICY_QA_ONNX_DIR = env_str(
+    "POLICY_QA_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "onnx"),
+)
+
+# Extractive tier: answer with the best-matching policy sentence(s) when the
+# query/sentence cosine score reaches the threshold, else run the generator
+POLICY_EXTRACTIVE_THRESHOLD = env_float("POLICY_EXTRACTIVE_THRESHOLD", 0.65)
+# Up to this many sentences, each within MARGIN of the best score; 0 disables the tier
+POLICY_EXTRACTIVE_MAX_SENTENCES = env_int("POLICY_EXTRACTIVE_MAX_SENTENCES", 2)
+POLICY_EXTRACTIVE_MARGIN = env_float("POLICY_EXTRACTIVE_MARGIN", 0.05)
+
+# Generator prompt: context tokens allowed (also capped by the model's input size)
+POLICY_CONTEXT_MAX_TOKENS = env_int("POLICY_CONTEXT_MAX_TOKENS", 448)
+# A passage that doesn't fit is trimmed only if at least this many tokens are left
+POLICY_CONTEXT_MIN_TAIL_TOKENS = env_int("POLICY_CONTEXT_MIN_TAIL_TOKENS", 48)
+
+# Answer cache in front of the policy QA pipeline; size 0 disables it
+POLICY_ANSWER_CACHE_SIZE = env_int("POLICY_ANSWER_CACHE_SIZE", 512)
+POLICY_ANSWER_CACHE_TTL = env_float("POLICY_ANSWER_CACHE_TTL", 86400.0)
+# Cosine similarity at which a differently worded question reuses an answer
+POLICY_ANSWER_SIMILARITY = env_float("POLICY_ANSWER_SIMILARITY", 0.95)
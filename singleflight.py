@@ -0,0 +1,86 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+
+The first caller for a key (the leader) starts the call in its own task;
+every concurrent caller with the same key awaits that task's result instead of
+issuing its own. Waiters are shielded from one another: cancelling one waiter
+never cancels the shared call, and the call itself is only cancelled once no
+waiter is left.
+"""
+import asyncio
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # { key: _Flight }
+        self.leaders = 0
+        self.collapsed = 0
+        self.abandoned = 0
+
+    async def do(self, key, fn):
+        """
+        Run `fn()` (a coroutine factory) once per key among concurrent callers
+        and return its result (or raise its exception) to all of them.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key: self._finish(key, task))
+        else:
+            self.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.task.done() and flight.task.cancelled():
+                raise
+            # Only this waiter was cancelled; stop the upstream call if nobody else wants it
+            if flight.waiters == 1 and not flight.task.done():
+                self.abandoned += 1
+                # Forget it now: the done callback only runs on a later loop
+                # iteration, and a caller arriving before that must not join
+                # a task that is being cancelled
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def keys(self) -> list:
+        return list(self._flights)
+
+    def forget(self, key):
+        """
+        Let the next caller for `key` start a fresh call. Callers already
+        waiting still get the running call's result.
+        """
+        self._flights.pop(key, None)
+
+    def _finish(self, key, task: asyncio.Task):
+        if self._flights.get(key) is not None and self._flights[key].task is task:
+            del self._flights[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.collapsed
+        return {
+            "in_flight": len(self._flights),
+            "upstream_calls": self.leaders,
+            "collapsed_calls": self.collapsed,
+            "abandoned_calls": self.abandoned,
+            "collapse_ratio": self.collapsed / calls if calls else 0.0,
+        }
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fast_intent import FastIntentClassifier  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return FastIntentClassifier()
+
+
+def test_payslip_with_month(classifier):
+    assert classifier.classify("payslip for march") == ("pay_slip_of_month", 0.95)
+
+
+def test_modal_may_is_the_latest_payslip(classifier):
+    assert classifier.classify("may I get my payslip") == ("pay_slip", 0.9)
+
+
+def test_leave_balance(classifier):
+    assert classifier.classify("sick leave balance") == ("available_sl_leaves", 0.9)
+
+
+def test_leave_application_status_goes_to_rasa(classifier):
+    assert classifier.classify("my leave application status") == (None, 0.0)
+
+
+def test_actions_go_to_rasa(classifier):
+    assert classifier.classify("apply sick leave") == (None, 0.0)
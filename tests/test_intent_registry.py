@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from intent_registry import find_month  # noqa: E402
+
+
+def test_full_month_name_beats_modal_may():
+    assert find_month("may I get my payslip for march") == (3, "March")
+
+
+def test_full_name_beats_abbreviation():
+    assert find_month("payslip for jan, I mean february") == (2, "February")
+
+
+def test_abbreviation_beats_modal_may():
+    assert find_month("may I see the sep payslip") == (9, "September")
+
+
+def test_may_alone_is_the_month():
+    assert find_month("payslip for may") == (5, "May")
+
+
+def test_no_month():
+    assert find_month("show my payslip") == (None, None)
+
+
+def test_modal_may_is_not_a_month():
+    assert find_month("may I get my payslip") == (None, None)
+    assert find_month("May we see the May payslip") == (5, "May")
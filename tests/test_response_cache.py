@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import officekit_client  # noqa: E402
+import response_cache as rc  # noqa: E402
+from officekit_client import OfficeKitClient, OfficeKitResult  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+CP = {"Domain": "http://officekit.test"}
+OFFICE = {"uid": "42", "ApiKey": "key"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the cache's view of time; asyncio keeps the real clock
+    monkeypatch.setattr(rc, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = OfficeKitClient()
+    monkeypatch.setattr(officekit_client, "_client", client)
+    return client
+
+
+def result(value) -> OfficeKitResult:
+    return OfficeKitResult(200, data=value, text=str(value))
+
+
+def counting_fetch(values: list, delay: float = 0):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        value = values[len(calls) - 1]
+        await asyncio.sleep(delay)
+        return result(value)
+
+    return fetch, calls
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    return ResponseCache(ttls={"Leavecompilation": 60}, stale_seconds={"Leavecompilation": 30},
+                         max_bytes=kwargs.pop("max_bytes", 1 << 20), **kwargs)
+
+
+def test_hit_within_ttl_and_refetch_after_grace(clock, client):
+    cache = make_cache()
+    key = cache.key(CP, OFFICE, "Leavecompilation", {})
+    fetch, calls = counting_fetch([1, 2])
+
+    async def scenario():
+        first = await cache.get_or_fetch(key, fetch)
+        clock.now += 59
+        second = await cache.get_or_fetch(key, fetch)
+        clock.now += 60  # past TTL and grace
+        third = await cache.get_or_fetch(key, fetch)
+        return first.data, second.data, third.data
+
+    assert asyncio.run(scenario()) == (1, 1, 2)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_is_served_while_refreshing(clock, client):
+    cache = make_cache()
+    key = cache.key(CP, OFFICE, "Leavecompilation", {})
+    fetch, calls = counting_fetch([1, 2])
+
+    async def scenario():
+        await cache.get_or_fetch(key, fetch)
+        clock.now += 70  # past TTL, within grace
+        stale = await cache.get_or_fetch(key, fetch)
+        await asyncio.gather(*cache._tasks)
+        fresh = await cache.get_or_fetch(key, fetch)
+        return stale.data, fresh.data
+
+    assert asyncio.run(scenario()) == (1, 2)
+    assert len(calls) == 2
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_failed_responses_are_not_cached(clock, client):
+    cache = make_cache()
+    key = cache.key(CP, OFFICE, "Leavecompilation", {})
+
+    async def fetch():
+        return OfficeKitResult(500, text="down")
+
+    asyncio.run(cache.get_or_fetch(key, fetch))
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_keeps_within_budget(clock, client):
+    cache = make_cache(max_bytes=2 * result(1).nbytes)
+    fetch, _ = counting_fetch([1, 2, 3])
+
+    async def scenario():
+        for n in range(3):
+            await cache.get_or_fetch(cache.key(CP, OFFICE, "Leavecompilation", {"n": n}), fetch)
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.key(CP, OFFICE, "Leavecompilation", {"n": 0}) not in cache._entries
+
+
+def test_invalidation_during_fetch_is_not_cached(clock, client):
+    cache = make_cache()
+    key = cache.key(CP, OFFICE, "Leavecompilation", {})
+    fetch, calls = counting_fetch([5, 4], delay=0.02)
+
+    async def scenario():
+        before = asyncio.create_task(cache.get_or_fetch(key, fetch))
+        await asyncio.sleep(0.01)
+        cache.invalidate(CP, OFFICE, "Leavecompilation")
+        await before
+        after = await cache.get_or_fetch(key, fetch)
+        return after.data
+
+    assert asyncio.run(scenario()) == 4
+    assert len(calls) == 2
+    # Nothing is kept for the employee once no fetch is in flight
+    assert cache._generation == {} and cache._pending == {}
+
+
+def test_read_after_write_does_not_join_an_older_inflight_call(clock, client, monkeypatch):
+    cache = make_cache()
+    monkeypatch.setattr(rc, "response_cache", cache)
+    balances = [5, 4]
+    calls = []
+
+    async def post(commonparam, endpoint, OfficeContent, cp):
+        calls.append(endpoint)
+        balance = balances[len(calls) - 1]
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"bal": balance})
+
+    monkeypatch.setattr(client, "post", post)
+
+    async def scenario():
+        before = asyncio.create_task(rc.cached_post_json(CP, "Leavecompilation", OFFICE, {}))
+        await asyncio.sleep(0.01)
+        # What save_leave_application does after a successful SaveLeaveApplication
+        cache.invalidate(CP, OFFICE, "Leavecompilation")
+        after = await rc.cached_post_json(CP, "Leavecompilation", OFFICE, {})
+        await before
+        cached = await rc.cached_post_json(CP, "Leavecompilation", OFFICE, {})
+        return after.data, cached.data
+
+    assert asyncio.run(scenario()) == ({"bal": 4}, {"bal": 4})
+    assert len(calls) == 2
+
+
+def test_cancelled_fetch_leaves_no_bookkeeping(clock, client):
+    cache = make_cache()
+    key = cache.key(CP, OFFICE, "Leavecompilation", {})
+    fetch, _ = counting_fetch([1], delay=10)
+
+    async def scenario():
+        task = asyncio.create_task(cache.get_or_fetch(key, fetch))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert cache._pending == {} and cache.stats()["entries"] == 0
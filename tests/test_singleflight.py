@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from singleflight import SingleFlight  # noqa: E402
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flights.do("k", fn) for _ in range(5)))
+        return results, calls, flights.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert stats["collapsed_calls"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(*(flights.do("k", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.02)
+            return "value"
+
+        first = asyncio.create_task(flights.do("k", fn))
+        second = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(scenario()) == ("value", True)
+
+
+def test_last_waiter_cancelling_stops_the_call():
+    async def scenario():
+        flights, started = SingleFlight(), asyncio.Event()
+
+        async def fn():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(flights.do("k", fn))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # A caller arriving right after must start its own call, not join the cancelled one
+        async def fresh():
+            return "fresh"
+
+        return await flights.do("k", fresh), flights.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "fresh"
+    assert stats["abandoned_calls"] == 1
+    assert stats["upstream_calls"] == 2
+
+
+def test_forget_starts_a_new_call_for_later_callers():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            n = len(calls)
+            await asyncio.sleep(0.01)
+            return n
+
+        first = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0)
+        flights.forget("k")
+        second = await flights.do("k", fn)
+        return await first, second
+
+    assert asyncio.run(scenario()) == (1, 2)
@@ -0,0 +1,290 @@
+"""
+SQLite-backed Rasa tracker store with a write-behind LRU of hot trackers.
+
+Rasa's default InMemoryTrackerStore keeps every conversation forever and
+loses all of them on restart. SQLiteTrackerStore keeps one row per sender
+(the serialized dialogue) in a local SQLite file and fronts it with an LRU:
+
+  - save() only updates the LRU and marks the sender dirty; a background
+    thread writes dirty trackers in one transaction every
+    TRACKER_FLUSH_INTERVAL seconds (and on close())
+  - retrieve() serves the LRU first, then the write buffer, then SQLite
+  - the event history is capped at TRACKER_MAX_EVENT_HISTORY: older events
+    are folded into SlotSet/ActiveLoop events carrying the current state,
+    so slots and active forms survive while policies (max_history 5) still
+    see every recent turn
+  - trackers idle for longer than the domain's session_expiration_time
+    leave the LRU; rows untouched for TRACKER_RETENTION_DAYS are deleted
+
+With TRACKER_SHARED (serve.py sets it when it forks several workers) the
+database is the only source of truth: saves are written through and reads
+skip the LRU, so a conversation can move between workers. Connections and
+the flush thread are re-created in every forked child.
+
+Rasa's own SQLTrackerStore also talks to SQLite, but stores one row per
+event and re-reads the whole history on every turn.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from rasa.core.tracker_store import TrackerStore
+from rasa.shared.core.conversation import Dialogue
+from rasa.shared.core.events import ActiveLoop, SlotSet
+from rasa.shared.core.trackers import get_trackers_for_conversation_sessions
+
+import settings
+
+logger = logging.getLogger("fastapi-rasa")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trackers (
+    sender_id  TEXT PRIMARY KEY,
+    dialogue   TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteTrackerStore(TrackerStore):
+    def __init__(self, domain=None, db_path: str = None, cache_size: int = None,
+                 max_event_history: int = None, flush_interval: float = None, **kwargs):
+        super().__init__(domain, **kwargs)
+        self.db_path = db_path or settings.TRACKER_DB_PATH
+        self.cache_size = cache_size or settings.TRACKER_CACHE_SIZE
+        self.event_cap = settings.TRACKER_MAX_EVENT_HISTORY if max_event_history is None else max_event_history
+        self.flush_interval = settings.TRACKER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        # Seconds without a turn before a tracker leaves the LRU; 0 = the
+        # domain's session_expiration_time, looked up once the domain is set
+        self.idle_seconds = settings.TRACKER_IDLE_SECONDS
+        self.shared = settings.TRACKER_SHARED
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._cache = OrderedDict()   # sender_id -> [dialogue json, last turn time]
+        self._dirty = {}              # sender_id -> (dialogue json, time); waiting for a flush
+        self._flushing = {}           # the batch being written right now
+        self._inherited = []
+        self.hits = self.misses = self.db_reads = 0
+        self.flushed = self.evicted_idle = self.compacted = 0
+        self._open()
+        self._writer.execute(_SCHEMA)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _open(self):
+        self._reader = _connect(self.db_path)
+        self._writer = _connect(self.db_path)
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="tracker-flush", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        # SQLite connections must not cross a fork and the flush thread did not
+        # survive it; keep the parent's connections referenced so they are never
+        # closed from here
+        self._inherited += [self._reader, self._writer]
+        self._open()
+
+    # -----------------------------
+    # TrackerStore API
+    # -----------------------------
+
+    async def save(self, tracker) -> None:
+        await self.stream_events(tracker)
+        dialogue = self._serialise(tracker)
+        now = time.time()
+        with self._lock:
+            self._cache[tracker.sender_id] = [dialogue, now]
+            self._cache.move_to_end(tracker.sender_id)
+            self._dirty[tracker.sender_id] = (dialogue, now)
+            while len(self._cache) > self.cache_size:
+                # Dirty trackers stay in _dirty until the next flush writes them
+                self._cache.popitem(last=False)
+        if self.shared:
+            self.flush()
+
+    async def retrieve(self, sender_id):
+        return self._retrieve(sender_id, fetch_all_sessions=False)
+
+    async def retrieve_full_tracker(self, sender_id):
+        return self._retrieve(sender_id, fetch_all_sessions=True)
+
+    async def keys(self):
+        with self._read_lock:
+            stored = {row[0] for row in self._reader.execute("SELECT sender_id FROM trackers")}
+        with self._lock:
+            return list(stored | set(self._cache) | set(self._dirty) | set(self._flushing))
+
+    async def delete(self, sender_id: str) -> None:
+        # Holding the write lock waits out a flush in progress, so it can't
+        # write the tracker back after the DELETE
+        with self._write_lock:
+            with self._lock:
+                self._cache.pop(sender_id, None)
+                self._dirty.pop(sender_id, None)
+                self._flushing.pop(sender_id, None)
+            self._writer.execute("DELETE FROM trackers WHERE sender_id = ?", (sender_id,))
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+
+    def _lookup(self, sender_id: str):
+        now = time.time()
+        with self._lock:
+            entry = None if self.shared else self._cache.get(sender_id)
+            if entry is not None:
+                self.hits += 1
+                entry[1] = now
+                self._cache.move_to_end(sender_id)
+                return entry[0]
+            self.misses += 1
+            pending = self._dirty.get(sender_id) or self._flushing.get(sender_id)
+        if pending is not None:
+            dialogue = pending[0]
+        else:
+            # Primary-key read on a local WAL database; well under a millisecond
+            with self._read_lock:
+                row = self._reader.execute(
+                    "SELECT dialogue FROM trackers WHERE sender_id = ?", (sender_id,)
+                ).fetchone()
+            self.db_reads += 1
+            if row is None:
+                return None
+            dialogue = row[0]
+        if self.shared:
+            return dialogue
+        with self._lock:
+            # A save() that landed while we were reading wins
+            entry = self._cache.setdefault(sender_id, [dialogue, now])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry[0]
+
+    def _retrieve(self, sender_id: str, fetch_all_sessions: bool):
+        dialogue = self._lookup(sender_id)
+        if dialogue is None:
+            return None
+        tracker = self.deserialise_tracker(sender_id, dialogue)
+        if tracker is None or fetch_all_sessions:
+            return tracker
+        sessions = get_trackers_for_conversation_sessions(tracker)
+        return sessions[-1] if len(sessions) > 1 else tracker
+
+    def _serialise(self, tracker) -> str:
+        events = list(tracker.events)
+        if self.event_cap and len(events) > self.event_cap:
+            tail = events[-self.event_cap:]
+            stamp = tail[0].timestamp
+            # Replaying the tail on top of the current state ends in the current state
+            head = [
+                SlotSet(slot.name, slot.value, timestamp=stamp)
+                for slot in tracker.slots.values()
+                if slot.value != slot.initial_value
+            ]
+            if tracker.active_loop_name:
+                head.append(ActiveLoop(tracker.active_loop_name, timestamp=stamp))
+            events = head + tail
+            self.compacted += 1
+        return json.dumps(Dialogue(tracker.sender_id, events).as_dict())
+
+    def _idle_limit(self) -> float:
+        if self.idle_seconds:
+            return self.idle_seconds
+        session = getattr(self.domain, "session_config", None)
+        minutes = getattr(session, "session_expiration_time", 0) or 0
+        return minutes * 60 or 3600
+
+    def flush(self) -> int:
+        with self._write_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            if not self._dirty:
+                return 0
+            self._flushing, self._dirty = self._dirty, {}
+            batch = [(sender, dialogue, ts) for sender, (dialogue, ts) in self._flushing.items()]
+        try:
+            self._writer.execute("BEGIN")
+            self._writer.executemany(
+                "INSERT INTO trackers (sender_id, dialogue, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sender_id) DO UPDATE SET dialogue = excluded.dialogue, updated_at = excluded.updated_at",
+                batch,
+            )
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            with self._lock:
+                # Keep anything saved again meanwhile; retry the rest next time
+                for sender, entry in self._flushing.items():
+                    self._dirty.setdefault(sender, entry)
+                self._flushing = {}
+            raise
+        with self._lock:
+            self._flushing = {}
+        self.flushed += len(batch)
+        return len(batch)
+
+    def evict_idle(self) -> int:
+        cutoff = time.time() - self._idle_limit()
+        with self._lock:
+            idle = [sender for sender, (_, seen) in self._cache.items() if seen < cutoff]
+            for sender in idle:
+                del self._cache[sender]
+        self.evicted_idle += len(idle)
+        return len(idle)
+
+    def purge_expired(self) -> int:
+        if settings.TRACKER_RETENTION_DAYS <= 0:
+            return 0
+        cutoff = time.time() - settings.TRACKER_RETENTION_DAYS * 86400
+        with self._write_lock:
+            return self._writer.execute("DELETE FROM trackers WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def _flush_loop(self):
+        last_sweep = time.time()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() - last_sweep >= 60:
+                    last_sweep = time.time()
+                    evicted, purged = self.evict_idle(), self.purge_expired()
+                    if evicted or purged:
+                        logger.info(f"Tracker store: {evicted} idle trackers evicted, {purged} expired rows purged")
+            except Exception as e:
+                logger.warning(f"Tracker store flush failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self._reader.close()
+        self._writer.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            cached, dirty = len(self._cache), len(self._dirty)
+        return {
+            "cached": cached,
+            "dirty": dirty,
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_reads": self.db_reads,
+            "flushed": self.flushed,
+            "evicted_idle": self.evicted_idle,
+            "compacted": self.compacted,
+        }